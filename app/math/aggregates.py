@@ -0,0 +1,183 @@
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Dict, Iterable, Optional, Tuple, Union
+from app.models.database import DataPoint, Metric, MetricAggregate, Vote
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+from uuid import UUID
+
+# Escala das colunas de data_points (DECIMAL(15, 8) e DECIMAL(10, 6))
+VALUE_SCALE = Decimal("0.00000001")
+LATENCY_SCALE = Decimal("0.000001")
+
+# (n, Σ D, Σ |D|, Σ |D| * latency) de um dado
+Terms = Tuple[int, Decimal, Decimal, Decimal]
+NO_TERMS: Terms = (0, Decimal(0), Decimal(0), Decimal(0))
+
+
+def add_terms(first: Terms, second: Terms) -> Terms:
+    """
+    Soma termo a termo das contribuições de dois conjuntos de dados
+    """
+    return tuple(a + b for a, b in zip(first, second))
+
+
+def quantize_latency(latency: float) -> Decimal:
+    """
+    Arredonda a latência como a coluna latency de data_points a armazena
+
+    Os deltas dos agregados usam exatamente o valor gravado, para que
+    somar e subtrair o mesmo dado não acumule deriva.
+    """
+    return Decimal(str(latency)).quantize(LATENCY_SCALE, rounding=ROUND_HALF_UP)
+
+
+def data_point_terms(is_reliable: Optional[bool], value, latency) -> Terms:
+    """
+    Contribuição de um dado aos agregados da sua métrica
+
+    Só dados confiáveis contam: (1, D_k, |D_k|, |D_k| * latency_k)
+    """
+    if not is_reliable:
+        return NO_TERMS
+    value = Decimal(str(value)).quantize(VALUE_SCALE, rounding=ROUND_HALF_UP)
+    latency = Decimal(str(latency or 0))
+    return (1, value, abs(value), abs(value) * latency)
+
+
+def rebuild_metric_aggregates(
+    db: Session, metric_ids: Optional[Iterable[Union[str, UUID]]] = None
+) -> Dict[str, MetricAggregate]:
+    """
+    Recalcula os agregados a partir de data_points, em uma consulta agrupada
+
+    Sem metric_ids, recalcula todas as métricas.
+
+    Retorna: {metric_id: MetricAggregate}
+    """
+    if metric_ids is None:
+        ids = [str(metric_id) for (metric_id,) in db.query(Metric.id).all()]
+    else:
+        ids = [str(metric_id) for metric_id in metric_ids]
+    if not ids:
+        return {}
+
+    rows = (
+        db.query(
+            DataPoint.metric_id,
+            func.count(DataPoint.id),
+            func.sum(DataPoint.value),
+            func.sum(func.abs(DataPoint.value)),
+            func.sum(func.abs(DataPoint.value) * func.coalesce(DataPoint.latency, 0)),
+        )
+        .filter(DataPoint.metric_id.in_(ids), DataPoint.is_reliable == True)
+        .group_by(DataPoint.metric_id)
+        .all()
+    )
+    sums = {str(row[0]): row[1:] for row in rows}
+    aggregates = {
+        str(aggregate.metric_id): aggregate
+        for aggregate in db.query(MetricAggregate)
+        .filter(MetricAggregate.metric_id.in_(ids))
+        .all()
+    }
+
+    for metric_id in ids:
+        count, value_sum, abs_value_sum, weighted_latency_sum = sums.get(
+            metric_id, NO_TERMS
+        )
+        aggregate = aggregates.get(metric_id)
+        if aggregate is None:
+            aggregate = aggregates[metric_id] = MetricAggregate(metric_id=metric_id)
+            db.add(aggregate)
+        aggregate.reliable_count = count
+        aggregate.value_sum = value_sum or 0
+        aggregate.abs_value_sum = abs_value_sum or 0
+        aggregate.weighted_latency_sum = weighted_latency_sum or 0
+    db.flush()
+    return aggregates
+
+
+def apply_data_point_change(
+    db: Session, metric_id: Union[str, UUID], old_terms: Terms, new_terms: Terms
+):
+    """
+    Aplica em O(1) a mudança de um dado aos agregados da métrica
+
+    O incremento é feito no próprio UPDATE (coluna = coluna + delta), sem
+    ler a linha antes, de modo que votos concorrentes na mesma métrica não
+    perdem atualizações. Se a métrica ainda não tem agregados, eles são
+    reconstruídos do estado atual (já com a mudança gravada).
+    """
+    if old_terms == new_terms:
+        return
+    count, value_sum, abs_value_sum, weighted_latency_sum = (
+        new - old for new, old in zip(new_terms, old_terms)
+    )
+    updated = (
+        db.query(MetricAggregate)
+        .filter(MetricAggregate.metric_id == str(metric_id))
+        .update(
+            {
+                MetricAggregate.reliable_count: MetricAggregate.reliable_count + count,
+                MetricAggregate.value_sum: MetricAggregate.value_sum + value_sum,
+                MetricAggregate.abs_value_sum: MetricAggregate.abs_value_sum
+                + abs_value_sum,
+                MetricAggregate.weighted_latency_sum: MetricAggregate.weighted_latency_sum
+                + weighted_latency_sum,
+            },
+            synchronize_session=False,
+        )
+    )
+    if not updated:
+        db.flush()
+        rebuild_metric_aggregates(db, [metric_id])
+
+
+def load_metric_aggregates(
+    db: Session, metric_ids: Iterable[Union[str, UUID]]
+) -> Dict[str, MetricAggregate]:
+    """
+    Lê os agregados das métricas, reconstruindo os que ainda não existem
+
+    Retorna: {metric_id: MetricAggregate}
+    """
+    ids = [str(metric_id) for metric_id in metric_ids]
+    if not ids:
+        return {}
+    aggregates = {
+        str(aggregate.metric_id): aggregate
+        for aggregate in db.query(MetricAggregate)
+        .filter(MetricAggregate.metric_id.in_(ids))
+        .populate_existing()
+        .all()
+    }
+    missing = [metric_id for metric_id in ids if metric_id not in aggregates]
+    if missing:
+        aggregates.update(rebuild_metric_aggregates(db, missing))
+    return aggregates
+
+
+def rebuild_vote_counters(db: Session) -> int:
+    """
+    Recontagem de positive_votes e total_votes de todos os dados
+
+    Um único UPDATE com subconsultas correlacionadas sobre votes.
+
+    Retorna: número de dados atualizados
+    """
+    total = (
+        select(func.count(Vote.id))
+        .where(Vote.data_point_id == DataPoint.id)
+        .scalar_subquery()
+    )
+    positive = (
+        select(func.count(Vote.id))
+        .where(Vote.data_point_id == DataPoint.id, Vote.is_reliable == True)
+        .scalar_subquery()
+    )
+    result = db.execute(
+        update(DataPoint)
+        .values(positive_votes=positive, total_votes=total)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
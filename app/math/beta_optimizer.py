@@ -0,0 +1,133 @@
+import numpy as np
+from typing import Tuple
+import math
+from app.math.softmin import softmin, softmin_grad_beta
+
+# Intervalo de busca de β usado historicamente pela busca binária
+BETA_LOW = 0.1
+BETA_HIGH = 10.0
+
+
+def _softmin_and_derivative(
+    value: float, error: float, beta: float
+) -> Tuple[float, float]:
+    """
+    Calcula softmin(value, erro) e sua derivada em relação a β
+
+    softmin = min(x, y) - log(1 + exp(-β|x - y|)) / β
+    d softmin / dβ = (Σ p_i x_i - softmin) / β,  p = softmax(-βx)
+    """
+    low, high = min(value, error), max(value, error)
+    gap = high - low
+    tail = math.exp(-beta * gap)
+    penalized = low - math.log1p(tail) / beta
+    expected = low + gap * tail / (1.0 + tail)
+    return penalized, (expected - penalized) / beta
+
+
+def fit_beta(
+    value: float,
+    error: float,
+    mu: float,
+    epsilon: float = 1e-9,
+    delta: float = 1e-9,
+    low: float = BETA_LOW,
+    high: float = BETA_HIGH,
+    max_iterations: int = 50,
+) -> Tuple[float, float]:
+    """
+    Encontra β tal que softmin(metric_j, erro_j, β) = μ_j
+
+    Trabalha apenas com os escalares (metric_j, erro_j, μ_j), sem acesso ao
+    banco. Como softmin é estritamente crescente em β, o resíduo
+    r(β) = softmin - μ tem no máximo uma raiz em [low, high]; usamos Newton com
+    a derivada analítica, protegido por bissecção no intervalo que contém a raiz.
+    Se a raiz estiver fora do intervalo, retorna o extremo mais próximo.
+
+    Retorna: (beta, |r(beta)|)
+    """
+    residual_low = _softmin_and_derivative(value, error, low)[0] - mu
+    if residual_low >= 0:
+        return low, abs(residual_low)
+    residual_high = _softmin_and_derivative(value, error, high)[0] - mu
+    if residual_high <= 0:
+        return high, abs(residual_high)
+
+    beta = 1.0 if low < 1.0 < high else (low + high) / 2
+    residual = residual_low
+    for _ in range(max_iterations):
+        penalized, slope = _softmin_and_derivative(value, error, beta)
+        residual = penalized - mu
+        if abs(residual) <= epsilon:
+            break
+
+        # Manter o intervalo [low, high] com r(low) < 0 < r(high)
+        if residual < 0:
+            low = beta
+        else:
+            high = beta
+
+        step = beta - residual / slope if slope > 0 else low - 1.0
+        if not low < step < high:
+            step = (low + high) / 2
+        if abs(step - beta) <= delta:
+            beta = step
+            residual = _softmin_and_derivative(value, error, beta)[0] - mu
+            break
+        beta = step
+
+    return beta, abs(residual)
+
+
+def fit_beta_batch(
+    values: np.ndarray,
+    errors: np.ndarray,
+    mus: np.ndarray,
+    epsilon: float = 1e-9,
+    low: float = BETA_LOW,
+    high: float = BETA_HIGH,
+    max_iterations: int = 50,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Versão vetorizada de fit_beta: ajusta β para todas as métricas de uma vez
+
+    Retorna: (betas, resíduos absolutos)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    errors = np.asarray(errors, dtype=np.float64)
+    mus = np.asarray(mus, dtype=np.float64)
+
+    def softmin_and_derivative(beta):
+        return (
+            softmin(values, errors, beta=beta),
+            softmin_grad_beta(values, errors, beta=beta),
+        )
+
+    lows = np.full(values.shape, low)
+    highs = np.full(values.shape, high)
+    residual_low = softmin_and_derivative(lows)[0] - mus
+    residual_high = softmin_and_derivative(highs)[0] - mus
+
+    betas = np.where(residual_low >= 0, low, np.where(residual_high <= 0, high, 1.0))
+    active = (residual_low < 0) & (residual_high > 0)
+    if not low < 1.0 < high:
+        betas = np.where(active, (low + high) / 2, betas)
+
+    for _ in range(max_iterations):
+        if not active.any():
+            break
+        penalized, slope = softmin_and_derivative(betas)
+        residual = penalized - mus
+        active &= np.abs(residual) > epsilon
+
+        lows = np.where(active & (residual < 0), betas, lows)
+        highs = np.where(active & (residual >= 0), betas, highs)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            steps = betas - residual / slope
+        outside = ~((lows < steps) & (steps < highs))
+        steps = np.where(outside, (lows + highs) / 2, steps)
+        betas = np.where(active, steps, betas)
+
+    residuals = np.abs(softmin_and_derivative(betas)[0] - mus)
+    return betas, residuals
@@ -0,0 +1,582 @@
+import heapq
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional
+from app.math.clause_store import ClauseStore
+
+# Valores de literal
+TRUE = 1
+FALSE = -1
+UNASSIGNED = 0
+
+
+def luby(index: int) -> int:
+    """
+    Sequência de Luby (1, 1, 2, 1, 1, 2, 4, ...) usada para os reinícios
+    """
+    size, power = 1, 0
+    while size < index + 1:
+        power += 1
+        size = 2 * size + 1
+    while size - 1 != index:
+        size = (size - 1) >> 1
+        power -= 1
+        index = index % size
+    return 1 << power
+
+
+def to_literal(dimacs: int) -> int:
+    """
+    Converte um literal DIMACS (±v) para a codificação interna 2v / 2v + 1
+    """
+    return (dimacs << 1) if dimacs > 0 else ((-dimacs << 1) | 1)
+
+
+def to_dimacs(literal: int) -> int:
+    """
+    Converte um literal interno para DIMACS (±v)
+    """
+    return -(literal >> 1) if literal & 1 else literal >> 1
+
+
+class CDCLSolver:
+    """
+    Solver SAT com aprendizado de cláusulas dirigido por conflitos (CDCL)
+
+    - propagação unitária com dois literais vigiados por cláusula
+    - análise de conflito pelo primeiro UIP, com minimização local
+    - heurística VSIDS com salvamento de fase
+    - reinícios pela sequência de Luby
+    - remoção periódica de cláusulas aprendidas pelo LBD
+
+    As cláusulas de entrada são inteiros no formato DIMACS (±v, v >= 1). A
+    base interna é CSR: literais (2v / 2v + 1) contíguos em self.literals,
+    com a cláusula i em literals[offsets[i] : offsets[i + 1]]; os dois
+    primeiros literais de cada cláusula são os vigiados, e as listas de
+    vigias guardam ids de cláusula. literals e offsets são listas planas, e
+    não array("i"), porque a propagação os lê e reordena a cada passo e o
+    acesso a listas dispensa converter cada inteiro.
+
+    solve() retorna True (satisfatível, modelo em self.model), False
+    (insatisfatível) ou None (orçamento de conflitos ou tempo esgotado).
+    """
+
+    def __init__(
+        self,
+        num_vars: int = 0,
+        clauses: Iterable[Iterable[int]] = (),
+        restart_base: int = 100,
+        var_decay: float = 0.95,
+        clause_decay: float = 0.999,
+    ):
+        self.num_vars = 0
+        self.literals: List[int] = []
+        self.offsets: List[int] = [0]
+        self.learnt = bytearray()
+        self.lbd = array("i")
+        self.clause_activity = array("d")
+        self.watches: List[List[int]] = [[], []]
+        self.value: List[int] = [UNASSIGNED, UNASSIGNED]
+        self.level: List[int] = [0]
+        self.reason: List[int] = [-1]
+        self.activity: List[float] = [0.0]
+        self.phase: List[bool] = [False]
+        self.seen: List[bool] = [False]
+        self.trail: List[int] = []
+        self.trail_lim: List[int] = []
+        self.qhead = 0
+        self.heap: List[tuple] = []
+        self.ok = True
+        self.model: List[int] = []
+        self.failed_assumptions: List[int] = []
+
+        self.restart_base = restart_base
+        self.var_inc = 1.0
+        self.var_decay = var_decay
+        self.clause_inc = 1.0
+        self.clause_decay = clause_decay
+        self.max_learnts = 0.0
+        self.num_learnts = 0
+
+        self.stats: Dict[str, int] = {
+            "decisions": 0,
+            "propagations": 0,
+            "conflicts": 0,
+            "restarts": 0,
+            "learned_clauses": 0,
+            "deleted_clauses": 0,
+        }
+
+        self.ensure_vars(num_vars)
+        if isinstance(clauses, ClauseStore):
+            # Fatias dos arrays do CSR, sem passar por listas
+            literals, offsets = clauses.literals, clauses.offsets
+            clauses = (
+                literals[offsets[index] : offsets[index + 1]]
+                for index in range(len(clauses))
+            )
+        for clause in clauses:
+            self.add_clause(clause)
+
+    @property
+    def num_clauses(self) -> int:
+        return len(self.offsets) - 1
+
+    # ------------------------------------------------------------------
+    # Construção do problema
+    # ------------------------------------------------------------------
+
+    def ensure_vars(self, num_vars: int):
+        """
+        Garante que as variáveis 1..num_vars existam
+        """
+        while self.num_vars < num_vars:
+            self.num_vars += 1
+            self.watches.extend(([], []))
+            self.value.extend((UNASSIGNED, UNASSIGNED))
+            self.level.append(0)
+            self.reason.append(-1)
+            self.activity.append(0.0)
+            self.phase.append(False)
+            self.seen.append(False)
+            heapq.heappush(self.heap, (0.0, self.num_vars))
+
+    def add_clause(self, clause: Iterable[int]) -> bool:
+        """
+        Adiciona uma cláusula original (apenas no nível de decisão 0)
+
+        Retorna False se o problema já se tornou insatisfatível.
+        """
+        if not self.ok:
+            return False
+        self._cancel_until(0)
+
+        dimacs_literals = set(clause)
+        dimacs_literals.discard(0)
+        if any(-dimacs in dimacs_literals for dimacs in dimacs_literals):
+            return True  # tautologia
+
+        literals = []
+        for dimacs in dimacs_literals:
+            self.ensure_vars(abs(dimacs))
+            literal = to_literal(dimacs)
+            if self.value[literal] == TRUE:
+                return True  # já satisfeita no nível 0
+            if self.value[literal] == UNASSIGNED:
+                literals.append(literal)
+
+        if not literals:
+            self.ok = False
+            return False
+        if len(literals) == 1:
+            self._enqueue(literals[0], -1)
+            self.ok = self._propagate() == -1
+            return self.ok
+
+        self._attach(literals, learnt=False)
+        return True
+
+    def _attach(self, literals: List[int], learnt: bool, lbd: int = 0) -> int:
+        index = len(self.offsets) - 1
+        self.literals.extend(literals)
+        self.offsets.append(len(self.literals))
+        self.learnt.append(learnt)
+        self.lbd.append(lbd)
+        self.clause_activity.append(0.0)
+        self.watches[literals[0]].append(index)
+        self.watches[literals[1]].append(index)
+        if learnt:
+            self.num_learnts += 1
+            self.stats["learned_clauses"] += 1
+        return index
+
+    # ------------------------------------------------------------------
+    # Atribuições e propagação
+    # ------------------------------------------------------------------
+
+    def decision_level(self) -> int:
+        return len(self.trail_lim)
+
+    def _enqueue(self, literal: int, reason: int):
+        self.value[literal] = TRUE
+        self.value[literal ^ 1] = FALSE
+        var = literal >> 1
+        self.level[var] = len(self.trail_lim)
+        self.reason[var] = reason
+        self.trail.append(literal)
+
+    def _propagate(self) -> int:
+        """
+        Propagação unitária; retorna o índice da cláusula em conflito ou -1
+        """
+        value = self.value
+        literals = self.literals
+        offsets = self.offsets
+        watches = self.watches
+        trail = self.trail
+
+        while self.qhead < len(trail):
+            false_literal = trail[self.qhead] ^ 1
+            self.qhead += 1
+            self.stats["propagations"] += 1
+
+            watchers = watches[false_literal]
+            i = j = 0
+            size = len(watchers)
+            while i < size:
+                index = watchers[i]
+                i += 1
+                start = offsets[index]
+                first = literals[start]
+                if first == false_literal:
+                    first = literals[start + 1]
+                    literals[start] = first
+                    literals[start + 1] = false_literal
+                if value[first] == TRUE:
+                    watchers[j] = index
+                    j += 1
+                    continue
+
+                for k in range(start + 2, offsets[index + 1]):
+                    other = literals[k]
+                    if value[other] != FALSE:
+                        literals[start + 1] = other
+                        literals[k] = false_literal
+                        watches[other].append(index)
+                        break
+                else:
+                    watchers[j] = index
+                    j += 1
+                    if value[first] == FALSE:
+                        while i < size:
+                            watchers[j] = watchers[i]
+                            j += 1
+                            i += 1
+                        del watchers[j:]
+                        self.qhead = len(trail)
+                        return index
+                    self._enqueue(first, index)
+            del watchers[j:]
+        return -1
+
+    def _cancel_until(self, level: int):
+        if len(self.trail_lim) <= level:
+            return
+        value = self.value
+        start = self.trail_lim[level]
+        for literal in reversed(self.trail[start:]):
+            var = literal >> 1
+            value[literal] = UNASSIGNED
+            value[literal ^ 1] = UNASSIGNED
+            self.reason[var] = -1
+            self.phase[var] = not literal & 1
+            heapq.heappush(self.heap, (-self.activity[var], var))
+        del self.trail[start:]
+        del self.trail_lim[level:]
+        self.qhead = len(self.trail)
+        if len(self.heap) > 8 * self.num_vars + 64:
+            self._rebuild_heap()
+
+    def _rebuild_heap(self):
+        self.heap = [
+            (-self.activity[var], var)
+            for var in range(1, self.num_vars + 1)
+            if self.value[var << 1] == UNASSIGNED
+        ]
+        heapq.heapify(self.heap)
+
+    # ------------------------------------------------------------------
+    # Análise de conflitos
+    # ------------------------------------------------------------------
+
+    def _bump_var(self, var: int):
+        self.activity[var] += self.var_inc
+        if self.activity[var] > 1e100:
+            self.activity = [activity * 1e-100 for activity in self.activity]
+            self.var_inc *= 1e-100
+            self._rebuild_heap()
+        elif self.value[var << 1] == UNASSIGNED:
+            heapq.heappush(self.heap, (-self.activity[var], var))
+
+    def _bump_clause(self, index: int):
+        self.clause_activity[index] += self.clause_inc
+        if self.clause_activity[index] > 1e20:
+            self.clause_activity = array(
+                "d", (activity * 1e-20 for activity in self.clause_activity)
+            )
+            self.clause_inc *= 1e-20
+
+    def _analyze(self, conflict: int):
+        """
+        Deriva a cláusula aprendida pelo primeiro UIP
+
+        Retorna: (cláusula aprendida com o literal assertivo na posição 0,
+                  nível para o qual retroceder, LBD)
+        """
+        seen = self.seen
+        level = self.level
+        trail = self.trail
+        literals = self.literals
+        offsets = self.offsets
+        current_level = len(self.trail_lim)
+
+        learnt = [0]
+        pending = 0
+        literal = -1
+        index = len(trail) - 1
+
+        while True:
+            if self.learnt[conflict]:
+                self._bump_clause(conflict)
+            # Na cláusula razão, a posição 0 é o próprio literal implicado
+            start = offsets[conflict] + (0 if literal == -1 else 1)
+            for other in literals[start : offsets[conflict + 1]]:
+                var = other >> 1
+                if not seen[var] and level[var] > 0:
+                    seen[var] = True
+                    self._bump_var(var)
+                    if level[var] >= current_level:
+                        pending += 1
+                    else:
+                        learnt.append(other)
+
+            while not seen[trail[index] >> 1]:
+                index -= 1
+            literal = trail[index]
+            index -= 1
+            var = literal >> 1
+            conflict = self.reason[var]
+            seen[var] = False
+            pending -= 1
+            if pending == 0:
+                break
+
+        learnt[0] = literal ^ 1
+
+        # Minimização local: remove literais implicados pelos demais
+        minimized = [learnt[0]]
+        for other in learnt[1:]:
+            reason = self.reason[other >> 1]
+            if reason == -1 or any(
+                not seen[q >> 1] and level[q >> 1] > 0
+                for q in literals[offsets[reason] + 1 : offsets[reason + 1]]
+            ):
+                minimized.append(other)
+        for other in learnt[1:]:
+            seen[other >> 1] = False
+
+        if len(minimized) == 1:
+            return minimized, 0, 1
+
+        best = max(range(1, len(minimized)), key=lambda i: level[minimized[i] >> 1])
+        minimized[1], minimized[best] = minimized[best], minimized[1]
+        lbd = len({level[other >> 1] for other in minimized})
+        return minimized, level[minimized[1] >> 1], lbd
+
+    # ------------------------------------------------------------------
+    # Heurísticas de busca
+    # ------------------------------------------------------------------
+
+    def _pick_branch_literal(self) -> int:
+        heap = self.heap
+        value = self.value
+        while heap:
+            negative_activity, var = heapq.heappop(heap)
+            if (
+                value[var << 1] != UNASSIGNED
+                or -negative_activity != self.activity[var]
+            ):
+                continue
+            return (var << 1) | (0 if self.phase[var] else 1)
+        for var in range(1, self.num_vars + 1):
+            if value[var << 1] == UNASSIGNED:
+                return (var << 1) | (0 if self.phase[var] else 1)
+        return -1
+
+    def _is_locked(self, index: int) -> bool:
+        literal = self.literals[self.offsets[index]]
+        return self.value[literal] == TRUE and self.reason[literal >> 1] == index
+
+    def _reduce_db(self):
+        """
+        Remove metade das cláusulas aprendidas menos úteis (maior LBD, menor atividade)
+
+        O CSR é compactado em seguida: as cláusulas restantes ganham ids
+        novos, e as listas de vigias e as razões são refeitas com eles.
+        """
+        candidates = [
+            index
+            for index in range(self.num_clauses)
+            if self.learnt[index] and self.lbd[index] > 2 and not self._is_locked(index)
+        ]
+        candidates.sort(key=lambda i: (-self.lbd[i], self.clause_activity[i]))
+        removed = bytearray(self.num_clauses)
+        for index in candidates[: len(candidates) // 2]:
+            removed[index] = 1
+            self.num_learnts -= 1
+            self.stats["deleted_clauses"] += 1
+        if not any(removed):
+            return
+
+        literals, offsets = self.literals, self.offsets
+        learnt, lbd, clause_activity = self.learnt, self.lbd, self.clause_activity
+        self.literals: List[int] = []
+        self.offsets: List[int] = [0]
+        self.learnt = bytearray()
+        self.lbd = array("i")
+        self.clause_activity = array("d")
+        self.watches = [[] for _ in self.watches]
+        new_index = array("q", [-1]) * len(removed)
+        for index in range(len(removed)):
+            if removed[index]:
+                continue
+            start = offsets[index]
+            new_index[index] = self._attach(
+                literals[start : offsets[index + 1]], False, lbd[index]
+            )
+            self.learnt[-1] = learnt[index]
+            self.clause_activity[-1] = clause_activity[index]
+
+        reason = self.reason
+        for var in range(1, self.num_vars + 1):
+            if reason[var] != -1:
+                reason[var] = new_index[reason[var]]
+
+    # ------------------------------------------------------------------
+    # Busca
+    # ------------------------------------------------------------------
+
+    def _analyze_final(self, literal: int) -> List[int]:
+        """
+        Identifica as suposições que implicam o literal verdadeiro literal
+
+        Retorna os literais DIMACS das suposições envolvidas (incluindo a
+        própria suposição que falhou).
+        """
+        failed = [to_dimacs(literal ^ 1)]
+        if not self.trail_lim:
+            return failed
+
+        seen = self.seen
+        seen[literal >> 1] = True
+        for index in range(len(self.trail) - 1, self.trail_lim[0] - 1, -1):
+            var = self.trail[index] >> 1
+            if not seen[var]:
+                continue
+            reason = self.reason[var]
+            if reason == -1:
+                failed.append(to_dimacs(self.trail[index]))
+            else:
+                start = self.offsets[reason]
+                for other in self.literals[start + 1 : self.offsets[reason + 1]]:
+                    if self.level[other >> 1] > 0:
+                        seen[other >> 1] = True
+            seen[var] = False
+        seen[literal >> 1] = False
+        return failed
+
+    def solve(
+        self,
+        assumptions: Iterable[int] = (),
+        max_conflicts: Optional[int] = None,
+        time_limit: Optional[float] = None,
+    ) -> Optional[bool]:
+        """
+        Decide a satisfatibilidade das cláusulas adicionadas
+
+        assumptions são literais DIMACS assumidos verdadeiros apenas nesta
+        chamada; as cláusulas aprendidas e a atividade das variáveis são
+        preservadas entre chamadas, o que permite resolver incrementalmente.
+        Se o problema for insatisfatível sob as suposições, as suposições
+        responsáveis ficam em self.failed_assumptions.
+
+        max_conflicts e time_limit (segundos) limitam a busca; esgotado o
+        orçamento, retorna None.
+        """
+        self.model = []
+        self.failed_assumptions = []
+        assumptions = [to_literal(dimacs) for dimacs in assumptions]
+        for literal in assumptions:
+            self.ensure_vars(literal >> 1)
+        if not self.ok:
+            return False
+        self._cancel_until(0)
+        if self._propagate() != -1:
+            self.ok = False
+            return False
+
+        deadline = time.monotonic() + time_limit if time_limit is not None else None
+        conflicts = 0
+        restarts = 0
+        restart_limit = luby(restarts) * self.restart_base
+        conflicts_since_restart = 0
+        self.max_learnts = max(self.max_learnts, self.num_clauses / 3.0, 1000.0)
+
+        while True:
+            conflict = self._propagate()
+            if conflict != -1:
+                conflicts += 1
+                conflicts_since_restart += 1
+                self.stats["conflicts"] += 1
+                if not self.trail_lim:
+                    self.ok = False
+                    return False
+
+                learnt, backtrack_level, lbd = self._analyze(conflict)
+                self._cancel_until(backtrack_level)
+                if len(learnt) == 1:
+                    self._enqueue(learnt[0], -1)
+                else:
+                    index = self._attach(learnt, learnt=True, lbd=lbd)
+                    self._bump_clause(index)
+                    self._enqueue(learnt[0], index)
+
+                self.var_inc /= self.var_decay
+                self.clause_inc /= self.clause_decay
+
+                if max_conflicts is not None and conflicts >= max_conflicts:
+                    self._cancel_until(0)
+                    return None
+                if deadline is not None and time.monotonic() > deadline:
+                    self._cancel_until(0)
+                    return None
+                continue
+
+            if conflicts_since_restart >= restart_limit:
+                restarts += 1
+                self.stats["restarts"] += 1
+                conflicts_since_restart = 0
+                restart_limit = luby(restarts) * self.restart_base
+                self._cancel_until(0)
+                continue
+
+            if self.num_learnts - len(self.trail) >= self.max_learnts:
+                self._reduce_db()
+                self.max_learnts *= 1.1
+
+            literal = -1
+            while len(self.trail_lim) < len(assumptions):
+                assumption = assumptions[len(self.trail_lim)]
+                if self.value[assumption] == TRUE:
+                    self.trail_lim.append(len(self.trail))  # nível vazio
+                elif self.value[assumption] == FALSE:
+                    self.failed_assumptions = self._analyze_final(assumption ^ 1)
+                    self._cancel_until(0)
+                    return False
+                else:
+                    literal = assumption
+                    break
+
+            if literal == -1:
+                literal = self._pick_branch_literal()
+            if literal == -1:
+                self.model = [
+                    var if self.value[var << 1] == TRUE else -var
+                    for var in range(1, self.num_vars + 1)
+                ]
+                self._cancel_until(0)
+                return True
+
+            self.stats["decisions"] += 1
+            self.trail_lim.append(len(self.trail))
+            self._enqueue(literal, -1)
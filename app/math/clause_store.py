@@ -0,0 +1,210 @@
+from array import array
+from typing import Iterable, Iterator, List, Sequence, Tuple
+import numpy as np
+
+# Número de bits 1 em cada byte, para popcount vetorizado
+POPCOUNT_TABLE = np.array([bin(byte).count("1") for byte in range(256)], np.uint8)
+
+
+def popcount_rows(words: np.ndarray) -> np.ndarray:
+    """
+    Conta os bits 1 de cada linha de uma matriz de palavras uint64
+    """
+    if words.size == 0:
+        return np.zeros(words.shape[0], dtype=np.int64)
+    as_bytes = np.ascontiguousarray(words).view(np.uint8)
+    return POPCOUNT_TABLE[as_bytes].sum(axis=1, dtype=np.int64)
+
+
+def pack_assignment(values: Sequence[int], num_vars: int) -> np.ndarray:
+    """
+    Empacota uma atribuição em palavras uint64 (bit v - 1 = valor de v)
+
+    values pode ser um modelo DIMACS (±v) ou uma sequência 0/1 indexada a
+    partir da variável 1.
+    """
+    bits = np.zeros(num_vars, dtype=np.uint8)
+    values = np.asarray(values, dtype=np.int64)
+    if values.size:
+        if values.min() < 0 or values.max() > 1:
+            positive = values[values > 0]
+            bits[positive - 1] = 1
+        else:
+            bits[: len(values)] = values
+    padded = np.zeros(((num_vars + 63) // 64) * 64, dtype=np.uint8)
+    padded[:num_vars] = bits
+    return np.packbits(padded, bitorder="little").view(np.uint64)
+
+
+class ClauseStore:
+    """
+    Base compacta de cláusulas do modelo k-SAT
+
+    As cláusulas são acumuladas em arrays de literais no formato CSR
+    (literais int32 + offsets), com memória proporcional ao número total de
+    literais, isto é, ao número de votos do mercado. Na verificação, cláusulas
+    largas o suficiente (como as cláusulas de métrica, de largura igual ao
+    número de votantes) são convertidas em bitsets uint64 de literais positivos
+    e negativos, avaliados com AND + popcount; as demais são avaliadas
+    diretamente sobre o CSR.
+
+    Os solvers trabalham sobre os mesmos arrays: LocalSearchSolver e
+    SurveyPropagation leem literals/offsets e as listas de ocorrência de
+    occurrences() sem materializar as cláusulas, e Preprocessor.run() devolve
+    um ClauseStore. O CDCLSolver carrega as cláusulas direto destes arrays
+    para a sua própria base CSR (literais na codificação interna,
+    reordenados pelos vigias).
+    """
+
+    def __init__(self, clauses: Iterable[Iterable[int]] = ()):
+        self.num_vars = 0
+        self.literals = array("i")
+        self.offsets = array("q", [0])
+        self._packed = None
+        for clause in clauses:
+            self.append(clause)
+
+    def append(self, clause: Iterable[int]):
+        """
+        Acrescenta uma cláusula DIMACS (literais repetidos são descartados)
+        """
+        clause = list(dict.fromkeys(clause))
+        self.literals.extend(clause)
+        self.offsets.append(len(self.literals))
+        if clause:
+            self.num_vars = max(self.num_vars, max(abs(literal) for literal in clause))
+        self._packed = None
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> List[int]:
+        if index < 0:
+            index += len(self)
+        return self.literals[self.offsets[index] : self.offsets[index + 1]].tolist()
+
+    def __iter__(self) -> Iterator[List[int]]:
+        literals = self.literals
+        offsets = self.offsets
+        for index in range(len(self)):
+            yield literals[offsets[index] : offsets[index + 1]].tolist()
+
+    def occurrences(self, num_vars: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Listas de ocorrência dos literais, também em CSR
+
+        O literal v ocupa o slot 2v e ¬v o slot 2v + 1; as cláusulas que
+        contêm o literal do slot s são clause_ids[starts[s] : starts[s + 1]],
+        em ordem crescente.
+
+        Retorna: (starts, clause_ids)
+        """
+        literals = np.frombuffer(self.literals, dtype=np.int32).astype(np.int64)
+        lengths = np.diff(np.frombuffer(self.offsets, dtype=np.int64))
+        slots = 2 * np.abs(literals) + (literals < 0)
+        counts = np.bincount(slots, minlength=2 * max(num_vars, self.num_vars) + 2)
+        starts = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=starts[1:])
+        clause_ids = np.repeat(np.arange(len(lengths)), lengths)
+        return starts, clause_ids[np.argsort(slots, kind="stable")]
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memória ocupada pelos literais e offsets (sem a forma empacotada)
+        """
+        return self.literals.itemsize * len(
+            self.literals
+        ) + self.offsets.itemsize * len(self.offsets)
+
+    def _pack(self):
+        """
+        Separa as cláusulas em CSR (estreitas) e bitsets uint64 (largas)
+
+        Uma cláusula vira bitset quando seus literais em int32 ocupariam mais
+        memória que as duas linhas de palavras (positivos e negativos).
+        """
+        if self._packed is not None:
+            return self._packed
+
+        literals = np.frombuffer(self.literals, dtype=np.int32)
+        offsets = np.frombuffer(self.offsets, dtype=np.int64)
+        lengths = np.diff(offsets)
+        words = max(1, (self.num_vars + 63) // 64)
+        wide = lengths * 4 > 2 * words * 8
+
+        clause_ids = np.repeat(np.arange(len(lengths)), lengths)
+        narrow_literal = ~wide[clause_ids]
+        narrow_literals = literals[narrow_literal]
+        narrow_clause_ids = clause_ids[narrow_literal]
+
+        wide_ids = np.flatnonzero(wide)
+        positive = np.zeros((len(wide_ids), words), dtype=np.uint64)
+        negative = np.zeros((len(wide_ids), words), dtype=np.uint64)
+        for row, index in enumerate(wide_ids):
+            clause = literals[offsets[index] : offsets[index + 1]]
+            for target, chosen in (
+                (positive, clause[clause > 0]),
+                (negative, -clause[clause < 0]),
+            ):
+                bits = chosen.astype(np.int64) - 1
+                np.bitwise_or.at(
+                    target[row],
+                    bits >> 6,
+                    np.left_shift(np.uint64(1), (bits & 63).astype(np.uint64)),
+                )
+
+        self._packed = (
+            narrow_literals,
+            narrow_clause_ids,
+            wide_ids,
+            positive,
+            negative,
+            len(lengths),
+        )
+        return self._packed
+
+    def true_literal_counts(self, assignment: np.ndarray) -> np.ndarray:
+        """
+        Número de literais verdadeiros de cada cláusula sob a atribuição
+
+        assignment são as palavras uint64 produzidas por pack_assignment.
+        """
+        (
+            narrow_literals,
+            narrow_clause_ids,
+            wide_ids,
+            positive,
+            negative,
+            count,
+        ) = self._pack()
+        words = max(1, (self.num_vars + 63) // 64)
+        padded = np.zeros(words, dtype=np.uint64)
+        assignment = np.asarray(assignment, dtype=np.uint64)[:words]
+        padded[: len(assignment)] = assignment
+        assignment = padded
+
+        variables = np.abs(narrow_literals).astype(np.int64) - 1
+        bits = (
+            assignment[variables >> 6] >> (variables & 63).astype(np.uint64)
+        ) & np.uint64(1)
+        is_true = (bits == 1) == (narrow_literals > 0)
+        counts = np.bincount(narrow_clause_ids, weights=is_true, minlength=count)
+        counts = counts.astype(np.int64)
+
+        if len(wide_ids):
+            true_bits = (positive & assignment) | (negative & ~assignment)
+            counts[wide_ids] = popcount_rows(true_bits)
+        return counts
+
+    def unsatisfied(self, assignment: np.ndarray) -> np.ndarray:
+        """
+        Índices das cláusulas falsas sob a atribuição
+        """
+        return np.flatnonzero(self.true_literal_counts(assignment) == 0)
+
+    def is_satisfied_by(self, assignment: np.ndarray) -> bool:
+        """
+        Verifica se a atribuição satisfaz todas as cláusulas
+        """
+        return len(self.unsatisfied(assignment)) == 0
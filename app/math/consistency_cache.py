@@ -0,0 +1,176 @@
+import copy
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple, Union
+from app.math.ksat import KSatInstance
+from uuid import UUID
+
+# Status definitivos (os demais dependem do orçamento da busca)
+CACHEABLE_STATUSES = ("sat", "unsat", "no_metrics")
+
+CacheEntry = Tuple[bool, Dict[str, Any], int]
+
+
+def instance_digest(instance: KSatInstance) -> str:
+    """
+    Digest canônico do conjunto de cláusulas de uma instância
+
+    Cada literal é escrito pelo rótulo da variável (e não pelo número, que
+    depende da ordem das consultas); literais e cláusulas são ordenados antes
+    do hash, de modo que o digest depende apenas do conjunto de votos e
+    métricas do mercado.
+    """
+    names = [None] + [
+        "/".join(str(part) for part in label) for label in instance.labels[1:]
+    ]
+    clauses = sorted(
+        " ".join(
+            sorted(
+                ("-" if literal < 0 else "+") + names[abs(literal)]
+                for literal in clause
+            )
+        )
+        for clause in instance.clauses
+    )
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(f"metrics={instance.metric_count}\n".encode())
+    for clause in clauses:
+        digest.update(clause.encode())
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+class ConsistencyCache:
+    """
+    Cache LRU de resultados de consistência k-SAT
+
+    Os resultados são indexados pelo digest canônico da instância e pelo
+    modo da verificação ("full", "local"), e cada mercado aponta, em cada
+    modo, para o digest da sua última verificação. Enquanto o mercado não é
+    invalidado (novo voto ou nova métrica), lookup() responde em O(1) sem
+    consultar o banco; depois da invalidação o resultado ainda é
+    reaproveitado se a instância reconstruída tiver o mesmo digest. Um
+    resultado nunca responde por outro modo: os detalhes (mode, estatísticas
+    do solver) são os da busca que o produziu.
+
+    Limites: max_entries resultados e max_bytes de detalhes serializados.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 4 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # (digest, modo) → (is_consistent, detalhes, bytes)
+        self.entries: "OrderedDict[Tuple[str, str], CacheEntry]" = OrderedDict()
+        # mercado → {modo: digest}
+        self.market_digests: Dict[str, Dict[str, str]] = {}
+        self.generations: Dict[str, int] = {}
+        self.nbytes = 0
+        self.lock = threading.Lock()
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def _hit(self, key: Tuple[str, str]) -> Tuple[bool, Dict[str, Any]]:
+        self.entries.move_to_end(key)
+        self.stats["hits"] += 1
+        is_consistent, details, _ = self.entries[key]
+        digest = key[0]
+        details = copy.deepcopy(details)
+        details["cached"] = True
+        details["digest"] = digest
+        return is_consistent, details
+
+    def lookup(
+        self, market_id: Union[str, UUID], mode: str
+    ) -> Optional[Tuple[bool, Dict[str, Any]]]:
+        """
+        Resultado do mercado no modo se ele não mudou desde a última verificação
+        """
+        with self.lock:
+            digest = self.market_digests.get(str(market_id), {}).get(mode)
+            if digest is None or (digest, mode) not in self.entries:
+                self.stats["misses"] += 1
+                return None
+            return self._hit((digest, mode))
+
+    def generation(self, market_id: Union[str, UUID]) -> int:
+        """
+        Número de invalidações do mercado, lido antes de construir a instância
+        """
+        with self.lock:
+            return self.generations.get(str(market_id), 0)
+
+    def _bind(self, market_id: str, digest: str, mode: str, generation: Optional[int]):
+        # Um voto gravado durante a verificação torna o digest obsoleto
+        if generation is None or self.generations.get(market_id, 0) == generation:
+            self.market_digests.setdefault(market_id, {})[mode] = digest
+
+    def lookup_digest(
+        self,
+        market_id: Union[str, UUID],
+        digest: str,
+        mode: str,
+        generation: Optional[int] = None,
+    ) -> Optional[Tuple[bool, Dict[str, Any]]]:
+        """
+        Resultado de uma instância já construída no modo, pelo seu digest
+        """
+        with self.lock:
+            if (digest, mode) not in self.entries:
+                self.stats["misses"] += 1
+                return None
+            self._bind(str(market_id), digest, mode, generation)
+            return self._hit((digest, mode))
+
+    def store(
+        self,
+        market_id: Union[str, UUID],
+        digest: str,
+        mode: str,
+        is_consistent: bool,
+        details: Dict[str, Any],
+        generation: Optional[int] = None,
+    ):
+        """
+        Guarda um resultado definitivo (sat, unsat ou no_metrics)
+
+        generation é o valor de generation() lido antes de construir a
+        instância; se o mercado foi invalidado desde então, o resultado fica
+        disponível pelo digest mas não é associado ao mercado.
+        """
+        if details.get("status") not in CACHEABLE_STATUSES:
+            return
+        size = len(json.dumps(details, default=str))
+        if size > self.max_bytes:
+            return
+        key = (digest, mode)
+        with self.lock:
+            if key in self.entries:
+                self.nbytes -= self.entries.pop(key)[2]
+            self.entries[key] = (is_consistent, copy.deepcopy(details), size)
+            self.nbytes += size
+            self._bind(str(market_id), digest, mode, generation)
+            while len(self.entries) > self.max_entries or self.nbytes > self.max_bytes:
+                _, (_, _, evicted_size) = self.entries.popitem(last=False)
+                self.nbytes -= evicted_size
+                self.stats["evictions"] += 1
+
+    def invalidate(self, market_id: Union[str, UUID] = None):
+        """
+        Esquece os digests atuais de um mercado (ou de todos), em todos os modos
+
+        Os resultados continuam no LRU, indexados por (digest, modo).
+        """
+        with self.lock:
+            if market_id is None:
+                self.market_digests.clear()
+                for key in self.generations:
+                    self.generations[key] += 1
+            else:
+                market_id = str(market_id)
+                self.market_digests.pop(market_id, None)
+                self.generations[market_id] = self.generations.get(market_id, 0) + 1
+
+
+# Cache compartilhado do processo
+consistency_cache = ConsistencyCache()
@@ -0,0 +1,152 @@
+from typing import Dict, Hashable, List, Optional, TextIO, Tuple
+from app.math.clause_store import pack_assignment
+from app.math.ksat import KSatInstance
+
+# Status do formato de saída das competições SAT ("s ...")
+SOLUTION_STATUS = {
+    True: "SATISFIABLE",
+    False: "UNSATISFIABLE",
+    None: "UNKNOWN",
+}
+
+
+def _format_label(label: Hashable) -> str:
+    return " ".join(str(part) for part in label)
+
+
+def _parse_label(parts: List[str]) -> Tuple:
+    # Índices de seletores são inteiros; ids de entidades permanecem strings
+    return tuple(int(part) if part.isdigit() else part for part in parts)
+
+
+def write_dimacs(instance: KSatInstance, stream: TextIO):
+    """
+    Escreve a instância em DIMACS CNF
+
+    O cabeçalho de comentários guarda o mercado, os rótulos das variáveis
+    ("c var v kind id") e a origem de cada cláusula ("c origin kind id", na
+    ordem das cláusulas), de modo que read_dimacs reconstrói a instância.
+    Solvers externos ignoram esses comentários.
+    """
+    stream.write(f"c market {instance.market_id}\n")
+    stream.write(f"c metrics {instance.metric_count}\n")
+    stream.write(f"c votes {instance.vote_count}\n")
+    for var in range(1, instance.num_vars + 1):
+        stream.write(f"c var {var} {_format_label(instance.labels[var])}\n")
+    for kind, entity_id in instance.clause_origins:
+        stream.write(f"c origin {kind} {entity_id}\n")
+    stream.write(f"p cnf {instance.num_vars} {len(instance.clauses)}\n")
+    for clause in instance.clauses:
+        stream.write(" ".join(map(str, clause)) + " 0\n")
+
+
+def read_dimacs(stream: TextIO) -> KSatInstance:
+    """
+    Lê um arquivo DIMACS CNF (exportado por write_dimacs ou não)
+
+    Sem os comentários de rótulos as variáveis recebem rótulos ("var", v) e
+    as cláusulas origem ("clause", índice).
+    """
+    instance = KSatInstance()
+    labels: Dict[int, Tuple] = {}
+    origins: List[Tuple[str, str]] = []
+    declared_vars = 0
+    pending: List[int] = []
+    clauses: List[List[int]] = []
+
+    for line in stream:
+        line = line.strip()
+        if not line or line.startswith("%"):
+            continue
+        if line.startswith("c"):
+            parts = line.split()
+            if len(parts) < 3:
+                continue
+            if parts[1] == "market":
+                instance.market_id = parts[2]
+            elif parts[1] == "metrics":
+                instance.metric_count = int(parts[2])
+            elif parts[1] == "votes":
+                instance.vote_count = int(parts[2])
+            elif parts[1] == "var" and len(parts) >= 4:
+                labels[int(parts[2])] = _parse_label(parts[3:])
+            elif parts[1] == "origin" and len(parts) >= 4:
+                origins.append((parts[2], parts[3]))
+            continue
+        if line.startswith("p"):
+            parts = line.split()
+            if len(parts) != 4 or parts[1] != "cnf":
+                raise ValueError(f"Cabeçalho DIMACS inválido: {line}")
+            declared_vars = int(parts[2])
+            continue
+        for token in line.split():
+            literal = int(token)
+            if literal == 0:
+                clauses.append(pending)
+                pending = []
+            else:
+                pending.append(literal)
+    if pending:
+        clauses.append(pending)
+
+    num_vars = max(
+        [declared_vars] + [abs(literal) for clause in clauses for literal in clause]
+    )
+    for var in range(1, num_vars + 1):
+        instance.variable(labels.get(var, ("var", var)))
+    if len(origins) != len(clauses):
+        origins = [("clause", str(index)) for index in range(len(clauses))]
+    for clause, origin in zip(clauses, origins):
+        instance.add_clause(clause, origin)
+    if instance.market_id is None:
+        # Instância externa: toda cláusula conta como restrição a verificar
+        instance.metric_count = max(instance.metric_count, 1)
+    return instance
+
+
+def write_solution(stream: TextIO, satisfiable: Optional[bool], model: List[int]):
+    """
+    Escreve o resultado no formato das competições SAT ("s ..." e "v ... 0")
+    """
+    stream.write(f"s {SOLUTION_STATUS[satisfiable]}\n")
+    if satisfiable:
+        for start in range(0, len(model), 20):
+            stream.write("v " + " ".join(map(str, model[start : start + 20])) + "\n")
+        stream.write("v 0\n")
+
+
+def read_solution(stream: TextIO) -> Tuple[Optional[bool], List[int]]:
+    """
+    Lê um resultado no formato das competições SAT
+
+    Retorna: (satisfiable — True, False ou None —, modelo DIMACS)
+    """
+    statuses = {name: value for value, name in SOLUTION_STATUS.items()}
+    satisfiable = None
+    model: List[int] = []
+    for line in stream:
+        parts = line.split()
+        if not parts:
+            continue
+        if parts[0] == "s":
+            satisfiable = statuses.get(" ".join(parts[1:]))
+        elif parts[0] == "v":
+            model.extend(int(token) for token in parts[1:] if token != "0")
+    return satisfiable, model
+
+
+def load_assignment(instance: KSatInstance, model: List[int]) -> Dict[Hashable, bool]:
+    """
+    Valida um modelo contra a instância e o traduz para {rótulo: valor}
+
+    Retorna: atribuição por rótulo (ValueError se o modelo não a satisfaz)
+    """
+    assignment = pack_assignment(model, instance.num_vars)
+    unsatisfied = instance.clauses.unsatisfied(assignment)
+    if len(unsatisfied):
+        kind, entity_id = instance.clause_origins[unsatisfied[0]]
+        raise ValueError(
+            f"Modelo não satisfaz {len(unsatisfied)} cláusulas "
+            f"(primeira: {kind} {entity_id})"
+        )
+    return instance.decode(model)
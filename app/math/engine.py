@@ -1,11 +1,29 @@
 import numpy as np
-from typing import List, Tuple, Union
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 from app.models.database import MetricValue, DataPoint, Metric
+from sqlalchemy import func, or_
+from app.math.aggregates import load_metric_aggregates
+from app.math.beta_optimizer import fit_beta, fit_beta_batch
+from app.math.consistency_cache import consistency_cache, instance_digest
+from app.math.incremental import get_market_solver
+from app.math.ksat import build_market_instance, solve_instance
+from app.math.model_count import MODEL_COUNT_TIME_LIMIT, score_instance
+from app.math.snapshot import MetricSnapshot, SNAPSHOT_CACHE_KEY
+from app.math.softmin import ArrayLike, softmin
+from app.math.unsat_core import (
+    discard_market_core,
+    extract_core,
+    get_market_core,
+    store_market_core,
+)
 from sqlalchemy.orm import Session
-import math
 from datetime import datetime
+import time
 from uuid import UUID
 
+# Modos aceitos por solve_ksat_consistency
+CONSISTENCY_MODES = ("full", "incremental", "local", "approx")
+
 
 class MathematicalEngine:
     def __init__(self, db: Session):
@@ -16,8 +34,10 @@ class MathematicalEngine:
         Calcula o softmin de dois valores com parâmetro beta
 
         softmin(x, y) = -log(exp(-βx) + exp(-βy)) / β
+
+        Calculado via logsumexp, sem overflow para β * x grandes.
         """
-        return -math.log(math.exp(-beta * x) + math.exp(-beta * y)) / beta
+        return softmin(x, y, beta=beta)
 
     def calculate_data_point_participation(
         self, data_point_id: Union[str, UUID]
@@ -26,17 +46,30 @@ class MathematicalEngine:
         Calcula a taxa de participação para um dado específico
 
         participação_k = (# votos 1) / (total de votos)
-        """
-        from app.models.database import Vote
 
-        votes = (
-            self.db.query(Vote).filter(Vote.data_point_id == str(data_point_id)).all()
+        Os dois contadores ficam em data_points e são atualizados junto com a
+        inserção de cada voto, então basta ler uma linha.
+        """
+        counters = (
+            self.db.query(DataPoint.positive_votes, DataPoint.total_votes)
+            .filter(DataPoint.id == str(data_point_id))
+            .first()
         )
-        if not votes:
+        if not counters:
             return 0.0
+        return self.calculate_participation_rate(
+            counters.positive_votes, counters.total_votes
+        )
 
-        positive_votes = sum(1 for vote in votes if vote.is_reliable)
-        return positive_votes / len(votes)
+    def calculate_participation_rate(
+        self, positive_votes: int, total_votes: int
+    ) -> float:
+        """
+        participação_k = (# votos 1) / (total de votos), 0 sem votos
+        """
+        if not total_votes:
+            return 0.0
+        return positive_votes / total_votes
 
     def calculate_data_point_latency(
         self, participation_rate: float, time_horizon: int
@@ -48,55 +81,70 @@ class MathematicalEngine:
         """
         return participation_rate * time_horizon
 
-    def calculate_metric_latency(self, metric_id: Union[str, UUID]) -> float:
+    def get_metric_snapshot(self, metric_id: Union[str, UUID]) -> MetricSnapshot:
         """
-        Calcula a latência de uma métrica como média ponderada das latências dos dados
+        Retorna a fotografia dos dados confiáveis de uma métrica
 
-        latency_j = Σ (peso_k * latency_k)
+        As fotografias ficam em Session.info, de modo que todos os motores (e
+        portanto CalculationService e VoteService) que usam a mesma sessão
+        compartilham uma única leitura por métrica durante a requisição.
         """
-        data_points = (
-            self.db.query(DataPoint)
-            .filter(
-                DataPoint.metric_id == str(metric_id), DataPoint.is_reliable == True
-            )
-            .all()
-        )
-
-        if not data_points:
-            return 0.0
-
-        total_size = sum(abs(float(dp.value)) for dp in data_points)
-        if total_size == 0:
-            return 0.0
+        metric_id_str = str(metric_id)
+        snapshots = self.db.info.setdefault(SNAPSHOT_CACHE_KEY, {})
+        snapshot = snapshots.get(metric_id_str)
+        if snapshot is None:
+            snapshot = MetricSnapshot.load(self.db, metric_id_str)
+            snapshots[metric_id_str] = snapshot
+        return snapshot
+
+    def load_metric_snapshots(
+        self, metric_ids: Sequence[Union[str, UUID]]
+    ) -> Dict[str, MetricSnapshot]:
+        """
+        Pré-carrega em uma única consulta as fotografias que ainda não estão em cache
+        """
+        snapshots = self.db.info.setdefault(SNAPSHOT_CACHE_KEY, {})
+        missing = [str(mid) for mid in metric_ids if str(mid) not in snapshots]
+        if missing:
+            snapshots.update(MetricSnapshot.load_many(self.db, missing))
+        return {str(mid): snapshots[str(mid)] for mid in metric_ids}
 
-        weighted_latency = 0.0
-        for dp in data_points:
-            weight = abs(float(dp.value)) / total_size
-            weighted_latency += weight * float(dp.latency)
+    def invalidate_metric_snapshot(self, metric_id: Union[str, UUID] = None):
+        """
+        Descarta a fotografia de uma métrica (ou todas) após mudança nos dados
+        """
+        snapshots = self.db.info.setdefault(SNAPSHOT_CACHE_KEY, {})
+        if metric_id is None:
+            snapshots.clear()
+        else:
+            snapshots.pop(str(metric_id), None)
+
+    def calculate_metric_latency(
+        self, metric_id: Union[str, UUID], snapshot: MetricSnapshot = None
+    ) -> float:
+        """
+        Calcula a latência de uma métrica como média ponderada das latências dos dados
 
-        return weighted_latency
+        latency_j = Σ (peso_k * latency_k)
+        """
+        if snapshot is None:
+            snapshot = self.get_metric_snapshot(metric_id)
+        return snapshot.latency()
 
-    def calculate_metric_mu(self, metric_id: Union[str, UUID]) -> float:
+    def calculate_metric_mu(
+        self, metric_id: Union[str, UUID], snapshot: MetricSnapshot = None
+    ) -> float:
         """
         Calcula o valor μ_j como a média dos dados confiáveis
 
         μ_j = média(D_k confiáveis)
         """
-        data_points = (
-            self.db.query(DataPoint)
-            .filter(
-                DataPoint.metric_id == str(metric_id), DataPoint.is_reliable == True
-            )
-            .all()
-        )
-
-        if not data_points:
-            return 0.0
-
-        return sum(float(dp.value) for dp in data_points) / len(data_points)
+        if snapshot is None:
+            snapshot = self.get_metric_snapshot(metric_id)
+        return snapshot.mu()
 
     def calculate_metric_value(
-        self, metric_id: Union[str, UUID]
+        self, metric_id: Union[str, UUID], snapshot: MetricSnapshot = None
     ) -> Tuple[float, float, float, float]:
         """
         Calcula o valor completo de uma métrica
@@ -105,16 +153,23 @@ class MathematicalEngine:
 
         Retorna: (mu, latency, value, error)
         """
-        mu = self.calculate_metric_mu(metric_id)
-        latency = self.calculate_metric_latency(metric_id)
+        if snapshot is None:
+            snapshot = self.get_metric_snapshot(metric_id)
+        mu = self.calculate_metric_mu(metric_id, snapshot)
+        latency = self.calculate_metric_latency(metric_id, snapshot)
         value = mu * latency
 
         # Calcular erro comparando com valores observados reais
-        error = self.calculate_metric_error(metric_id, mu)
+        error = self.calculate_metric_error(metric_id, mu, snapshot)
 
         return mu, latency, value, error
 
-    def calculate_metric_error(self, metric_id: Union[str, UUID], mu: float) -> float:
+    def calculate_metric_error(
+        self,
+        metric_id: Union[str, UUID],
+        mu: float,
+        snapshot: MetricSnapshot = None,
+    ) -> float:
         """
         Calcula o erro da métrica
 
@@ -122,81 +177,321 @@ class MathematicalEngine:
 
         O valor real observado é derivado de dados que permaneceram confiáveis até T
         """
-        data_points = (
-            self.db.query(DataPoint)
+        if snapshot is None:
+            snapshot = self.get_metric_snapshot(metric_id)
+        return snapshot.error(mu)
+
+    def calculate_metric_values_from_aggregates(
+        self, metric_ids: Sequence[Union[str, UUID]]
+    ) -> Dict[str, Tuple[float, float, float, float]]:
+        """
+        Calcula os valores das métricas a partir de metric_aggregates
+
+        μ_j = Σ D_k / n_j
+        latency_j = Σ |D_k| * latency_k / Σ |D_k|
+        erro_j = |μ_j - média(D_k não expirados)|
+
+        μ_j e latency_j saem dos agregados em O(1). A expiração depende do
+        relógio e não de uma escrita, então a média dos dados não expirados
+        vem de uma única agregação no banco, sem carregar os dados.
+
+        Retorna: {metric_id: (mu, latency, value, error)}
+        """
+        ids = [str(metric_id) for metric_id in metric_ids]
+        if not ids:
+            return {}
+
+        aggregates = load_metric_aggregates(self.db, ids)
+        current_time = datetime.utcnow()
+        observed = {
+            str(metric_id): mean
+            for metric_id, mean in self.db.query(
+                DataPoint.metric_id, func.avg(DataPoint.value)
+            )
             .filter(
-                DataPoint.metric_id == str(metric_id), DataPoint.is_reliable == True
+                DataPoint.metric_id.in_(ids),
+                DataPoint.is_reliable == True,
+                or_(
+                    DataPoint.reliability_expiration == None,
+                    DataPoint.reliability_expiration > current_time,
+                ),
             )
+            .group_by(DataPoint.metric_id)
+            .all()
+        }
+
+        results = {}
+        for metric_id in ids:
+            aggregate = aggregates[metric_id]
+            count = aggregate.reliable_count
+            abs_value_sum = float(aggregate.abs_value_sum)
+            mu = float(aggregate.value_sum) / count if count else 0.0
+            latency = (
+                float(aggregate.weighted_latency_sum) / abs_value_sum
+                if abs_value_sum
+                else 0.0
+            )
+            mean = observed.get(metric_id)
+            error = abs(mu - float(mean)) if mean is not None else 0.0
+            results[metric_id] = (mu, latency, mu * latency, error)
+        return results
+
+    def calculate_metric_value_from_aggregate(
+        self, metric_id: Union[str, UUID]
+    ) -> Tuple[float, float, float, float]:
+        """
+        Versão de calculate_metric_value sobre os agregados correntes
+
+        Retorna: (mu, latency, value, error)
+        """
+        return self.calculate_metric_values_from_aggregates([metric_id])[str(metric_id)]
+
+    def calculate_metric_values_batch(
+        self, metric_ids: Sequence[Union[str, UUID]], beta: float = 1.0
+    ) -> Dict[str, Tuple[float, float, float, float, float]]:
+        """
+        Calcula os valores de várias métricas de uma só vez
+
+        Carrega todos os dados confiáveis das métricas em uma única consulta e
+        aplica as mesmas fórmulas de calculate_metric_value com reduções
+        agrupadas em arrays NumPy:
+
+        μ_j = Σ D_k / n_j
+        latency_j = Σ |D_k| * latency_k / Σ |D_k|
+        erro_j = |μ_j - média(D_k não expirados)|
+        metric_j = softmin(μ_j * latency_j, erro_j)
+
+        Retorna: {metric_id: (mu, latency, value, error, penalized_value)}
+        """
+        ids = [str(metric_id) for metric_id in metric_ids]
+        if not ids:
+            return {}
+
+        position = {metric_id: i for i, metric_id in enumerate(ids)}
+        rows = (
+            self.db.query(
+                DataPoint.metric_id,
+                DataPoint.value,
+                DataPoint.latency,
+                DataPoint.reliability_expiration,
+            )
+            .filter(DataPoint.metric_id.in_(ids), DataPoint.is_reliable == True)
             .all()
         )
 
-        # Filtrar dados que ainda são confiáveis (não expiraram)
+        size = len(ids)
         current_time = datetime.utcnow()
-        reliable_data_points = []
-        for dp in data_points:
-            if (
-                dp.reliability_expiration is None
-                or dp.reliability_expiration > current_time
-            ):
-                reliable_data_points.append(dp)
-
-        if not reliable_data_points:
-            return 0.0
+        index = np.fromiter(
+            (position[str(row[0])] for row in rows), dtype=np.intp, count=len(rows)
+        )
+        values = np.fromiter(
+            (float(row[1]) for row in rows), dtype=np.float64, count=len(rows)
+        )
+        latencies = np.fromiter(
+            (float(row[2] or 0.0) for row in rows), dtype=np.float64, count=len(rows)
+        )
+        alive = np.fromiter(
+            (row[3] is None or row[3] > current_time for row in rows),
+            dtype=bool,
+            count=len(rows),
+        )
+
+        sizes = np.abs(values)
+        counts = np.bincount(index, minlength=size)
+        sums = np.bincount(index, weights=values, minlength=size)
+        size_sums = np.bincount(index, weights=sizes, minlength=size)
+        weighted_latencies = np.bincount(
+            index, weights=sizes * latencies, minlength=size
+        )
+        alive_counts = np.bincount(index[alive], minlength=size)
+        alive_sums = np.bincount(index[alive], weights=values[alive], minlength=size)
+
+        mu = np.divide(sums, counts, out=np.zeros(size), where=counts > 0)
+        latency = np.divide(
+            weighted_latencies, size_sums, out=np.zeros(size), where=size_sums > 0
+        )
+        observed = np.divide(
+            alive_sums, alive_counts, out=np.zeros(size), where=alive_counts > 0
+        )
+        error = np.where(alive_counts > 0, np.abs(mu - observed), 0.0)
+        value = mu * latency
+        penalized = softmin(value, error, beta=beta)
+
+        return {
+            metric_id: (
+                float(mu[i]),
+                float(latency[i]),
+                float(value[i]),
+                float(error[i]),
+                float(penalized[i]),
+            )
+            for i, metric_id in enumerate(ids)
+        }
+
+    def calculate_market_values_batch(
+        self,
+        market_ids: Sequence[Union[str, UUID]],
+        metric_results: Dict[str, Tuple[float, float, float, float, float]] = None,
+        beta: float = 1.0,
+    ) -> Dict[str, float]:
+        """
+        Calcula o valor de vários mercados a partir de uma única leitura das métricas
+
+        V_i = Σ (w_j * metric_j) / Σ w_j
+
+        metric_results pode reaproveitar o resultado de
+        calculate_metric_values_batch; caso contrário ele é calculado aqui.
+        """
+        ids = [str(market_id) for market_id in market_ids]
+        if not ids:
+            return {}
 
-        observed_real_value = sum(float(dp.value) for dp in reliable_data_points) / len(
-            reliable_data_points
+        metrics = (
+            self.db.query(Metric.id, Metric.market_id, Metric.weight)
+            .filter(Metric.market_id.in_(ids))
+            .all()
         )
-        return abs(mu - observed_real_value)
+        if metric_results is None:
+            metric_results = self.calculate_metric_values_batch(
+                [metric_id for metric_id, _, _ in metrics], beta
+            )
+
+        position = {market_id: i for i, market_id in enumerate(ids)}
+        index = np.fromiter(
+            (position[str(market_id)] for _, market_id, _ in metrics),
+            dtype=np.intp,
+            count=len(metrics),
+        )
+        weights = np.fromiter(
+            (float(weight) for _, _, weight in metrics),
+            dtype=np.float64,
+            count=len(metrics),
+        )
+        penalized = np.fromiter(
+            (metric_results[str(metric_id)][4] for metric_id, _, _ in metrics),
+            dtype=np.float64,
+            count=len(metrics),
+        )
+
+        total_values = np.bincount(
+            index, weights=weights * penalized, minlength=len(ids)
+        )
+        total_weights = np.bincount(index, weights=weights, minlength=len(ids))
+        values = np.divide(
+            total_values,
+            total_weights,
+            out=np.zeros(len(ids)),
+            where=total_weights != 0,
+        )
+
+        return {market_id: float(values[i]) for i, market_id in enumerate(ids)}
 
     def apply_softmin_penalty(
-        self, metric_id: Union[str, UUID], beta: float = 1.0
+        self,
+        metric_id: Union[str, UUID],
+        beta: float = 1.0,
+        snapshot: MetricSnapshot = None,
     ) -> float:
         """
         Aplica penalização por divergência usando softmin adaptativo
 
         metric_j = softmin(metric_j, erro_j)
         """
-        mu, latency, value, error = self.calculate_metric_value(metric_id)
+        mu, latency, value, error = self.calculate_metric_value(metric_id, snapshot)
 
         # Aplicar softmin entre o valor atual e o erro
         penalized_value = self.calculate_softmin(value, error, beta)
 
         return penalized_value
 
+    def apply_softmin_penalty_vector(
+        self, metric_ids: Sequence[Union[str, UUID]], beta: ArrayLike = 1.0
+    ) -> np.ndarray:
+        """
+        Aplica a penalização softmin a um vetor de métricas em uma única chamada
+
+        metric_j = softmin(metric_j, erro_j) para todo j
+
+        beta pode ser escalar ou um array com um β por métrica.
+        """
+        if not metric_ids:
+            return np.zeros(0)
+
+        snapshots = self.load_metric_snapshots(metric_ids)
+        results = np.array(
+            [
+                self.calculate_metric_value(metric_id, snapshots[str(metric_id)])
+                for metric_id in metric_ids
+            ]
+        )
+        return np.asarray(softmin(results[:, 2], results[:, 3], beta=beta))
+
     def binary_search_beta(
-        self, metric_id: Union[str, UUID], epsilon: float = 0.01, delta: float = 0.001
+        self,
+        metric_id: Union[str, UUID],
+        epsilon: float = 0.01,
+        delta: float = 0.001,
+        snapshot: MetricSnapshot = None,
     ) -> float:
         """
-        Executa busca binária sobre β para minimizar divergência
+        Executa busca sobre β para minimizar divergência
 
         Objetivo: minimizar divergência entre expectativa agregada e valor real observado
-        Critério de parada: erro residual < δ
+        Critério de parada: erro residual < ε ou passo em β < δ
+        """
+        beta, _ = self.optimize_beta(metric_id, epsilon, delta, snapshot)
+        return beta
+
+    def optimize_beta(
+        self,
+        metric_id: Union[str, UUID],
+        epsilon: float = 1e-9,
+        delta: float = 1e-9,
+        snapshot: MetricSnapshot = None,
+    ) -> Tuple[float, float]:
         """
-        low, high = 0.1, 10.0
-        best_beta = 1.0
-        min_error = float("inf")
+        Ajusta β a partir dos escalares (metric_j, erro_j, μ_j) da métrica
 
-        while high - low > delta:
-            mid = (low + high) / 2
-            penalized_value = self.apply_softmin_penalty(metric_id, mid)
+        Os dados são lidos uma única vez; a busca usa a derivada analítica do
+        softmin e não volta ao banco a cada iteração.
 
-            mu, latency, _, error = self.calculate_metric_value(metric_id)
-            residual_error = abs(penalized_value - mu)  # Simplificação do erro residual
+        Retorna: (beta, erro residual |softmin(metric_j, erro_j) - μ_j|)
+        """
+        mu, _, value, error = self.calculate_metric_value(metric_id, snapshot)
+        return fit_beta(value, error, mu, epsilon, delta)
 
-            if residual_error < min_error:
-                min_error = residual_error
-                best_beta = mid
+    def optimize_market_betas(
+        self, market_id: Union[str, UUID], epsilon: float = 1e-9
+    ) -> Dict[str, Tuple[float, float]]:
+        """
+        Ajusta β para todas as métricas de um mercado de uma só vez
 
-            if residual_error > epsilon:
-                # Se erro ainda grande, ajustar beta
-                if penalized_value > mu:
-                    high = mid
-                else:
-                    low = mid
-            else:
-                break
+        Retorna: {metric_id: (beta, erro residual)}
+        """
+        metric_ids = [
+            str(metric_id)
+            for (metric_id,) in self.db.query(Metric.id)
+            .filter(Metric.market_id == str(market_id))
+            .all()
+        ]
+        if not metric_ids:
+            return {}
+
+        snapshots = self.load_metric_snapshots(metric_ids)
+        results = np.array(
+            [
+                self.calculate_metric_value(metric_id, snapshots[metric_id])
+                for metric_id in metric_ids
+            ]
+        )
+        betas, residuals = fit_beta_batch(
+            results[:, 2], results[:, 3], results[:, 0], epsilon
+        )
 
-        return best_beta
+        return {
+            metric_id: (float(betas[i]), float(residuals[i]))
+            for i, metric_id in enumerate(metric_ids)
+        }
 
     def calculate_market_value(self, market_id: Union[str, UUID]) -> float:
         """
@@ -208,18 +503,63 @@ class MathematicalEngine:
         if not metrics:
             return 0.0
 
-        total_value = 0.0
-        total_weight = 0.0
-
-        for metric in metrics:
-            metric_value = self.apply_softmin_penalty(metric.id)
-            total_value += float(metric.weight) * metric_value
-            total_weight += float(metric.weight)
+        penalized = self.apply_softmin_penalty_vector([metric.id for metric in metrics])
+        weights = np.array([float(metric.weight) for metric in metrics])
 
+        total_weight = weights.sum()
         if total_weight == 0:
             return 0.0
 
-        return total_value / total_weight
+        return float(np.dot(weights, penalized) / total_weight)
+
+    def calculate_market_values_from_aggregates(
+        self, market_ids: Sequence[Union[str, UUID]]
+    ) -> Dict[str, float]:
+        """
+        Versão de calculate_market_value sobre os agregados das métricas
+
+        V_i = Σ (w_j * softmin(metric_j, erro_j)) / Σ w_j
+
+        Uma leitura das métricas e uma dos agregados para todos os mercados.
+
+        Retorna: {market_id: V_i}
+        """
+        ids = [str(market_id) for market_id in market_ids]
+        if not ids:
+            return {}
+
+        metrics = (
+            self.db.query(Metric.id, Metric.market_id, Metric.weight)
+            .filter(Metric.market_id.in_(ids))
+            .all()
+        )
+        results = self.calculate_metric_values_from_aggregates(
+            [metric_id for metric_id, _, _ in metrics]
+        )
+
+        totals = {market_id: 0.0 for market_id in ids}
+        weights = {market_id: 0.0 for market_id in ids}
+        for metric_id, market_id, weight in metrics:
+            _, _, value, error = results[str(metric_id)]
+            totals[str(market_id)] += float(weight) * softmin(value, error, beta=1.0)
+            weights[str(market_id)] += float(weight)
+
+        return {
+            market_id: (
+                totals[market_id] / weights[market_id]
+                if weights[market_id] != 0
+                else 0.0
+            )
+            for market_id in ids
+        }
+
+    def calculate_market_value_from_aggregates(
+        self, market_id: Union[str, UUID]
+    ) -> float:
+        """
+        Versão de calculate_market_value sobre os agregados das métricas
+        """
+        return self.calculate_market_values_from_aggregates([market_id])[str(market_id)]
 
     def calculate_global_currency_value(self) -> float:
         """
@@ -233,6 +573,14 @@ class MathematicalEngine:
         if not active_markets:
             return 0.0
 
+        # Pré-carregar as fotografias de todas as métricas dos mercados ativos
+        metric_ids = (
+            self.db.query(Metric.id)
+            .filter(Metric.market_id.in_([market.id for market in active_markets]))
+            .all()
+        )
+        self.load_metric_snapshots([metric_id for (metric_id,) in metric_ids])
+
         total_value = 0.0
         count = 0
 
@@ -246,6 +594,174 @@ class MathematicalEngine:
 
         return total_value / count
 
+    def solve_ksat_consistency(
+        self,
+        market_id: Union[str, UUID],
+        mode: str = "full",
+        time_limit: Optional[float] = None,
+        max_flips: Optional[int] = None,
+        seed: Optional[int] = None,
+        use_cache: bool = True,
+        score: bool = False,
+        epsilon: float = 0.8,
+        delta: float = 0.2,
+        score_time_limit: Optional[float] = MODEL_COUNT_TIME_LIMIT,
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """
+        Resolve a instância k-SAT de consistência de um mercado
+
+        Modos:
+        - full: CDCL completo sobre a instância reconstruída do banco;
+        - incremental: solver persistente do mercado, que conserva as
+          cláusulas aprendidas entre as verificações;
+        - local: busca local estocástica (probSAT) limitada por time_limit e
+          max_flips; responde "sat" com testemunha ou "unknown";
+        - approx: survey/belief propagation limitada por time_limit; responde
+          sat_probability e as marginais de cada voto, sem prova.
+
+        Com score, details recebe consistency_score: a fração estimada das
+        atribuições de aceitação dos votos que são consistentes (contagem
+        aproximada de modelos com tolerância epsilon e confiança 1 − delta,
+        limitada por score_time_limit).
+
+        Nos modos full e local, resultados definitivos ficam em
+        consistency_cache: um mercado sem votos novos responde sem consultas.
+        Um mercado inconsistente guarda seu núcleo insatisfatível; enquanto
+        nenhuma métrica do núcleo ganhar votos positivos, ele responde sem
+        nova busca.
+
+        Retorna: (is_consistent, detalhes da instância e da busca)
+        """
+        if mode not in CONSISTENCY_MODES:
+            raise ValueError(f"Modo de consistência inválido: {mode}")
+        if mode == "incremental":
+            if score:
+                raise ValueError("score requer os modos full, local ou approx")
+            return get_market_solver(self.db, market_id).solve(time_limit)
+
+        # As marginais do modo aproximado não ficam no cache
+        use_cache = use_cache and mode != "approx"
+        if use_cache and not score:
+            cached = consistency_cache.lookup(market_id, mode)
+            if cached is not None:
+                return cached
+
+        started = time.perf_counter()
+        if mode != "approx" and not score:
+            cached = self._cached_core_result(market_id, mode, started)
+            if cached is not None:
+                return cached
+
+        generation = consistency_cache.generation(market_id)
+        instance = build_market_instance(self.db, market_id)
+        if use_cache:
+            digest = instance_digest(instance)
+            cached = consistency_cache.lookup_digest(
+                market_id, digest, mode, generation
+            )
+            if cached is not None and (not score or "consistency_score" in cached[1]):
+                return cached
+
+        is_consistent, details = solve_instance(
+            instance, mode, time_limit=time_limit, max_flips=max_flips, seed=seed
+        )
+        if details["status"] == "unsat":
+            core = extract_core(instance)
+            if core is not None:
+                store_market_core(core)
+                details["core"] = core.summary()
+        elif details["status"] == "sat":
+            discard_market_core(market_id)
+        if score and details["status"] in ("unsat", "no_metrics"):
+            details.update(consistency_score=0.0, model_count=None)
+        elif score:
+            details.update(
+                score_instance(
+                    instance,
+                    epsilon=epsilon,
+                    delta=delta,
+                    time_limit=score_time_limit,
+                    seed=seed,
+                )
+            )
+        details["elapsed_ms"] = (time.perf_counter() - started) * 1000.0
+        if use_cache:
+            consistency_cache.store(
+                market_id, digest, mode, is_consistent, details, generation
+            )
+        return is_consistent, details
+
+    def verify_vote_consistency(
+        self,
+        market_id: Union[str, UUID],
+        vote_id: Union[str, UUID],
+        user_id: Union[str, UUID],
+        data_point_id: Union[str, UUID],
+        is_reliable: bool,
+        metric_id: Union[str, UUID],
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """
+        Reverifica a consistência do mercado após um novo voto
+
+        O voto é acrescentado ao solver persistente do mercado e a busca parte
+        do estado da verificação anterior.
+        """
+        return self.verify_votes_consistency(
+            market_id, [(vote_id, user_id, data_point_id, is_reliable, metric_id)]
+        )
+
+    def verify_votes_consistency(
+        self,
+        market_id: Union[str, UUID],
+        votes: Sequence[Tuple[Any, Any, Any, bool, Any]],
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """
+        Reverifica a consistência do mercado após um lote de votos
+
+        votes traz tuplas (vote_id, user_id, data_point_id, is_reliable,
+        metric_id); todas entram no solver persistente antes de uma única
+        busca.
+        """
+        started = time.perf_counter()
+        market_solver = get_market_solver(self.db, market_id)
+        for vote in votes:
+            market_solver.add_vote(*vote)
+        cached = self._cached_core_result(market_id, "incremental", started)
+        if cached is not None:
+            return cached
+
+        is_consistent, details = market_solver.solve()
+        if details["status"] == "unsat":
+            core = extract_core(build_market_instance(self.db, market_id))
+            if core is not None:
+                store_market_core(core)
+                details["core"] = core.summary()
+        elif details["status"] == "sat":
+            discard_market_core(market_id)
+        return is_consistent, details
+
+    def _cached_core_result(
+        self, market_id: Union[str, UUID], mode: str, started: float
+    ) -> Optional[Tuple[bool, Dict[str, Any]]]:
+        """
+        Resposta a partir do núcleo insatisfatível guardado, se ainda vale
+
+        Retorna: (False, detalhes) ou None se não há núcleo válido
+        """
+        core = get_market_core(market_id)
+        if core is None:
+            return None
+        if not core.still_holds(self.db):
+            discard_market_core(market_id)
+            return None
+        return False, {
+            "mode": mode,
+            "status": "unsat",
+            "core": core.summary(),
+            "core_cached": True,
+            "elapsed_ms": (time.perf_counter() - started) * 1000.0,
+        }
+
     def check_ksat_consistency(self, market_id: Union[str, UUID]) -> bool:
         """
         Verifica consistência final como problema k-SAT
@@ -254,22 +770,5 @@ class MathematicalEngine:
         Votos são variáveis booleanas
         Existe decidibilidade apenas no nível agregado final
         """
-        from app.models.database import Metric, DataPoint, Vote
-
-        metrics = self.db.query(Metric).filter(Metric.market_id == str(market_id)).all()
-        if not metrics:
-            return False
-
-        # Simplificação: verificamos se todas as métricas têm dados confiáveis
-        # Em um sistema real, isso seria um solver SAT completo
-        for metric in metrics:
-            reliable_data_points = (
-                self.db.query(DataPoint)
-                .filter(DataPoint.metric_id == metric.id, DataPoint.is_reliable == True)
-                .count()
-            )
-
-            if reliable_data_points == 0:
-                return False
-
-        return True
+        is_consistent, _ = self.solve_ksat_consistency(market_id)
+        return is_consistent
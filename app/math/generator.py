@@ -0,0 +1,79 @@
+import random
+import uuid
+from typing import Optional
+from app.math.ksat import KSatInstance, add_votes_to_instance
+
+
+def _entity_id(rng: random.Random) -> str:
+    # UUIDs reprodutíveis a partir da semente, como os ids do banco
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def random_ksat_instance(
+    num_vars: int, num_clauses: int, k: int = 3, seed: Optional[int] = None
+) -> KSatInstance:
+    """
+    Instância k-SAT aleatória uniforme
+
+    Cada cláusula tem k variáveis distintas sorteadas entre num_vars, com
+    sinais equiprováveis. A transição de fase fica em α = m/n ≈ 4.27 (k = 3).
+    """
+    if k > num_vars:
+        raise ValueError("k não pode exceder o número de variáveis")
+    rng = random.Random(seed)
+    instance = KSatInstance(f"random-{k}-{num_vars}-{num_clauses}")
+    for var in range(1, num_vars + 1):
+        instance.variable(("var", var))
+    for index in range(num_clauses):
+        clause = [
+            var if rng.random() < 0.5 else -var
+            for var in rng.sample(range(1, num_vars + 1), k)
+        ]
+        instance.add_clause(clause, ("clause", str(index)))
+    # Toda cláusula conta como restrição a verificar
+    instance.metric_count = 1
+    return instance
+
+
+def random_market_instance(
+    users: int,
+    metrics: int,
+    data_points: int,
+    votes_per_user: int,
+    reliable_ratio: float = 0.5,
+    seed: Optional[int] = None,
+) -> KSatInstance:
+    """
+    Instância de consistência de um mercado sintético
+
+    Reproduz a estrutura de app/models/database.py: o mercado tem metrics
+    métricas com data_points dados cada, e cada usuário vota em
+    votes_per_user dados distintos (no máximo um voto por usuário e dado,
+    como em votes), confiável com probabilidade reliable_ratio. A largura
+    das cláusulas de métrica cresce com users.
+    """
+    rng = random.Random(seed)
+    metric_ids = [_entity_id(rng) for _ in range(metrics)]
+    points = [
+        (_entity_id(rng), metric_id)
+        for metric_id in metric_ids
+        for _ in range(data_points)
+    ]
+    votes_per_user = min(votes_per_user, len(points))
+
+    votes = []
+    for user_id in sorted(_entity_id(rng) for _ in range(users)):
+        for data_point_id, metric_id in rng.sample(points, votes_per_user):
+            votes.append(
+                (
+                    _entity_id(rng),
+                    user_id,
+                    data_point_id,
+                    rng.random() < reliable_ratio,
+                    metric_id,
+                )
+            )
+
+    instance = KSatInstance(_entity_id(rng))
+    instance.metric_count = metrics
+    return add_votes_to_instance(instance, metric_ids, votes)
@@ -0,0 +1,203 @@
+import threading
+import time
+from typing import Any, Dict, Tuple, Union
+from app.math.cdcl import CDCLSolver
+from app.math.ksat import KSatInstance
+from app.models.database import DataPoint, Metric, Vote
+from sqlalchemy.orm import Session
+from uuid import UUID
+
+
+class IncrementalMarketSolver:
+    """
+    Solver persistente da consistência k-SAT de um mercado
+
+    Mantém a mesma codificação de KSatInstance, mas de forma que novos votos
+    apenas acrescentam cláusulas:
+
+    - a cláusula de cada métrica j carrega um seletor s_j, assumido falso a
+      cada verificação; um novo voto positivo v em j adiciona
+      (¬s_j ∨ x_v ∨ s_j') e passa a assumir ¬s_j';
+    - os votos de um usuário são equivalentes ao seu primeiro voto no mercado.
+
+    Assim o CDCLSolver conserva cláusulas aprendidas e atividades entre as
+    verificações, e cada voto custa apenas a busca incremental.
+    """
+
+    def __init__(self, market_id: Union[str, UUID]):
+        self.market_id = str(market_id)
+        self.instance = KSatInstance(market_id)
+        self.solver = CDCLSolver()
+        self.metric_selectors: Dict[str, int] = {}
+        self.metric_supporters: Dict[str, int] = {}
+        self.user_anchors: Dict[str, int] = {}
+        self.known_votes = set()
+        self.lock = threading.RLock()
+
+    @classmethod
+    def from_database(
+        cls, db: Session, market_id: Union[str, UUID]
+    ) -> "IncrementalMarketSolver":
+        """
+        Constrói o solver com as métricas e votos atuais do mercado
+        """
+        market_solver = cls(market_id)
+        metric_ids = [
+            str(metric_id)
+            for (metric_id,) in db.query(Metric.id)
+            .filter(Metric.market_id == market_solver.market_id)
+            .all()
+        ]
+        for metric_id in metric_ids:
+            market_solver.add_metric(metric_id)
+
+        if metric_ids:
+            votes = (
+                db.query(
+                    Vote.id,
+                    Vote.user_id,
+                    Vote.data_point_id,
+                    Vote.is_reliable,
+                    DataPoint.metric_id,
+                )
+                .join(DataPoint, Vote.data_point_id == DataPoint.id)
+                .filter(DataPoint.metric_id.in_(metric_ids))
+                .all()
+            )
+            for vote in votes:
+                market_solver.add_vote(*vote)
+
+        return market_solver
+
+    def _add_clause(self, literals, origin: Tuple[str, str]):
+        self.instance.add_clause(literals, origin)
+        self.solver.add_clause(literals)
+
+    def add_metric(self, metric_id: Union[str, UUID]):
+        """
+        Registra uma métrica (inicialmente sem votos que a sustentem)
+        """
+        metric_id = str(metric_id)
+        with self.lock:
+            if metric_id in self.metric_selectors:
+                return
+            self._add_metric(metric_id)
+
+    def _add_metric(self, metric_id: str):
+        selector = self.instance.variable(("selector", metric_id, 0))
+        self.metric_selectors[metric_id] = selector
+        self.metric_supporters[metric_id] = 0
+        self.instance.metric_count += 1
+        self._add_clause([selector], ("metric", metric_id))
+
+    def add_vote(
+        self,
+        vote_id: Union[str, UUID],
+        user_id: Union[str, UUID],
+        data_point_id: Union[str, UUID],
+        is_reliable: bool,
+        metric_id: Union[str, UUID],
+    ):
+        """
+        Acrescenta as cláusulas de um voto; votos já conhecidos são ignorados
+        """
+        with self.lock:
+            self._add_vote(vote_id, user_id, data_point_id, is_reliable, metric_id)
+
+    def _add_vote(self, vote_id, user_id, data_point_id, is_reliable, metric_id):
+        vote_id, user_id, metric_id = str(vote_id), str(user_id), str(metric_id)
+        if vote_id in self.known_votes:
+            return
+        self.known_votes.add(vote_id)
+        self.add_metric(metric_id)
+
+        vote = self.instance.variable(("vote", vote_id))
+        data_point = self.instance.variable(("data_point", str(data_point_id)))
+        self.instance.vote_count += 1
+
+        if is_reliable:
+            self._add_clause([-vote, data_point], ("vote", vote_id))
+
+            previous = self.metric_selectors[metric_id]
+            self.metric_supporters[metric_id] += 1
+            selector = self.instance.variable(
+                ("selector", metric_id, self.metric_supporters[metric_id])
+            )
+            self._add_clause([-previous, vote, selector], ("metric", metric_id))
+            self.metric_selectors[metric_id] = selector
+        else:
+            self._add_clause([-vote, -data_point], ("vote", vote_id))
+
+        anchor = self.user_anchors.setdefault(user_id, vote)
+        if anchor != vote:
+            self._add_clause([-vote, anchor], ("user", user_id))
+            self._add_clause([-anchor, vote], ("user", user_id))
+
+    def solve(self, time_limit: float = None) -> Tuple[bool, Dict[str, Any]]:
+        """
+        Verifica a consistência com as cláusulas acumuladas até agora
+
+        Retorna: (is_consistent, detalhes da busca incremental)
+        """
+        with self.lock:
+            return self._solve(time_limit)
+
+    def _solve(self, time_limit: float = None) -> Tuple[bool, Dict[str, Any]]:
+        started = time.perf_counter()
+        before = dict(self.solver.stats)
+        assumptions = [-selector for selector in self.metric_selectors.values()]
+
+        if not self.metric_selectors:
+            satisfiable = False
+            status = "no_metrics"
+        else:
+            satisfiable = self.solver.solve(assumptions, time_limit=time_limit)
+            status = {True: "sat", False: "unsat", None: "unknown"}[satisfiable]
+
+        details = {
+            "mode": "incremental",
+            "status": status,
+            "metrics": self.instance.metric_count,
+            "votes": self.instance.vote_count,
+            "variables": self.instance.num_vars,
+            "clauses": len(self.instance.clauses),
+        }
+        details.update(
+            {key: value - before[key] for key, value in self.solver.stats.items()}
+        )
+        details["elapsed_ms"] = (time.perf_counter() - started) * 1000.0
+        return bool(satisfiable), details
+
+
+# Solvers persistentes por mercado (locais ao processo)
+_market_solvers: Dict[str, IncrementalMarketSolver] = {}
+_registry_lock = threading.Lock()
+
+
+def get_market_solver(
+    db: Session, market_id: Union[str, UUID]
+) -> IncrementalMarketSolver:
+    """
+    Retorna o solver persistente do mercado, construindo-o na primeira chamada
+    """
+    market_id = str(market_id)
+    with _registry_lock:
+        market_solver = _market_solvers.get(market_id)
+    if market_solver is None:
+        market_solver = IncrementalMarketSolver.from_database(db, market_id)
+        with _registry_lock:
+            market_solver = _market_solvers.setdefault(market_id, market_solver)
+    return market_solver
+
+
+def discard_market_solver(market_id: Union[str, UUID] = None):
+    """
+    Descarta o solver persistente de um mercado (ou de todos)
+
+    Deve ser chamado quando métricas ou votos mudam por fora de VoteService.
+    """
+    with _registry_lock:
+        if market_id is None:
+            _market_solvers.clear()
+        else:
+            _market_solvers.pop(str(market_id), None)
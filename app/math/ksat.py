@@ -0,0 +1,327 @@
+import time
+from typing import Any, Dict, Hashable, List, Optional, Tuple, Union
+from app.math.cdcl import CDCLSolver
+from app.math.clause_store import ClauseStore, pack_assignment
+from app.math.local_search import LocalSearchSolver
+from app.math.preprocess import Preprocessor
+from app.math.propagation import SurveyPropagation
+from app.models.database import DataPoint, Metric, Vote
+from sqlalchemy.orm import Session
+from uuid import UUID
+
+# Orçamento padrão (segundos) da busca local quando nenhum limite é informado
+LOCAL_SEARCH_TIME_LIMIT = 1.0
+
+# Orçamento padrão (segundos) do estimador aproximado (mode "approx")
+APPROX_TIME_LIMIT = 1.0
+
+# Conflitos da primeira tentativa do CDCL antes de simplificar a instância
+PREPROCESS_AFTER_CONFLICTS = 2000
+
+
+class KSatInstance:
+    """
+    Instância k-SAT de consistência de um mercado
+
+    Variáveis booleanas:
+    - x_v: o voto v é aceito
+    - d_k: o dado k é confiável
+
+    Cláusulas:
+    - métrica j: (x_v1 ∨ x_v2 ∨ ...) para todo voto positivo v em um dado de j,
+      ou seja, toda métrica precisa de ao menos um voto positivo aceito;
+    - voto positivo v no dado k: (¬x_v ∨ d_k); voto negativo: (¬x_v ∨ ¬d_k);
+    - votos de um mesmo usuário são aceitos em bloco: x_v1 → x_v2 → ... → x_v1.
+
+    As cláusulas ficam em um ClauseStore (CSR + bitsets uint64), com memória
+    proporcional ao número de votos do mercado.
+
+    O mercado é consistente se existe uma atribuição de confiabilidade aos
+    dados e um conjunto de usuários cujos votos são todos coerentes com ela e
+    que sustentam todas as métricas. A largura das cláusulas de métrica cresce
+    com o número de votantes (k = população).
+    """
+
+    def __init__(self, market_id: Union[str, UUID] = None):
+        self.market_id = str(market_id) if market_id is not None else None
+        self.num_vars = 0
+        self.clauses = ClauseStore()
+        self.clause_origins: List[Tuple[str, str]] = []
+        self.variables: Dict[Hashable, int] = {}
+        self.labels: List[Hashable] = [None]
+        self.metric_count = 0
+        self.vote_count = 0
+
+    def variable(self, label: Hashable) -> int:
+        """
+        Retorna (criando se necessário) a variável associada a um rótulo
+        """
+        var = self.variables.get(label)
+        if var is None:
+            self.num_vars += 1
+            var = self.num_vars
+            self.variables[label] = var
+            self.labels.append(label)
+        return var
+
+    def add_clause(self, literals: List[int], origin: Tuple[str, str]):
+        """
+        Adiciona uma cláusula DIMACS com a entidade que a originou
+        """
+        self.clauses.append(literals)
+        self.clause_origins.append(origin)
+
+    def decode(self, model: List[int]) -> Dict[Hashable, bool]:
+        """
+        Traduz um modelo DIMACS para {rótulo: valor}
+        """
+        return {self.labels[abs(literal)]: literal > 0 for literal in model}
+
+
+def build_market_instance(db: Session, market_id: Union[str, UUID]) -> KSatInstance:
+    """
+    Constrói a instância k-SAT de um mercado com duas consultas
+
+    Uma consulta para as métricas do mercado e outra para todos os votos em
+    dados dessas métricas.
+    """
+    return build_market_instances(db, [market_id])[str(market_id)]
+
+
+def build_market_instances(
+    db: Session, market_ids: List[Union[str, UUID]]
+) -> Dict[str, KSatInstance]:
+    """
+    Constrói as instâncias de vários mercados com as mesmas duas consultas
+    """
+    market_ids = [str(market_id) for market_id in market_ids]
+    market_metrics: Dict[str, List[str]] = {market_id: [] for market_id in market_ids}
+    for metric_id, market_id in (
+        db.query(Metric.id, Metric.market_id)
+        .filter(Metric.market_id.in_(market_ids))
+        .all()
+    ):
+        market_metrics[str(market_id)].append(str(metric_id))
+
+    market_votes: Dict[str, List[tuple]] = {market_id: [] for market_id in market_ids}
+    if any(market_metrics.values()):
+        votes = (
+            db.query(
+                Vote.id,
+                Vote.user_id,
+                Vote.data_point_id,
+                Vote.is_reliable,
+                DataPoint.metric_id,
+                Metric.market_id,
+            )
+            .join(DataPoint, Vote.data_point_id == DataPoint.id)
+            .join(Metric, DataPoint.metric_id == Metric.id)
+            .filter(Metric.market_id.in_(market_ids))
+            .order_by(Vote.user_id, Vote.id)
+            .all()
+        )
+        for vote in votes:
+            market_votes[str(vote[5])].append(vote[:5])
+
+    instances = {}
+    for market_id in market_ids:
+        instance = KSatInstance(market_id)
+        instance.metric_count = len(market_metrics[market_id])
+        if instance.metric_count:
+            add_votes_to_instance(
+                instance, market_metrics[market_id], market_votes[market_id]
+            )
+        instances[market_id] = instance
+    return instances
+
+
+def add_votes_to_instance(
+    instance: KSatInstance, metric_ids: List[str], votes: List[tuple]
+) -> KSatInstance:
+    """
+    Codifica as cláusulas a partir de linhas
+    (vote_id, user_id, data_point_id, is_reliable, metric_id)
+    """
+    supporters: Dict[str, List[int]] = {metric_id: [] for metric_id in metric_ids}
+    user_votes: Dict[str, List[int]] = {}
+
+    for vote_id, user_id, data_point_id, is_reliable, metric_id in votes:
+        vote_id = str(vote_id)
+        vote = instance.variable(("vote", vote_id))
+        data_point = instance.variable(("data_point", str(data_point_id)))
+        instance.vote_count += 1
+
+        if is_reliable:
+            instance.add_clause([-vote, data_point], ("vote", vote_id))
+            supporters[str(metric_id)].append(vote)
+        else:
+            instance.add_clause([-vote, -data_point], ("vote", vote_id))
+        user_votes.setdefault(str(user_id), []).append(vote)
+
+    for user_id, user_vars in user_votes.items():
+        if len(user_vars) < 2:
+            continue
+        for current, following in zip(user_vars, user_vars[1:] + user_vars[:1]):
+            instance.add_clause([-current, following], ("user", user_id))
+
+    for metric_id in metric_ids:
+        instance.add_clause(supporters[metric_id], ("metric", metric_id))
+
+    return instance
+
+
+def solve_instance(
+    instance: KSatInstance,
+    mode: str = "full",
+    time_limit: Optional[float] = None,
+    max_flips: Optional[int] = None,
+    seed: Optional[int] = None,
+    preprocess: Optional[bool] = None,
+) -> Tuple[bool, Dict[str, Any]]:
+    """
+    Resolve uma instância já construída, sem acesso ao banco
+
+    mode "full" usa o CDCL completo e "local" a busca local (probSAT), que
+    responde "sat" com testemunha ou "unknown" dentro do orçamento. mode
+    "approx" usa survey/belief propagation e responde "likely_sat",
+    "likely_unsat" ou "unknown" com sat_probability e as marginais P(x_v)
+    de cada voto.
+
+    preprocess=True simplifica a instância com Preprocessor antes da busca e
+    False nunca simplifica. Com None (padrão), o modo "full" tenta primeiro o
+    CDCL com PREPROCESS_AFTER_CONFLICTS conflitos e só simplifica instâncias
+    que resistem a ele, pois nas fáceis a simplificação custa mais que a
+    busca. O tamanho antes/depois vai em details["preprocess"].
+
+    Retorna: (is_consistent, detalhes da instância e da busca)
+    """
+    is_consistent, details, _ = solve_instance_model(
+        instance,
+        mode,
+        time_limit=time_limit,
+        max_flips=max_flips,
+        seed=seed,
+        preprocess=preprocess,
+    )
+    return is_consistent, details
+
+
+def solve_instance_model(
+    instance: KSatInstance,
+    mode: str = "full",
+    time_limit: Optional[float] = None,
+    max_flips: Optional[int] = None,
+    seed: Optional[int] = None,
+    preprocess: Optional[bool] = None,
+) -> Tuple[bool, Dict[str, Any], List[int]]:
+    """
+    Como solve_instance, mas também devolve o modelo DIMACS encontrado
+
+    Retorna: (is_consistent, detalhes, modelo — vazio se não "sat")
+    """
+    started = time.perf_counter()
+    details = {
+        "mode": mode,
+        "metrics": instance.metric_count,
+        "votes": instance.vote_count,
+        "variables": instance.num_vars,
+        "clauses": len(instance.clauses),
+    }
+    if not instance.metric_count:
+        details["status"] = "no_metrics"
+        return False, details, []
+    if mode == "approx":
+        is_consistent = _estimate_instance(instance, details, time_limit, seed)
+        details["elapsed_ms"] = (time.perf_counter() - started) * 1000.0
+        return is_consistent, details, []
+
+    satisfiable = None
+    first_attempt = None
+    if mode == "full" and preprocess is None:
+        # Tentativa curta sem simplificação: resolve as instâncias fáceis
+        first_attempt = CDCLSolver(instance.num_vars, instance.clauses)
+        satisfiable = first_attempt.solve(
+            max_conflicts=PREPROCESS_AFTER_CONFLICTS, time_limit=time_limit
+        )
+        if time_limit is not None:
+            time_limit -= time.perf_counter() - started
+        preprocess = satisfiable is None and (time_limit is None or time_limit > 0)
+
+    clauses = instance.clauses
+    preprocessor = None
+    if preprocess:
+        preprocessor = Preprocessor(instance.num_vars, instance.clauses)
+        clauses = preprocessor.run()
+        details["preprocess"] = preprocessor.report()
+
+    if first_attempt is not None and preprocessor is None:
+        solver = first_attempt
+    elif mode == "local":
+        solver = LocalSearchSolver(instance.num_vars, clauses, seed=seed)
+        if time_limit is None and max_flips is None:
+            time_limit = LOCAL_SEARCH_TIME_LIMIT
+    else:
+        solver = CDCLSolver(instance.num_vars, clauses)
+        if first_attempt is not None:
+            for key, value in first_attempt.stats.items():
+                solver.stats[key] += value
+
+    if preprocessor is not None and not preprocessor.ok:
+        satisfiable = False  # refutada já na simplificação
+    elif solver is first_attempt:
+        pass
+    elif mode == "local":
+        satisfiable = solver.solve(max_flips=max_flips, time_limit=time_limit)
+    else:
+        satisfiable = solver.solve(time_limit=time_limit)
+
+    model = []
+    if satisfiable:
+        model = solver.model
+        if preprocessor is not None:
+            model = preprocessor.extend(model)
+    details["status"] = {True: "sat", False: "unsat", None: "unknown"}[satisfiable]
+    if satisfiable:
+        details["verified"] = instance.clauses.is_satisfied_by(
+            pack_assignment(model, instance.num_vars)
+        )
+    details.update(solver.stats)
+    details["elapsed_ms"] = (time.perf_counter() - started) * 1000.0
+    return bool(satisfiable), details, model
+
+
+def _estimate_instance(
+    instance: KSatInstance,
+    details: Dict[str, Any],
+    time_limit: Optional[float],
+    seed: Optional[int],
+) -> bool:
+    """
+    Preenche details com a estimativa de SurveyPropagation
+
+    Retorna: sat_probability >= 0.5
+    """
+    estimator = SurveyPropagation(instance.num_vars, instance.clauses, seed=seed)
+    estimate = estimator.estimate(
+        time_limit=APPROX_TIME_LIMIT if time_limit is None else time_limit
+    )
+    probability = estimate["sat_probability"]
+    if not estimate["converged"]:
+        details["status"] = "unknown"
+    else:
+        details["status"] = "likely_sat" if probability >= 0.5 else "likely_unsat"
+    details["sat_probability"] = probability
+    details["phase"] = estimate["phase"]
+    # -inf (contradição) não é representável em JSON
+    for key in ("complexity", "entropy"):
+        value = estimate[key]
+        details[key] = value if value is None or value > float("-inf") else None
+    details.update(estimator.stats)
+
+    marginals = estimate["marginals"]
+    details["marginals"] = {
+        label[1]: float(marginals[var])
+        for label, var in instance.variables.items()
+        if label[0] == "vote"
+    }
+    return probability >= 0.5
@@ -0,0 +1,183 @@
+import random
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+from app.math.clause_store import ClauseStore, pack_assignment
+
+
+class LocalSearchSolver:
+    """
+    Busca local estocástica (probSAT / WalkSAT) para instâncias k-SAT grandes
+
+    Incompleta: solve() retorna True com um modelo testemunha ou None quando
+    o orçamento de flips ou de tempo se esgota ("desconhecido"); nunca prova
+    insatisfatibilidade.
+
+    - probSAT: escolhe uma cláusula falsa ao acaso e inverte uma de suas
+      variáveis com probabilidade ∝ (eps + break)^-cb;
+    - WalkSAT: com probabilidade noise inverte uma variável aleatória da
+      cláusula, senão a de menor break (variáveis com break 0 têm prioridade).
+
+    Em cláusulas muito largas (k = população) apenas max_candidates literais
+    sorteados da cláusula são avaliados a cada passo.
+
+    As cláusulas são lidas do CSR de um ClauseStore (literals/offsets) e as
+    ocorrências de cada literal vêm de ClauseStore.occurrences(), também em
+    CSR; o estado da busca guarda apenas ids de cláusula.
+    """
+
+    def __init__(
+        self,
+        num_vars: int,
+        clauses: Iterable[Iterable[int]],
+        algorithm: str = "probsat",
+        seed: Optional[int] = None,
+        cb: float = 2.3,
+        eps: float = 1.0,
+        noise: float = 0.567,
+        max_candidates: int = 64,
+    ):
+        if algorithm not in ("probsat", "walksat"):
+            raise ValueError("algoritmo de busca local inválido")
+
+        if not isinstance(clauses, ClauseStore):
+            clauses = ClauseStore(clauses)
+        self.num_vars = num_vars
+        self.clauses = clauses
+        self.literals = clauses.literals
+        self.offsets = clauses.offsets
+        self.algorithm = algorithm
+        self.random = random.Random(seed)
+        self.cb = cb
+        self.eps = eps
+        self.noise = noise
+        self.max_candidates = max_candidates
+        self.model: List[int] = []
+        self.witness: Optional[np.ndarray] = None
+        self.stats: Dict[str, int] = {"flips": 0, "tries": 0, "best_unsat": 0}
+
+        # Ocorrências por literal: slot 2v para v, 2v + 1 para ¬v
+        starts, clause_ids = clauses.occurrences(num_vars)
+        self.occurrence_starts = array("q", starts.tobytes())
+        self.occurrence_ids = array("q", clause_ids.astype(np.int64).tobytes())
+
+    def _break_count(self, var: int, assignment: bytearray, true_count: List[int]):
+        """
+        Número de cláusulas que deixam de ser satisfeitas ao inverter var
+        """
+        slot = (var << 1) if assignment[var] else ((var << 1) | 1)
+        starts = self.occurrence_starts
+        occurrences = self.occurrence_ids[starts[slot] : starts[slot + 1]]
+        return sum(1 for index in occurrences if true_count[index] == 1)
+
+    def _pick_variable(
+        self, clause: int, assignment: bytearray, true_count: List[int]
+    ) -> int:
+        literals = self.literals
+        start, end = self.offsets[clause], self.offsets[clause + 1]
+        if end - start > self.max_candidates:
+            positions = self.random.sample(range(start, end), self.max_candidates)
+            variables = [abs(literals[position]) for position in positions]
+        else:
+            variables = [abs(literal) for literal in literals[start:end]]
+
+        if self.algorithm == "walksat":
+            breaks = [self._break_count(v, assignment, true_count) for v in variables]
+            best = min(breaks)
+            if best > 0 and self.random.random() < self.noise:
+                return self.random.choice(variables)
+            return self.random.choice(
+                [v for v, count in zip(variables, breaks) if count == best]
+            )
+
+        weights = [
+            (self.eps + self._break_count(v, assignment, true_count)) ** -self.cb
+            for v in variables
+        ]
+        return self.random.choices(variables, weights)[0]
+
+    def solve(
+        self,
+        max_flips: Optional[int] = None,
+        time_limit: Optional[float] = None,
+        max_tries: int = 1,
+    ) -> Optional[bool]:
+        """
+        Procura uma atribuição que satisfaça todas as cláusulas
+
+        max_flips limita os flips por tentativa e time_limit (segundos) o tempo
+        total; ao menos um dos dois deve ser informado.
+        """
+        if max_flips is None and time_limit is None:
+            raise ValueError("informe max_flips ou time_limit")
+
+        self.model = []
+        self.witness = None
+        if np.any(np.diff(np.frombuffer(self.offsets, dtype=np.int64)) == 0):
+            return None  # cláusula vazia: nenhuma testemunha possível
+
+        deadline = time.monotonic() + time_limit if time_limit is not None else None
+        starts = self.occurrence_starts
+        occurrences = self.occurrence_ids
+        self.stats["best_unsat"] = len(self.clauses)
+
+        for _ in range(max_tries):
+            self.stats["tries"] += 1
+            assignment = bytearray(
+                self.random.getrandbits(1) for _ in range(self.num_vars + 1)
+            )
+
+            true_count = self.clauses.true_literal_counts(
+                pack_assignment(assignment[1:], self.num_vars)
+            ).tolist()
+            unsat = [index for index, count in enumerate(true_count) if count == 0]
+            position = {index: i for i, index in enumerate(unsat)}
+
+            flips = 0
+            while unsat:
+                if max_flips is not None and flips >= max_flips:
+                    break
+                if deadline is not None and flips % 256 == 0:
+                    if time.monotonic() > deadline:
+                        break
+
+                clause = unsat[self.random.randrange(len(unsat))]
+                var = self._pick_variable(clause, assignment, true_count)
+
+                # Literal de var que passa a ser falso e o que passa a ser verdadeiro
+                old_slot = (var << 1) if assignment[var] else ((var << 1) | 1)
+                new_slot = old_slot ^ 1
+                assignment[var] ^= 1
+                flips += 1
+
+                for index in occurrences[starts[old_slot] : starts[old_slot + 1]]:
+                    true_count[index] -= 1
+                    if true_count[index] == 0:
+                        position[index] = len(unsat)
+                        unsat.append(index)
+                for index in occurrences[starts[new_slot] : starts[new_slot + 1]]:
+                    true_count[index] += 1
+                    if true_count[index] == 1:
+                        i = position.pop(index)
+                        last = unsat.pop()
+                        if last != index:
+                            unsat[i] = last
+                            position[last] = i
+
+                if len(unsat) < self.stats["best_unsat"]:
+                    self.stats["best_unsat"] = len(unsat)
+
+            self.stats["flips"] += flips
+            if not unsat:
+                self.stats["best_unsat"] = 0
+                self.model = [
+                    var if assignment[var] else -var
+                    for var in range(1, self.num_vars + 1)
+                ]
+                self.witness = pack_assignment(assignment[1:], self.num_vars)
+                return True
+            if deadline is not None and time.monotonic() > deadline:
+                break
+
+        return None
@@ -0,0 +1,256 @@
+import math
+import random
+import statistics
+import time
+from typing import Any, Dict, Iterable, List, Optional
+from app.math.cdcl import CDCLSolver
+from app.math.ksat import KSatInstance
+
+# Orçamento padrão (segundos) da contagem aproximada
+MODEL_COUNT_TIME_LIMIT = 5.0
+
+
+class ApproximateModelCounter:
+    """
+    Contagem aproximada de modelos projetada (#SAT) por hashing com XOR
+
+    Segue o ApproxMC (Chakraborty, Meel, Vardi): restrições XOR aleatórias
+    sobre o conjunto de amostragem S dividem as soluções em 2^m células; a
+    contagem de uma célula pequena vezes 2^m estima o total. Com
+
+    - limiar = 1 + 9.84 (1 + ε/(1 + ε)) (1 + 1/ε)²
+    - t = ⌈17 log2(3/δ)⌉ repetições, estimativa = mediana
+
+    P(total/(1 + ε) ≤ estimativa ≤ total (1 + ε)) ≥ 1 − δ. As células são
+    enumeradas com o CDCLSolver incremental: cada XOR é codificada em
+    cláusulas (cadeia de Tseitin) ativadas por um literal de suposição, e as
+    soluções encontradas são bloqueadas sobre S.
+    """
+
+    def __init__(
+        self,
+        num_vars: int,
+        clauses: Iterable[Iterable[int]],
+        sampling_set: Optional[List[int]] = None,
+        epsilon: float = 0.8,
+        delta: float = 0.2,
+        seed: Optional[int] = None,
+    ):
+        if epsilon <= 0 or not 0 < delta < 1:
+            raise ValueError("epsilon deve ser positivo e delta estar em (0, 1)")
+        self.num_vars = num_vars
+        self.solver = CDCLSolver(num_vars, clauses)
+        self.sampling_set = (
+            list(sampling_set)
+            if sampling_set is not None
+            else list(range(1, num_vars + 1))
+        )
+        self.epsilon = epsilon
+        self.delta = delta
+        self.threshold = int(
+            1 + 9.84 * (1 + epsilon / (1 + epsilon)) * (1 + 1 / epsilon) ** 2
+        )
+        self.iterations = int(math.ceil(17 * math.log2(3 / delta)))
+        self.random = random.Random(seed)
+        self.deadline = None
+        self.stats: Dict[str, int] = {"solver_calls": 0, "cells": 0}
+
+    def _new_var(self) -> int:
+        self.solver.ensure_vars(self.solver.num_vars + 1)
+        return self.solver.num_vars
+
+    def _add_xor(self, variables: List[int], parity: bool, activation: int):
+        """
+        x_1 ⊕ ... ⊕ x_k = parity, válida apenas quando activation é verdadeira
+        """
+        guard = -activation
+        if not variables:
+            if parity:
+                self.solver.add_clause([guard])
+            return
+        current = variables[0]
+        for var in variables[1:]:
+            # t = current ⊕ var
+            t = self._new_var()
+            self.solver.add_clause([guard, -t, current, var])
+            self.solver.add_clause([guard, -t, -current, -var])
+            self.solver.add_clause([guard, t, -current, var])
+            self.solver.add_clause([guard, t, current, -var])
+            current = t
+        self.solver.add_clause([guard, current if parity else -current])
+
+    def _remaining(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic()
+
+    def _bounded_count(self, rows: List[tuple], limit: int) -> Optional[int]:
+        """
+        Número de soluções (projetadas em S) da célula, até limit
+
+        Retorna None se o orçamento de tempo se esgotar.
+        """
+        activation = self._new_var()
+        for variables, parity in rows:
+            self._add_xor(variables, parity, activation)
+        self.stats["cells"] += 1
+
+        count = 0
+        try:
+            while count < limit:
+                remaining = self._remaining()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self.stats["solver_calls"] += 1
+                result = self.solver.solve([activation], time_limit=remaining)
+                if result is None:
+                    return None
+                if not result:
+                    break
+                count += 1
+                model = self.solver.model
+                self.solver.add_clause(
+                    [-activation] + [-model[var - 1] for var in self.sampling_set]
+                )
+            return count
+        finally:
+            # Desativa a célula de vez: suas cláusulas ficam satisfeitas
+            self.solver.add_clause([-activation])
+
+    def _random_row(self) -> tuple:
+        variables = [var for var in self.sampling_set if self.random.random() < 0.5]
+        return variables, self.random.random() < 0.5
+
+    def _iteration(self, start: int) -> Optional[tuple]:
+        """
+        Procura o menor m com célula abaixo do limiar, partindo de start
+
+        Retorna: (m, contagem da célula) ou None se o tempo acabar
+        """
+        rows: List[tuple] = []
+        counts: Dict[int, int] = {}
+
+        def cell(m: int) -> Optional[int]:
+            if m not in counts:
+                while len(rows) < m:
+                    rows.append(self._random_row())
+                count = self._bounded_count(rows[:m], self.threshold)
+                if count is None:
+                    return None
+                counts[m] = count
+            return counts[m]
+
+        m = max(1, min(start, len(self.sampling_set)))
+        count = cell(m)
+        if count is None:
+            return None
+        while count >= self.threshold and m < len(self.sampling_set):
+            m += 1
+            count = cell(m)
+            if count is None:
+                return None
+        while m > 1:
+            previous = cell(m - 1)
+            if previous is None:
+                return None
+            if previous >= self.threshold:
+                break
+            m, count = m - 1, previous
+        return m, count
+
+    def count(self, time_limit: Optional[float] = MODEL_COUNT_TIME_LIMIT):
+        """
+        Estima o número de atribuições de S que se estendem a um modelo
+
+        Retorna: {"status", "estimate", "log2_estimate", "fraction",
+        "iterations", ...}; status é "exact" (poucas soluções, contadas
+        todas), "approx" (t repetições), "partial" (tempo esgotado após ao
+        menos uma repetição) ou "timeout"
+        """
+        started = time.monotonic()
+        self.deadline = started + time_limit if time_limit is not None else None
+        result: Dict[str, Any] = {
+            "status": "timeout",
+            "estimate": None,
+            "log2_estimate": None,
+            "fraction": None,
+            "sampling_vars": len(self.sampling_set),
+            "epsilon": self.epsilon,
+            "delta": self.delta,
+            "threshold": self.threshold,
+            "iterations": 0,
+            "required_iterations": self.iterations,
+        }
+
+        exact = self._bounded_count([], self.threshold)
+        if exact is None:
+            return self._finish(result, started)
+        if exact < self.threshold:
+            result["status"] = "exact"
+            log2_estimates = [math.log2(exact)] if exact else []
+        else:
+            log2_estimates = []
+            start = max(1, int(math.log2(self.threshold)))
+            for _ in range(self.iterations):
+                found = self._iteration(start)
+                if found is None:
+                    break
+                m, cell_count = found
+                start = m
+                if cell_count:
+                    log2_estimates.append(math.log2(cell_count) + m)
+                else:
+                    log2_estimates.append(float("-inf"))
+            result["iterations"] = len(log2_estimates)
+            if not log2_estimates:
+                return self._finish(result, started)
+            result["status"] = (
+                "approx" if len(log2_estimates) == self.iterations else "partial"
+            )
+
+        if log2_estimates:
+            log2_estimate = statistics.median_low(log2_estimates)
+        else:
+            log2_estimate = float("-inf")  # nenhuma solução
+        if log2_estimate == float("-inf"):
+            result.update(estimate=0, log2_estimate=None, fraction=0.0)
+        else:
+            estimate = exact if result["status"] == "exact" else None
+            if estimate is None and log2_estimate < 1024:
+                estimate = round(2.0**log2_estimate)
+            result.update(
+                estimate=estimate,
+                log2_estimate=log2_estimate,
+                fraction=2.0 ** (log2_estimate - len(self.sampling_set)),
+            )
+        return self._finish(result, started)
+
+    def _finish(self, result: Dict[str, Any], started: float) -> Dict[str, Any]:
+        result.update(self.stats)
+        result["elapsed_ms"] = (time.monotonic() - started) * 1000.0
+        return result
+
+
+def score_instance(
+    instance: KSatInstance,
+    epsilon: float = 0.8,
+    delta: float = 0.2,
+    time_limit: Optional[float] = MODEL_COUNT_TIME_LIMIT,
+    seed: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Pontuação graduada de consistência de um mercado
+
+    consistency_score = fração das atribuições de aceitação dos votos (x_v)
+    que admitem alguma confiabilidade dos dados satisfazendo a instância.
+
+    Retorna: {"consistency_score", "model_count"}
+    """
+    votes = [var for label, var in instance.variables.items() if label[0] == "vote"]
+    if not instance.metric_count:
+        return {"consistency_score": 0.0, "model_count": None}
+    counter = ApproximateModelCounter(
+        instance.num_vars, instance.clauses, votes, epsilon, delta, seed
+    )
+    model_count = counter.count(time_limit)
+    return {"consistency_score": model_count["fraction"], "model_count": model_count}
@@ -0,0 +1,372 @@
+import time
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from app.math.clause_store import ClauseStore
+
+
+class Preprocessor:
+    """
+    Simplificação de instâncias k-SAT antes da busca
+
+    - propagação de cláusulas unitárias no nível 0
+    - remoção de cláusulas subsumidas (C ⊆ D remove D)
+    - eliminação de literais puros (l sem ocorrências de ¬l)
+    - eliminação limitada de variáveis (BVE): x é substituída pelas
+      resolventes de suas cláusulas quando isso não aumenta o número de
+      cláusulas e nenhuma resolvente passa de resolvent_limit literais
+
+    As cláusulas ficam em CSR (literais DIMACS ordenados de cada cláusula
+    contíguos em self.literals, delimitados por self.offsets) e nunca são
+    reescritas: remover uma cláusula só a marca como morta em self.alive, e
+    as cláusulas encurtadas ou resolventes entram no fim. As listas de
+    ocorrência guardam ids de cláusula por slot de literal (2v para v,
+    2v + 1 para ¬v) e descartam os ids mortos quando são lidas; o número de
+    ocorrências vivas de cada slot fica em self.occurrence_count.
+
+    run() retorna as cláusulas simplificadas em um ClauseStore; extend()
+    reconstrói, a partir de um modelo delas, um modelo das cláusulas
+    originais.
+    """
+
+    def __init__(
+        self,
+        num_vars: int,
+        clauses: Iterable[Iterable[int]],
+        occurrence_limit: int = 16,
+        resolvent_limit: int = 16,
+        max_rounds: int = 4,
+    ):
+        self.num_vars = num_vars
+        self.occurrence_limit = occurrence_limit
+        self.resolvent_limit = resolvent_limit
+        self.max_rounds = max_rounds
+        self.literals = array("i")
+        self.offsets = array("q", [0])
+        self.alive = bytearray()
+        self.occurrences: List[List[int]] = [[] for _ in range(2 * num_vars + 2)]
+        self.occurrence_count = array("q", bytes(8 * (2 * num_vars + 2)))
+        self.fixed: Dict[int, bool] = {}
+        self.eliminated: Set[int] = set()
+        # Pilha de reconstrução: (literal, ids das cláusulas removidas que o
+        # contêm); cláusulas mortas continuam legíveis no CSR
+        self.stack: List[Tuple[int, List[int]]] = []
+        self.units: List[int] = []
+        self.touched: Set[int] = set()
+        self.ok = True
+        self.stats: Dict[str, int] = {
+            "units": 0,
+            "subsumed": 0,
+            "pure_literals": 0,
+            "eliminated_vars": 0,
+            "resolvents": 0,
+        }
+
+        self.clauses_before = 0
+        self.literals_before = 0
+        original_vars = set()
+        if isinstance(clauses, ClauseStore):
+            literals, offsets = clauses.literals, clauses.offsets
+            clauses = (
+                literals[offsets[index] : offsets[index + 1]]
+                for index in range(len(clauses))
+            )
+        for clause in clauses:
+            self.clauses_before += 1
+            self.literals_before += len(clause)
+            original_vars.update(abs(literal) for literal in clause)
+            self._add(clause)
+        self.variables_before = len(original_vars)
+        self.elapsed_ms = 0.0
+
+    # ------------------------------------------------------------------
+    # Base de cláusulas com listas de ocorrência
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _slot(literal: int) -> int:
+        return (literal << 1) if literal > 0 else ((-literal << 1) | 1)
+
+    def _clause(self, index: int) -> array:
+        return self.literals[self.offsets[index] : self.offsets[index + 1]]
+
+    def _length(self, index: int) -> int:
+        return self.offsets[index + 1] - self.offsets[index]
+
+    def _count(self, literal: int) -> int:
+        return self.occurrence_count[self._slot(literal)]
+
+    def _grow(self, slot: int):
+        # Variável acima de num_vars: abre os slots até ela
+        missing = (slot | 1) + 1 - len(self.occurrences)
+        self.occurrences.extend([] for _ in range(missing))
+        self.occurrence_count.extend([0] * missing)
+
+    def _add(self, literals: Iterable[int]):
+        clause = set()
+        for literal in literals:
+            value = self.fixed.get(abs(literal))
+            if value is None:
+                clause.add(literal)
+            elif value == (literal > 0):
+                return  # satisfeita no nível 0
+        if any(-literal in clause for literal in clause):
+            return  # tautologia
+        if not clause:
+            self.ok = False
+            return
+        top = self._slot(max(clause, key=abs))
+        if top >= len(self.occurrences):
+            self._grow(top)
+        if len(clause) == 1:
+            self.units.append(next(iter(clause)))
+        else:
+            index = len(self.alive)
+            self.literals.extend(sorted(clause))
+            self.offsets.append(len(self.literals))
+            self.alive.append(1)
+            for literal in clause:
+                slot = self._slot(literal)
+                self.occurrences[slot].append(index)
+                self.occurrence_count[slot] += 1
+
+    def _remove(self, index: int):
+        self.alive[index] = 0
+        for literal in self._clause(index):
+            self.occurrence_count[self._slot(literal)] -= 1
+            self.touched.add(abs(literal))
+
+    def _occurrences(self, literal: int) -> List[int]:
+        """
+        Ids das cláusulas vivas que contêm literal (compacta a lista)
+        """
+        slot = self._slot(literal)
+        alive = self.alive
+        indices = self.occurrences[slot]
+        if len(indices) != self.occurrence_count[slot]:
+            indices = [index for index in indices if alive[index]]
+            self.occurrences[slot] = indices
+        return indices
+
+    def _propagate(self) -> bool:
+        while self.units and self.ok:
+            literal = self.units.pop()
+            var = abs(literal)
+            if var in self.fixed:
+                if self.fixed[var] != (literal > 0):
+                    self.ok = False
+                continue
+            self.fixed[var] = literal > 0
+            self.stats["units"] += 1
+            for index in list(self._occurrences(literal)):
+                self._remove(index)
+            for index in list(self._occurrences(-literal)):
+                self._remove(index)
+                self._add(other for other in self._clause(index) if other != -literal)
+        return self.ok
+
+    # ------------------------------------------------------------------
+    # Técnicas
+    # ------------------------------------------------------------------
+
+    def _subsume(self) -> int:
+        """
+        Remove toda cláusula D que contém alguma cláusula C
+        """
+        removed = 0
+        alive = self.alive
+        literals = self.literals
+        offsets = self.offsets
+        order = sorted(
+            (index for index in range(len(alive)) if alive[index]),
+            key=self._length,
+        )
+        for index in order:
+            if not alive[index]:
+                continue
+            clause = self._clause(index)
+            size = len(clause)
+            # Basta olhar as cláusulas do literal de C com menos ocorrências
+            pivot = min(clause, key=self._count)
+            for other in list(self._occurrences(pivot)):
+                if other == index or not alive[other]:
+                    continue
+                start, end = offsets[other], offsets[other + 1]
+                if end - start < size:
+                    continue
+                # D está ordenada: cada literal de C é buscado por bisseção
+                for literal in clause:
+                    position = bisect_left(literals, literal, start, end)
+                    if position == end or literals[position] != literal:
+                        break
+                else:
+                    self._remove(other)
+                    removed += 1
+        self.stats["subsumed"] += removed
+        return removed
+
+    def _eliminate_pure(self, variables: Iterable[int]) -> int:
+        removed = 0
+        for var in variables:
+            if var in self.fixed or var in self.eliminated:
+                continue
+            positive, negative = self._count(var), self._count(-var)
+            if bool(positive) == bool(negative):
+                continue
+            literal = var if positive else -var
+            indices = list(self._occurrences(literal))
+            self.stack.append((literal, indices))
+            for index in indices:
+                self._remove(index)
+            self.eliminated.add(var)
+            removed += 1
+        self.stats["pure_literals"] += removed
+        return removed
+
+    def _resolvents(self, var: int) -> Optional[List[Set[int]]]:
+        """
+        Resolventes não tautológicas de var, ou None se excederem os limites
+        """
+        limit = self._count(var) + self._count(-var)
+        if limit > self.occurrence_limit:
+            return None
+        positive_indices = self._occurrences(var)
+        negative_indices = self._occurrences(-var)
+        # Uma cláusula larga (como a de métrica) gera resoluções largas demais
+        widest = self.resolvent_limit + 1
+        if any(self._length(index) > widest for index in positive_indices):
+            return None
+        if any(self._length(index) > widest for index in negative_indices):
+            return None
+        positive = [set(self._clause(index)) for index in positive_indices]
+        negative = [set(self._clause(index)) for index in negative_indices]
+
+        resolvents = []
+        for left in positive:
+            for right in negative:
+                if any(-literal in left for literal in right if literal != -var):
+                    continue  # tautologia
+                resolvent = (left - {var}) | (right - {-var})
+                if len(resolvent) > self.resolvent_limit:
+                    return None
+                resolvents.append(resolvent)
+                if len(resolvents) > limit:
+                    return None
+        return resolvents
+
+    def _eliminate_variables(self, variables: Iterable[int]) -> int:
+        eliminated = 0
+        candidates = sorted(
+            variables, key=lambda var: self._count(var) * self._count(-var)
+        )
+        for var in candidates:
+            if var in self.fixed or var in self.eliminated:
+                continue
+            if not self._count(var) or not self._count(-var):
+                continue
+            resolvents = self._resolvents(var)
+            if resolvents is None:
+                continue
+            indices = list(self._occurrences(var))
+            self.stack.append((var, indices))
+            for index in indices + list(self._occurrences(-var)):
+                self._remove(index)
+            self.eliminated.add(var)
+            for resolvent in resolvents:
+                self._add(resolvent)
+            self.stats["resolvents"] += len(resolvents)
+            eliminated += 1
+            if not self._propagate():
+                break
+        self.stats["eliminated_vars"] += eliminated
+        return eliminated
+
+    # ------------------------------------------------------------------
+    # Interface
+    # ------------------------------------------------------------------
+
+    def run(self) -> ClauseStore:
+        """
+        Aplica as técnicas até um ponto fixo (ou max_rounds rodadas)
+
+        Retorna: cláusulas simplificadas (vazio se self.ok for False)
+        """
+        started = time.perf_counter()
+        variables = set(range(1, self.num_vars + 1))
+        for _ in range(self.max_rounds):
+            if not self._propagate():
+                break
+            self.touched = set()
+            changes = self._subsume()
+            changes += self._eliminate_pure(variables)
+            changes += self._eliminate_variables(variables)
+            if not self.ok or not changes:
+                break
+            variables = self.touched
+        self._propagate()
+        self.elapsed_ms = (time.perf_counter() - started) * 1000.0
+        return self.simplified() if self.ok else ClauseStore()
+
+    def _remaining(self) -> List[int]:
+        alive = self.alive
+        return [index for index in range(len(alive)) if alive[index]]
+
+    def simplified(self) -> ClauseStore:
+        """
+        Cláusulas restantes em DIMACS, com os literais ordenados por variável
+        """
+        return ClauseStore(
+            sorted(self._clause(index), key=abs) for index in self._remaining()
+        )
+
+    def extend(self, model: Iterable[int]) -> List[int]:
+        """
+        Estende um modelo das cláusulas simplificadas às cláusulas originais
+
+        Variáveis fixadas recebem o valor do nível 0; as eliminadas são
+        decididas em ordem inversa de eliminação: o literal da pilha só é
+        verdadeiro se alguma de suas cláusulas não estiver satisfeita sem ele.
+        """
+        values = {abs(literal): literal > 0 for literal in model}
+        values.update(self.fixed)
+        for literal, indices in reversed(self.stack):
+            var = abs(literal)
+            needed = any(
+                not any(
+                    values.get(abs(other), False) == (other > 0)
+                    for other in self._clause(index)
+                    if other != literal
+                )
+                for index in indices
+            )
+            values[var] = needed == (literal > 0)
+        return [
+            var if values.get(var, False) else -var
+            for var in range(1, self.num_vars + 1)
+        ]
+
+    def report(self) -> Dict[str, float]:
+        """
+        Tamanho da instância antes e depois da simplificação
+        """
+        remaining = self._remaining()
+        variables_after = len(
+            {abs(literal) for index in remaining for literal in self._clause(index)}
+        )
+        literals_after = sum(self._length(index) for index in remaining)
+        report = {
+            "variables_before": self.variables_before,
+            "variables_after": variables_after,
+            "clauses_before": self.clauses_before,
+            "clauses_after": len(remaining),
+            "literals_before": self.literals_before,
+            "literals_after": literals_after,
+            "clause_reduction": (
+                1.0 - len(remaining) / self.clauses_before
+                if self.clauses_before
+                else 0.0
+            ),
+            "elapsed_ms": self.elapsed_ms,
+        }
+        report.update(self.stats)
+        return report
@@ -0,0 +1,241 @@
+import time
+from typing import Dict, Iterable, Optional
+import numpy as np
+from app.math.clause_store import ClauseStore
+
+# Abaixo disto uma mensagem é tratada como zero
+TINY = 1e-12
+
+
+def _cavity_products(values: np.ndarray, groups: np.ndarray, size: int):
+    """
+    Produto de values por grupo, com e sem o próprio elemento
+
+    Calculado em log com contagem de zeros, para que excluir um fator nulo
+    não divida por zero.
+
+    Retorna: (produto do grupo sem o elemento, produto completo do grupo)
+    """
+    zero = values <= TINY
+    logs = np.log(np.where(zero, 1.0, values))
+    total_log = np.bincount(groups, weights=logs, minlength=size)
+    zeros = np.bincount(groups, weights=zero, minlength=size)
+    full = np.where(zeros > 0, 0.0, np.exp(total_log))
+    cavity = np.where(zeros[groups] - zero > 0, 0.0, np.exp(total_log[groups] - logs))
+    return cavity, full
+
+
+class SurveyPropagation:
+    """
+    Estimador aproximado de satisfatibilidade por propagação de mensagens
+
+    Grafo de fatores: uma aresta (a, i) por literal da cláusula a, com as
+    mensagens guardadas em vetores NumPy indexados pela aresta.
+
+    Survey propagation (Braunstein, Mézard, Zecchina):
+    - η_a→i = Π_{j ∈ a\\i} Πu_j→a / (Πu_j→a + Πs_j→a + Π0_j→a)
+    - Πu_j→a = [1 − Π_{b ∈ u}(1 − η_b→j)] Π_{b ∈ s}(1 − η_b→j), com s (u) as
+      outras cláusulas em que j tem o mesmo sinal (o sinal oposto) de a
+    - complexidade Σ = Σ_a log(Π_j (Πu + Πs + Π0) − Π_j Πu)
+      − Σ_i (n_i − 1) log(W+_i + W−_i + W0_i) ≈ log(# aglomerados)
+
+    Quando os surveys convergem para o ponto trivial (η = 0) a instância está
+    na fase fácil e as marginais vêm de belief propagation sobre as soluções:
+    - δ_a→i = Π_{j ∈ a\\i} μ_j→a(falsifica a)
+    - entropia de Bethe S = Σ_a log(1 − Π_j μ_j→a) + Σ_i log(T_i + F_i)
+      − Σ_(a,i) log(1 − δ_a→i μ_i→a) ≈ log(# soluções)
+
+    P(sat) = 1 − exp(−e^Σ) (ou e^S), isto é, a chance de ao menos uma
+    solução quando o número delas é Poisson com aquela média.
+    """
+
+    def __init__(
+        self,
+        num_vars: int,
+        clauses: Iterable[Iterable[int]],
+        seed: Optional[int] = None,
+        damping: float = 0.5,
+        tolerance: float = 1e-4,
+    ):
+        if not isinstance(clauses, ClauseStore):
+            clauses = ClauseStore(clauses)
+        literals = np.frombuffer(clauses.literals, dtype=np.int32).astype(np.int64)
+        offsets = np.frombuffer(clauses.offsets, dtype=np.int64)
+        lengths = np.diff(offsets)
+
+        self.num_vars = max(num_vars, clauses.num_vars)
+        self.num_clauses = len(lengths)
+        self.has_empty_clause = bool(np.any(lengths == 0))
+        self.edge_clause = np.repeat(np.arange(self.num_clauses), lengths)
+        self.edge_var = np.abs(literals)
+        self.edge_negative = (literals < 0).astype(np.int64)
+        # Grupo (variável, sinal) da aresta e o grupo de sinal oposto
+        self.edge_group = 2 * self.edge_var + self.edge_negative
+        self.edge_opposite = 2 * self.edge_var + (1 - self.edge_negative)
+        self.degree = np.bincount(self.edge_var, minlength=self.num_vars + 1)
+
+        self.random = np.random.default_rng(seed)
+        self.damping = damping
+        self.tolerance = tolerance
+        self.stats: Dict[str, float] = {
+            "sp_iterations": 0,
+            "bp_iterations": 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Survey propagation
+    # ------------------------------------------------------------------
+
+    def _sp_terms(self, eta: np.ndarray):
+        groups = 2 * self.num_vars + 2
+        same, full = _cavity_products(1.0 - eta, self.edge_group, groups)
+        opposite = full[self.edge_opposite]
+        pi_u = (1.0 - opposite) * same
+        pi_s = (1.0 - same) * opposite
+        pi_0 = same * opposite
+        return pi_u, pi_u + pi_s + pi_0, full
+
+    def _sp_update(self, eta: np.ndarray) -> np.ndarray:
+        pi_u, total, _ = self._sp_terms(eta)
+        ratio = np.divide(pi_u, total, out=np.ones_like(pi_u), where=total > TINY)
+        updated, _ = _cavity_products(ratio, self.edge_clause, self.num_clauses)
+        return updated
+
+    def _complexity(self, eta: np.ndarray) -> float:
+        pi_u, total, full = self._sp_terms(eta)
+        _, clause_total = _cavity_products(total, self.edge_clause, self.num_clauses)
+        _, clause_u = _cavity_products(pi_u, self.edge_clause, self.num_clauses)
+        clause_terms = clause_total - clause_u
+
+        positive, negative = full[0::2], full[1::2]
+        var_terms = (1.0 - positive) * negative + (1.0 - negative) * positive
+        var_terms += positive * negative
+        if np.any(clause_terms <= TINY) or np.any(var_terms[1:] <= TINY):
+            return -np.inf
+        return float(
+            np.log(clause_terms).sum()
+            - ((self.degree[1:] - 1) * np.log(var_terms[1:])).sum()
+        )
+
+    def _sp_biases(self, eta: np.ndarray) -> np.ndarray:
+        _, _, full = self._sp_terms(eta)
+        positive, negative = full[0::2], full[1::2]
+        forced_true = (1.0 - positive) * negative
+        forced_false = (1.0 - negative) * positive
+        free = positive * negative
+        total = forced_true + forced_false + free
+        total[total <= TINY] = 1.0
+        return (forced_true + 0.5 * free) / total
+
+    # ------------------------------------------------------------------
+    # Belief propagation
+    # ------------------------------------------------------------------
+
+    def _bp_cavity(self, delta: np.ndarray):
+        # Produto das mensagens que pedem a cada (variável, sinal) para não
+        # falsificar suas cláusulas, com e sem a própria cláusula
+        groups = 2 * self.num_vars + 2
+        same, full = _cavity_products(1.0 - delta, self.edge_group, groups)
+        opposite = full[self.edge_opposite]
+        # μ_j→a(falsifica a): valor de j que falsifica a tem peso same
+        total = same + opposite
+        falsify = np.divide(same, total, out=np.full_like(same, 0.5), where=total > 0)
+        return falsify, full, total <= 0
+
+    def _bp_update(self, delta: np.ndarray) -> np.ndarray:
+        falsify, _, _ = self._bp_cavity(delta)
+        updated, _ = _cavity_products(falsify, self.edge_clause, self.num_clauses)
+        return updated
+
+    def _bethe_entropy(self, delta: np.ndarray) -> float:
+        falsify, full, contradiction = self._bp_cavity(delta)
+        if np.any(contradiction):
+            return -np.inf
+        _, clause_false = _cavity_products(falsify, self.edge_clause, self.num_clauses)
+        clause_terms = 1.0 - clause_false
+        var_terms = full[0::2] + full[1::2]
+        edge_terms = 1.0 - delta * falsify
+        if np.any(clause_terms <= TINY) or np.any(var_terms[1:] <= TINY):
+            return -np.inf
+        return float(
+            np.log(clause_terms).sum()
+            + np.log(var_terms[1:]).sum()
+            - np.log(edge_terms).sum()
+        )
+
+    def _bp_marginals(self, delta: np.ndarray) -> np.ndarray:
+        _, full, _ = self._bp_cavity(delta)
+        # v falso falsifica as cláusulas em que aparece positiva, e vice-versa
+        weight_false, weight_true = full[0::2], full[1::2]
+        total = weight_false + weight_true
+        return np.divide(
+            weight_true, total, out=np.full_like(total, 0.5), where=total > 0
+        )
+
+    # ------------------------------------------------------------------
+    # Iteração
+    # ------------------------------------------------------------------
+
+    def _iterate(self, update, messages, deadline, max_iterations, counter):
+        for _ in range(max_iterations):
+            self.stats[counter] += 1
+            updated = update(messages)
+            change = float(np.max(np.abs(updated - messages))) if len(messages) else 0
+            messages = self.damping * messages + (1.0 - self.damping) * updated
+            if change < self.tolerance:
+                return messages, True
+            if time.monotonic() > deadline:
+                break
+        return messages, False
+
+    def estimate(
+        self, time_limit: float = 1.0, max_iterations: int = 1000
+    ) -> Dict[str, object]:
+        """
+        Executa SP (e BP na fase fácil) dentro do orçamento
+
+        Retorna: {"sat_probability", "phase", "converged", "complexity",
+        "entropy", "marginals"}, com marginals[v] ≈ P(x_v verdadeiro)
+        """
+        deadline = time.monotonic() + time_limit
+        result = {
+            "sat_probability": 0.5,
+            "phase": "unknown",
+            "converged": False,
+            "complexity": None,
+            "entropy": None,
+            "marginals": np.full(self.num_vars + 1, 0.5),
+        }
+        if self.has_empty_clause:
+            result.update(sat_probability=0.0, phase="contradiction", converged=True)
+            return result
+
+        eta = self.random.uniform(0.0, 1.0, len(self.edge_var))
+        eta, converged = self._iterate(
+            self._sp_update, eta, deadline, max_iterations, "sp_iterations"
+        )
+        if converged and np.max(eta, initial=0.0) > 10 * self.tolerance:
+            complexity = self._complexity(eta)
+            result.update(
+                converged=True,
+                phase="clustered" if complexity > -np.inf else "contradiction",
+                complexity=complexity,
+                sat_probability=float(-np.expm1(-np.exp(min(complexity, 700.0)))),
+                marginals=self._sp_biases(eta),
+            )
+            return result
+
+        delta = np.full(len(self.edge_var), 0.5)
+        delta, bp_converged = self._iterate(
+            self._bp_update, delta, deadline, max_iterations, "bp_iterations"
+        )
+        result["marginals"] = self._bp_marginals(delta)
+        if bp_converged:
+            entropy = self._bethe_entropy(delta)
+            result.update(
+                converged=True,
+                phase="easy" if converged else "unknown",
+                entropy=entropy,
+                sat_probability=float(-np.expm1(-np.exp(min(entropy, 700.0)))),
+            )
+        return result
@@ -0,0 +1,142 @@
+import numpy as np
+from typing import Dict, Iterable, Optional, Sequence, Union
+from app.models.database import DataPoint
+from sqlalchemy.orm import Session
+from datetime import datetime, timezone
+from uuid import UUID
+
+# Chave usada em Session.info para compartilhar snapshots durante uma requisição
+SNAPSHOT_CACHE_KEY = "metric_snapshots"
+
+
+def _expiration_timestamp(expiration: Optional[datetime]) -> float:
+    """
+    Converte a expiração de confiabilidade em segundos UTC (inf quando não expira)
+    """
+    if expiration is None:
+        return np.inf
+    if expiration.tzinfo is None:
+        expiration = expiration.replace(tzinfo=timezone.utc)
+    return expiration.timestamp()
+
+
+class MetricSnapshot:
+    """
+    Fotografia dos dados confiáveis de uma métrica
+
+    Guarda em arrays compactos o valor D_k, a latência latency_k e a expiração
+    da confiabilidade de cada dado confiável, lidos uma única vez do banco.
+    Todas as fórmulas do motor (μ, latência, erro, softmin, busca de β) podem
+    ser avaliadas a partir da mesma fotografia.
+    """
+
+    __slots__ = ("metric_id", "values", "latencies", "expirations")
+
+    def __init__(
+        self,
+        metric_id: Union[str, UUID],
+        values: np.ndarray,
+        latencies: np.ndarray,
+        expirations: np.ndarray,
+    ):
+        self.metric_id = str(metric_id)
+        self.values = values
+        self.latencies = latencies
+        self.expirations = expirations
+
+    @classmethod
+    def from_rows(
+        cls, metric_id: Union[str, UUID], rows: Sequence[tuple]
+    ) -> "MetricSnapshot":
+        """
+        Cria a fotografia a partir de linhas (value, latency, reliability_expiration)
+        """
+        count = len(rows)
+        return cls(
+            metric_id,
+            np.fromiter((float(row[0]) for row in rows), dtype=np.float64, count=count),
+            np.fromiter(
+                (float(row[1] or 0.0) for row in rows), dtype=np.float64, count=count
+            ),
+            np.fromiter(
+                (_expiration_timestamp(row[2]) for row in rows),
+                dtype=np.float64,
+                count=count,
+            ),
+        )
+
+    @classmethod
+    def load(cls, db: Session, metric_id: Union[str, UUID]) -> "MetricSnapshot":
+        """
+        Lê os dados confiáveis de uma métrica em uma única consulta
+        """
+        return cls.load_many(db, [metric_id])[str(metric_id)]
+
+    @classmethod
+    def load_many(
+        cls, db: Session, metric_ids: Iterable[Union[str, UUID]]
+    ) -> Dict[str, "MetricSnapshot"]:
+        """
+        Lê os dados confiáveis de várias métricas em uma única consulta
+        """
+        ids = [str(metric_id) for metric_id in metric_ids]
+        if not ids:
+            return {}
+
+        rows = (
+            db.query(
+                DataPoint.metric_id,
+                DataPoint.value,
+                DataPoint.latency,
+                DataPoint.reliability_expiration,
+            )
+            .filter(DataPoint.metric_id.in_(ids), DataPoint.is_reliable == True)
+            .all()
+        )
+
+        grouped = {metric_id: [] for metric_id in ids}
+        for metric_id, value, latency, expiration in rows:
+            grouped[str(metric_id)].append((value, latency, expiration))
+
+        return {
+            metric_id: cls.from_rows(metric_id, metric_rows)
+            for metric_id, metric_rows in grouped.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def alive_mask(self, current_time: Optional[datetime] = None) -> np.ndarray:
+        """
+        Dados cuja confiabilidade ainda não expirou em current_time
+        """
+        if current_time is None:
+            current_time = datetime.utcnow()
+        return self.expirations > _expiration_timestamp(current_time)
+
+    def mu(self) -> float:
+        """
+        μ_j = média(D_k confiáveis)
+        """
+        if len(self.values) == 0:
+            return 0.0
+        return float(self.values.mean())
+
+    def latency(self) -> float:
+        """
+        latency_j = Σ (|D_k| / Σ|D|) * latency_k
+        """
+        sizes = np.abs(self.values)
+        total_size = sizes.sum()
+        if total_size == 0:
+            return 0.0
+        return float(np.dot(sizes, self.latencies) / total_size)
+
+    def error(self, mu: float, current_time: Optional[datetime] = None) -> float:
+        """
+        erro_j = |μ_j - média(D_k confiáveis não expirados)|
+        """
+        alive = self.values[self.alive_mask(current_time)]
+        if len(alive) == 0:
+            return 0.0
+        return abs(mu - float(alive.mean()))
@@ -0,0 +1,56 @@
+import numpy as np
+from typing import Tuple, Union
+
+ArrayLike = Union[float, np.ndarray]
+
+
+def _negative_scaled_logsumexp(
+    operands: Tuple[ArrayLike, ...], beta: ArrayLike
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Empilha os operandos e calcula log Σ exp(-β x_i) de forma estável
+
+    Retorna: (operandos empilhados no eixo 0, logsumexp, pesos softmax p_i)
+    """
+    if not operands:
+        raise ValueError("softmin requer ao menos um operando")
+
+    stacked = np.stack(np.broadcast_arrays(*operands)).astype(np.float64)
+    beta = np.asarray(beta, dtype=np.float64)
+    if np.any(beta <= 0):
+        raise ValueError("beta deve ser positivo")
+
+    exponents = -beta * stacked
+    shift = exponents.max(axis=0)
+    shift = np.where(np.isfinite(shift), shift, 0.0)
+    scaled = np.exp(exponents - shift)
+    total = scaled.sum(axis=0)
+    return stacked, shift + np.log(total), scaled / total
+
+
+def softmin(*operands: ArrayLike, beta: ArrayLike = 1.0) -> ArrayLike:
+    """
+    Softmin n-ário, elemento a elemento, calculado via logsumexp
+
+    softmin(x_1, ..., x_n) = -log(Σ exp(-β x_i)) / β
+
+    Os operandos podem ser escalares ou arrays NumPy (com broadcasting); o
+    deslocamento pelo máximo evita OverflowError para β * x grandes.
+    """
+    _, logsumexp, _ = _negative_scaled_logsumexp(operands, beta)
+    result = -logsumexp / np.asarray(beta, dtype=np.float64)
+    return float(result) if np.ndim(result) == 0 else result
+
+
+def softmin_grad_beta(*operands: ArrayLike, beta: ArrayLike = 1.0) -> ArrayLike:
+    """
+    Derivada do softmin em relação a β
+
+    d softmin / dβ = (Σ p_i x_i - softmin) / β,  p = softmax(-β x)
+    """
+    stacked, logsumexp, weights = _negative_scaled_logsumexp(operands, beta)
+    beta = np.asarray(beta, dtype=np.float64)
+    value = -logsumexp / beta
+    expected = (weights * stacked).sum(axis=0)
+    result = (expected - value) / beta
+    return float(result) if np.ndim(result) == 0 else result
@@ -0,0 +1,169 @@
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+from app.math.cdcl import CDCLSolver
+from app.math.ksat import KSatInstance
+from app.models.database import DataPoint, Vote
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from uuid import UUID
+
+# Orçamento padrão (segundos) da extração de núcleo
+CORE_TIME_LIMIT = 2.0
+
+
+class UnsatCore:
+    """
+    Núcleo insatisfatível de um mercado, em termos das entidades de origem
+
+    groups são as entidades (kind, id) cujas cláusulas juntas já são
+    insatisfatíveis: métricas, votos e usuários. Como votos não são
+    alterados nem removidos e a equivalência dos votos de um usuário só
+    ganha membros, o núcleo só deixa de valer quando uma de suas métricas
+    ganha um voto positivo (sua cláusula fica mais fraca). Por isso basta
+    guardar o número de votos positivos de cada métrica do núcleo.
+    """
+
+    def __init__(
+        self,
+        market_id: Union[str, UUID],
+        groups: List[Tuple[str, str]],
+        metric_supporters: Dict[str, int],
+        minimal: bool,
+    ):
+        self.market_id = str(market_id)
+        self.groups = groups
+        self.metric_supporters = metric_supporters
+        self.minimal = minimal
+
+    def __len__(self) -> int:
+        return len(self.groups)
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Entidades do núcleo agrupadas por tipo
+        """
+        summary: Dict[str, Any] = {"metrics": [], "votes": [], "users": []}
+        for kind, entity_id in self.groups:
+            summary.setdefault(f"{kind}s", []).append(entity_id)
+        summary["minimal"] = self.minimal
+        return summary
+
+    def still_holds(self, db: Session) -> bool:
+        """
+        Verifica se o núcleo continua presente, com uma consulta O(núcleo)
+        """
+        if not self.metric_supporters:
+            return True
+        counts = dict(
+            db.query(DataPoint.metric_id, func.count(Vote.id))
+            .join(Vote, Vote.data_point_id == DataPoint.id)
+            .filter(
+                DataPoint.metric_id.in_(list(self.metric_supporters)),
+                Vote.is_reliable == True,
+            )
+            .group_by(DataPoint.metric_id)
+            .all()
+        )
+        counts = {str(metric_id): count for metric_id, count in counts.items()}
+        return all(
+            counts.get(metric_id, 0) == supporters
+            for metric_id, supporters in self.metric_supporters.items()
+        )
+
+
+def extract_core(
+    instance: KSatInstance, time_limit: Optional[float] = CORE_TIME_LIMIT
+) -> Optional[UnsatCore]:
+    """
+    Extrai um núcleo insatisfatível mínimo por entidade de origem
+
+    Cada entidade (kind, id) recebe um seletor s: suas cláusulas viram
+    (C ∨ ¬s) e todos os seletores são assumidos. O conjunto de suposições
+    que falham dá um núcleo inicial, reduzido por remoção: uma entidade sai
+    do núcleo se as demais continuam insatisfatíveis. Esgotado time_limit,
+    o núcleo retornado é válido mas pode não ser mínimo.
+
+    Retorna: UnsatCore, ou None se a instância for satisfatível ou o
+    orçamento acabar antes da primeira prova
+    """
+    deadline = time.monotonic() + time_limit if time_limit is not None else None
+
+    def remaining() -> Optional[float]:
+        if deadline is None:
+            return None
+        return max(deadline - time.monotonic(), 0.0)
+
+    selectors: Dict[Tuple[str, str], int] = {}
+    solver = CDCLSolver(instance.num_vars)
+    next_var = instance.num_vars
+    for clause, origin in zip(instance.clauses, instance.clause_origins):
+        selector = selectors.get(origin)
+        if selector is None:
+            next_var += 1
+            selector = selectors[origin] = next_var
+        solver.add_clause(clause + [-selector])
+    groups = {selector: origin for origin, selector in selectors.items()}
+
+    if solver.solve(list(groups), time_limit=remaining()) is not False:
+        return None
+    core = set(solver.failed_assumptions)
+    minimal = True
+
+    # Remoção: tenta retirar cada entidade, das métricas para os votos
+    for selector in sorted(core, key=lambda s: groups[s][0] != "metric"):
+        if selector not in core:
+            continue
+        if deadline is not None and time.monotonic() > deadline:
+            minimal = False
+            break
+        result = solver.solve(
+            [other for other in core if other != selector], time_limit=remaining()
+        )
+        if result is False:
+            # Continua insatisfatível: fica só o que a prova usou
+            core = set(solver.failed_assumptions) or (core - {selector})
+        elif result is None:
+            minimal = False
+            break
+
+    core_groups = sorted(groups[selector] for selector in core)
+    core_metrics = {entity_id for kind, entity_id in core_groups if kind == "metric"}
+    metric_supporters = {
+        entity_id: len(clause)
+        for clause, (kind, entity_id) in zip(instance.clauses, instance.clause_origins)
+        if kind == "metric" and entity_id in core_metrics
+    }
+    return UnsatCore(instance.market_id, core_groups, metric_supporters, minimal)
+
+
+# Núcleos por mercado (locais ao processo)
+_market_cores: Dict[str, UnsatCore] = {}
+_cores_lock = threading.Lock()
+
+
+def get_market_core(market_id: Union[str, UUID]) -> Optional[UnsatCore]:
+    """
+    Retorna o último núcleo extraído do mercado, se houver
+    """
+    with _cores_lock:
+        return _market_cores.get(str(market_id))
+
+
+def store_market_core(core: UnsatCore):
+    """
+    Guarda o núcleo do mercado, substituindo o anterior
+    """
+    with _cores_lock:
+        _market_cores[core.market_id] = core
+
+
+def discard_market_core(market_id: Union[str, UUID] = None):
+    """
+    Descarta o núcleo de um mercado (ou de todos)
+    """
+    with _cores_lock:
+        if market_id is None:
+            _market_cores.clear()
+        else:
+            _market_cores.pop(str(market_id), None)
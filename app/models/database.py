@@ -11,8 +11,11 @@ from sqlalchemy import (
     Integer,
     ForeignKey,
     UniqueConstraint,
+    Index,
+    JSON,
+    text,
 )
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import relationship
 import uuid
 from datetime import datetime
@@ -31,11 +34,30 @@ from sqlalchemy import (
     ForeignKey,
     UniqueConstraint,
 )
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
 from sqlalchemy.orm import relationship
+from sqlalchemy.types import TypeDecorator
 import uuid
 from datetime import datetime
 
+
+class UUID(TypeDecorator):
+    """
+    UUID do PostgreSQL que também aceita o id como texto
+
+    Os serviços passam ids como str; o psycopg2 os aceita, mas nos demais
+    bancos (o SQLite do DATABASE_URL padrão) o tipo exige uuid.UUID.
+    """
+
+    impl = PG_UUID
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if isinstance(value, str):
+            return uuid.UUID(value)
+        return value
+
+
 Base = declarative_base()
 
 
@@ -58,12 +80,18 @@ class User(Base):
 
 class Market(Base):
     __tablename__ = "markets"
+    # Paginação por cursor em (created_at, id)
+    __table_args__ = (
+        Index("idx_markets_created_at", text("created_at DESC"), text("id DESC")),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String(255), nullable=False)
     description = Column(Text)
     is_active = Column(Boolean, default=True)
-    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+    created_at = Column(
+        DateTime(timezone=True), default=datetime.utcnow, nullable=False
+    )
     updated_at = Column(
         DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow
     )
@@ -96,13 +124,21 @@ class Metric(Base):
 
 class ExternalSource(Base):
     __tablename__ = "external_sources"
+    # Paginação por cursor em (created_at, id)
+    __table_args__ = (
+        Index(
+            "idx_external_sources_created_at", text("created_at DESC"), text("id DESC")
+        ),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String(255), nullable=False)
     url = Column(String(500))
     verification_method = Column(String(100))
     is_active = Column(Boolean, default=True)
-    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+    created_at = Column(
+        DateTime(timezone=True), default=datetime.utcnow, nullable=False
+    )
     updated_at = Column(
         DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow
     )
@@ -112,6 +148,16 @@ class ExternalSource(Base):
 
 class DataPoint(Base):
     __tablename__ = "data_points"
+    # Paginação por cursor em (created_at, id), com e sem filtro de métrica
+    __table_args__ = (
+        Index("idx_data_points_created_at", text("created_at DESC"), text("id DESC")),
+        Index(
+            "idx_data_points_metric_id",
+            "metric_id",
+            text("created_at DESC"),
+            text("id DESC"),
+        ),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     metric_id = Column(
@@ -129,7 +175,12 @@ class DataPoint(Base):
     reliability_expiration = Column(DateTime(timezone=True), nullable=True)
     participation_rate = Column(DECIMAL(5, 4), default=0.0)
     latency = Column(DECIMAL(10, 6), default=0.0)
-    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+    # Contadores mantidos no mesmo comando que insere o voto
+    positive_votes = Column(Integer, nullable=False, default=0)
+    total_votes = Column(Integer, nullable=False, default=0)
+    created_at = Column(
+        DateTime(timezone=True), default=datetime.utcnow, nullable=False
+    )
     updated_at = Column(
         DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow
     )
@@ -181,6 +232,23 @@ class MetricValue(Base):
     metric = relationship("Metric", back_populates="metric_value")
 
 
+class MetricAggregate(Base):
+    __tablename__ = "metric_aggregates"
+
+    metric_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("metrics.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    reliable_count = Column(Integer, nullable=False, default=0)
+    value_sum = Column(DECIMAL(30, 8), nullable=False, default=0)
+    abs_value_sum = Column(DECIMAL(30, 8), nullable=False, default=0)
+    weighted_latency_sum = Column(DECIMAL(40, 14), nullable=False, default=0)
+    updated_at = Column(
+        DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+
+
 class MarketValue(Base):
     __tablename__ = "market_values"
 
@@ -207,15 +275,29 @@ class GlobalCurrencyValue(Base):
 
 class AuditLog(Base):
     __tablename__ = "audit_logs"
+    # Particionada por mês em created_at, que por isso entra na chave
+    __table_args__ = (
+        Index(
+            "idx_audit_logs_entity",
+            "entity_type",
+            "entity_id",
+            text("created_at DESC"),
+        ),
+        Index("idx_audit_logs_created_at", text("created_at DESC"), text("id DESC")),
+        Index("idx_audit_logs_user_id", "user_id", text("created_at DESC")),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"))
     entity_type = Column(String(50), nullable=False)
     entity_id = Column(UUID(as_uuid=True), nullable=False)
     action = Column(String(50), nullable=False)
-    old_values = Column(Text)
-    new_values = Column(Text)
-    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+    old_values = Column(JSON().with_variant(JSONB(), "postgresql"))
+    new_values = Column(JSON().with_variant(JSONB(), "postgresql"))
+    created_at = Column(
+        DateTime(timezone=True), primary_key=True, default=datetime.utcnow
+    )
 
     user = relationship("User", back_populates="audit_logs")
     # Removidas todas as relações problemáticas com entidades específicas
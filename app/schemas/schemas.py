@@ -1,6 +1,7 @@
+import json
 from datetime import datetime
 from typing import List, Optional, Dict, Any
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from uuid import UUID
 
 
@@ -160,6 +161,23 @@ class Vote(VoteBase):
         from_attributes = True
 
 
+class VoteBatchItem(VoteCreate):
+    user_id: UUID
+
+
+class VoteBatchCreate(BaseModel):
+    votes: List[VoteBatchItem] = Field(..., min_length=1, max_length=10000)
+
+
+class VoteBatchResponse(BaseModel):
+    votes: int
+    data_points: int
+    metrics: int
+    markets: int
+    consistency: Dict[UUID, bool] = {}
+    elapsed_ms: float
+
+
 # Schemas para Valores Calculados
 class MetricValueResponse(BaseModel):
     metric_id: UUID
@@ -198,10 +216,24 @@ class AuditLogResponse(BaseModel):
     entity_type: str
     entity_id: UUID
     action: str
-    old_values: Optional[str] = None
-    new_values: Optional[str] = None
+    old_values: Optional[Dict[str, Any]] = None
+    new_values: Optional[Dict[str, Any]] = None
     created_at: datetime
 
+    @field_validator("old_values", "new_values", mode="before")
+    @classmethod
+    def decode_legacy_values(cls, value):
+        # Registros gravados antes do JSONB guardavam o texto de json.dumps;
+        # mesma conversão de migrations/002_partitioned_jsonb_audit_logs.sql
+        while isinstance(value, str):
+            try:
+                value = json.loads(value)
+            except ValueError:
+                return {"value": value}
+        if value is None or isinstance(value, dict):
+            return value
+        return {"value": value}
+
     class Config:
         from_attributes = True
 
@@ -222,6 +254,27 @@ class DataPointWithVotes(DataPoint):
     source: Optional[ExternalSource] = None
 
 
+# Páginas das listagens por cursor: next_cursor é None na última página
+class MarketPage(BaseModel):
+    items: List[Market]
+    next_cursor: Optional[str] = None
+
+
+class ExternalSourcePage(BaseModel):
+    items: List[ExternalSource]
+    next_cursor: Optional[str] = None
+
+
+class DataPointPage(BaseModel):
+    items: List[DataPoint]
+    next_cursor: Optional[str] = None
+
+
+class AuditLogPage(BaseModel):
+    items: List[AuditLogResponse]
+    next_cursor: Optional[str] = None
+
+
 # Schemas para operações matemáticas
 class SoftminRequest(BaseModel):
     metric_id: UUID
@@ -0,0 +1,266 @@
+import os
+import re
+import threading
+from datetime import date, datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from app.core.database import SessionLocal
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# Meses à frente com partição já criada
+AUDIT_PARTITION_MONTHS_AHEAD = int(os.getenv("AUDIT_PARTITION_MONTHS_AHEAD", "3"))
+# Meses mantidos em audit_logs; partições mais antigas são desanexadas e
+# movidas para o schema de arquivo (0: nunca arquivar)
+AUDIT_RETENTION_MONTHS = int(os.getenv("AUDIT_RETENTION_MONTHS", "0"))
+AUDIT_ARCHIVE_SCHEMA = os.getenv("AUDIT_ARCHIVE_SCHEMA", "audit_archive")
+# Intervalo (segundos) entre verificações da manutenção em segundo plano
+AUDIT_PARTITION_CHECK_INTERVAL = float(
+    os.getenv("AUDIT_PARTITION_CHECK_INTERVAL", str(6 * 3600))
+)
+
+PARTITION_NAME = re.compile(r"^audit_logs_(\d{4})_(\d{2})$")
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _month_start(month: date) -> datetime:
+    """
+    Início do mês em UTC
+
+    Um DATE puro seria lido como timestamptz no TimeZone da sessão, e os
+    limites das partições mudariam com a configuração do servidor.
+    """
+    return datetime(month.year, month.month, 1, tzinfo=timezone.utc)
+
+
+def _bound_literal(month: date) -> str:
+    return f"'{month:%Y-%m}-01 00:00:00+00'"
+
+
+def _partition_name(month: date) -> str:
+    return f"audit_logs_{month.year:04d}_{month.month:02d}"
+
+
+def is_partitioned(db: Session) -> bool:
+    """
+    audit_logs é uma tabela particionada do PostgreSQL?
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return False
+    return bool(
+        db.execute(
+            text(
+                "SELECT 1 FROM pg_partitioned_table p "
+                "JOIN pg_class c ON c.oid = p.partrelid "
+                "WHERE c.oid = to_regclass('audit_logs')"
+            )
+        ).scalar()
+    )
+
+
+def list_partitions(db: Session) -> List[Tuple[str, date]]:
+    """
+    Partições mensais anexadas a audit_logs
+
+    Retorna: [(nome, primeiro dia do mês)], em ordem
+    """
+    names = db.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass('audit_logs')"
+        )
+    ).scalars()
+    partitions = []
+    for name in names:
+        match = PARTITION_NAME.match(name)
+        if match:
+            partitions.append((name, date(int(match[1]), int(match[2]), 1)))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def create_partition(db: Session, month: date) -> bool:
+    """
+    Cria a partição do mês, levando para ela o que caiu na partição padrão
+
+    A tabela é criada avulsa, recebe as linhas do mês que estiverem em
+    audit_logs_default e só então é anexada: o ATTACH exige que a partição
+    padrão não tenha linhas no intervalo.
+
+    Retorna: False se a partição já existia
+    """
+    name = _partition_name(month)
+    if db.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar():
+        return False
+    end = _add_months(month, 1)
+    bounds = {"start": _month_start(month), "end": _month_start(end)}
+    db.execute(
+        text(
+            f"CREATE TABLE {name} "
+            "(LIKE audit_logs INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        )
+    )
+    has_default = db.execute(text("SELECT to_regclass('audit_logs_default')")).scalar()
+    if has_default:
+        db.execute(
+            text(
+                f"WITH moved AS ("
+                "DELETE FROM audit_logs_default "
+                "WHERE created_at >= :start AND created_at < :end RETURNING *"
+                f") INSERT INTO {name} SELECT * FROM moved"
+            ),
+            bounds,
+        )
+    db.execute(
+        text(
+            f"ALTER TABLE audit_logs ATTACH PARTITION {name} "
+            f"FOR VALUES FROM ({_bound_literal(month)}) TO ({_bound_literal(end)})"
+        )
+    )
+    return True
+
+
+def ensure_partitions(
+    db: Session,
+    months_ahead: int = AUDIT_PARTITION_MONTHS_AHEAD,
+    today: Optional[date] = None,
+) -> List[str]:
+    """
+    Garante as partições do mês atual até months_ahead meses à frente
+
+    Retorna: nomes das partições criadas
+    """
+    if not is_partitioned(db):
+        return []
+    current = (today or datetime.utcnow().date()).replace(day=1)
+    created = []
+    for months in range(months_ahead + 1):
+        month = _add_months(current, months)
+        if create_partition(db, month):
+            created.append(_partition_name(month))
+    return created
+
+
+def archive_partitions(
+    db: Session,
+    retention_months: int = AUDIT_RETENTION_MONTHS,
+    today: Optional[date] = None,
+) -> List[str]:
+    """
+    Desanexa as partições mais antigas que retention_months e as move para
+    AUDIT_ARCHIVE_SCHEMA
+
+    As linhas continuam consultáveis em audit_archive.audit_logs_AAAA_MM
+    (ou exportáveis e descartáveis), mas saem das consultas e dos índices
+    de audit_logs.
+
+    Retorna: nomes das partições arquivadas
+    """
+    if retention_months <= 0 or not is_partitioned(db):
+        return []
+    current = (today or datetime.utcnow().date()).replace(day=1)
+    cutoff = _add_months(current, -retention_months)
+    archived = []
+    for name, month in list_partitions(db):
+        if month >= cutoff:
+            break
+        db.execute(text(f"CREATE SCHEMA IF NOT EXISTS {AUDIT_ARCHIVE_SCHEMA}"))
+        db.execute(text(f"ALTER TABLE audit_logs DETACH PARTITION {name}"))
+        db.execute(text(f"ALTER TABLE {name} SET SCHEMA {AUDIT_ARCHIVE_SCHEMA}"))
+        archived.append(name)
+    return archived
+
+
+def maintain_partitions(
+    session_factory: Callable[[], Session] = SessionLocal,
+) -> Dict[str, List[str]]:
+    """
+    Cria as partições futuras e arquiva as antigas, em uma transação
+
+    Uma trava consultiva transacional serializa a manutenção
+    entre processos da aplicação.
+
+    Retorna: {"created": [...], "archived": [...]}
+    """
+    db = session_factory()
+    try:
+        if db.get_bind().dialect.name == "postgresql":
+            db.execute(text("SELECT pg_advisory_xact_lock(hashtext('audit_logs'))"))
+        result = {
+            "created": ensure_partitions(db),
+            "archived": archive_partitions(db),
+        }
+        db.commit()
+        return result
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+class PartitionMaintainer:
+    """
+    Executa maintain_partitions na partida e a cada interval segundos
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        interval: float = AUDIT_PARTITION_CHECK_INTERVAL,
+    ):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.stopping = False
+        self.thread: Optional[threading.Thread] = None
+        self.condition = threading.Condition()
+        self.stats: Dict[str, Any] = {
+            "runs": 0,
+            "created": [],
+            "archived": [],
+            "errors": 0,
+            "last_error": None,
+        }
+
+    def start(self):
+        with self.condition:
+            if self.thread is None or not self.thread.is_alive():
+                self.stopping = False
+                self.thread = threading.Thread(
+                    target=self._run, name="audit-partitions", daemon=True
+                )
+                self.thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        with self.condition:
+            self.stopping = True
+            self.condition.notify_all()
+            thread = self.thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _run(self):
+        while True:
+            try:
+                result = maintain_partitions(self.session_factory)
+            except Exception as error:
+                with self.condition:
+                    self.stats["errors"] += 1
+                    self.stats["last_error"] = repr(error)
+            else:
+                with self.condition:
+                    self.stats["runs"] += 1
+                    self.stats["created"] += result["created"]
+                    self.stats["archived"] += result["archived"]
+            with self.condition:
+                if not self.stopping:
+                    self.condition.wait(self.interval)
+                if self.stopping:
+                    return
+
+
+# Manutenção do processo, iniciada com a aplicação
+partition_maintainer = PartitionMaintainer()
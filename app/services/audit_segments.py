@@ -0,0 +1,584 @@
+import fcntl
+import hashlib
+import json
+import os
+import struct
+import threading
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+from uuid import UUID
+import numpy as np
+
+# Registro: [comprimento u32][crc32 u32][JSON][comprimento u32]; o
+# comprimento repetido no fim permite ler o segmento de trás para frente
+HEADER = struct.Struct("<II")
+TRAILER = struct.Struct("<I")
+FRAMING = HEADER.size + TRAILER.size
+
+# Índice de entidade de um segmento selado: (hash da entidade, offset)
+ENTITY_INDEX_DTYPE = np.dtype([("key", "<u8"), ("offset", "<u8")])
+# Índice de tempo por blocos de time_index_interval registros consecutivos:
+# menor e maior timestamp do bloco e o trecho [start, end) do segmento
+TIME_BLOCK_DTYPE = np.dtype(
+    [
+        ("min_timestamp", "<i8"),
+        ("max_timestamp", "<i8"),
+        ("segment", "<u8"),
+        ("start", "<u8"),
+        ("end", "<u8"),
+    ]
+)
+TIME_BLOCKS_FILE = "time-blocks.idx"
+# Índice esparso das versões anteriores, que supunha tempo crescente
+LEGACY_TIME_INDEX_FILE = "time.idx"
+
+
+def entity_key(entity_type: str, entity_id: Union[str, UUID]) -> int:
+    """
+    Hash de 64 bits de (entity_type, entity_id) usado nos índices
+    """
+    digest = hashlib.blake2b(
+        f"{entity_type}\0{entity_id}".encode(), digest_size=8
+    ).digest()
+    return int.from_bytes(digest, "little")
+
+
+def _timestamp_us(created_at: Union[str, datetime]) -> int:
+    if isinstance(created_at, str):
+        created_at = datetime.fromisoformat(created_at)
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return int(created_at.timestamp() * 1_000_000)
+
+
+class SegmentedAuditLog:
+    """
+    Log de auditoria append-only em arquivos de segmento
+
+    Cada segmento audit-NNNNNNNN.log recebe registros com prefixo de
+    comprimento até passar de segment_bytes; aí é selado e ganha um índice
+    audit-NNNNNNNN.idx com os pares (hash da entidade, offset) ordenados,
+    lido por memória mapeada e busca binária. O segmento ativo é indexado
+    em memória (reconstruído na abertura).
+
+    created_at é carimbado quando a entrada é registrada, mas a gravação só
+    acontece depois do commit da transação, então a ordem do log não é a
+    ordem de created_at. Por isso time-blocks.idx guarda, para cada bloco de
+    time_index_interval registros consecutivos, o menor e o maior timestamp
+    e o trecho do segmento (um zone map, também mapeado em memória): uma
+    busca por intervalo lê só os blocos que o intersectam, mais o final
+    ainda não indexado de cada segmento, e filtra registro a registro.
+
+    Um único processo escreve por diretório (trava exclusiva em LOCK);
+    outros podem abrir com readonly=True. Na abertura, um registro final
+    truncado (queda durante a escrita) é descartado.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        segment_bytes: int = 64 * 1024 * 1024,
+        time_index_interval: int = 64,
+        fsync: bool = True,
+        readonly: bool = False,
+    ):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.time_index_interval = time_index_interval
+        self.fsync = fsync
+        self.readonly = readonly
+        self.lock = threading.RLock()
+        self.lock_file = None
+        # Índices mapeados dos segmentos selados e do tempo, por tamanho
+        self.entity_indexes: Dict[int, np.ndarray] = {}
+        self.time_blocks: Optional[np.ndarray] = None
+        self.time_blocks_size = -1
+        # Bloco de tempo em aberto do segmento ativo: [start, min, max, registros]
+        self.open_block: Optional[List[int]] = None
+
+        os.makedirs(directory, exist_ok=True)
+        if not readonly:
+            self.lock_file = open(os.path.join(directory, "LOCK"), "a")
+            fcntl.flock(self.lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+        segments = self._segments()
+        self.active = segments[-1] if segments else 0
+        for segment in segments[:-1]:
+            if not os.path.exists(self._path(segment, "idx")) and not readonly:
+                self._seal(segment)
+        self._open_active()
+
+    # ------------------------------------------------------------------
+    # Arquivos
+    # ------------------------------------------------------------------
+
+    def _path(self, segment: int, suffix: str) -> str:
+        return os.path.join(self.directory, f"audit-{segment:08d}.{suffix}")
+
+    def _segments(self) -> List[int]:
+        return sorted(
+            int(name[6:14])
+            for name in os.listdir(self.directory)
+            if name.startswith("audit-") and name.endswith(".log")
+        )
+
+    def _scan(
+        self, segment: int, start: int = 0, end: Optional[int] = None
+    ) -> Iterator[Tuple[int, bytes]]:
+        """
+        Percorre os registros íntegros do segmento em [start, end): (offset, JSON)
+        """
+        path = self._path(segment, "log")
+        if not os.path.exists(path):
+            return
+        with open(path, "rb") as stream:
+            stream.seek(start)
+            offset = start
+            while end is None or offset < end:
+                header = stream.read(HEADER.size)
+                if len(header) < HEADER.size:
+                    return
+                length, checksum = HEADER.unpack(header)
+                payload = stream.read(length)
+                trailer = stream.read(TRAILER.size)
+                if (
+                    len(payload) < length
+                    or len(trailer) < TRAILER.size
+                    or TRAILER.unpack(trailer)[0] != length
+                    or zlib.crc32(payload) != checksum
+                ):
+                    return
+                yield offset, payload
+                offset += FRAMING + length
+
+    def _open_active(self):
+        """
+        Reconstrói o índice em memória do segmento ativo e corta um final
+        truncado
+        """
+        self.active_index: Dict[int, List[int]] = {}
+        self.active_records = 0
+        end = 0
+        for offset, payload in self._scan(self.active):
+            record = json.loads(payload)
+            key = entity_key(record["entity_type"], record["entity_id"])
+            self.active_index.setdefault(key, []).append(offset)
+            self.active_records += 1
+            end = offset + FRAMING + len(payload)
+        self.active_size = end
+
+        if self.readonly:
+            return
+        path = self._path(self.active, "log")
+        with open(path, "ab") as stream:
+            if stream.tell() > end:
+                stream.truncate(end)
+        self._recover_time_blocks()
+        self.stream = open(path, "ab")
+
+    def _recover_time_blocks(self):
+        """
+        Acerta time-blocks.idx com os segmentos na abertura
+
+        Descarta blocos além do que sobrou do segmento ativo e indexa o final
+        de cada segmento que ficou sem blocos (queda entre a escrita do log e
+        a do índice, ou diretório de uma versão com time.idx). O resto do
+        segmento ativo vira o bloco em aberto.
+        """
+        path = os.path.join(self.directory, TIME_BLOCKS_FILE)
+        entries = (
+            np.fromfile(path, dtype=TIME_BLOCK_DTYPE)
+            if os.path.exists(path)
+            else np.zeros(0, dtype=TIME_BLOCK_DTYPE)
+        )
+        keep = (entries["segment"] < self.active) | (
+            (entries["segment"] == self.active) & (entries["end"] <= self.active_size)
+        )
+        if not keep.all():
+            entries = entries[keep]
+            entries.tofile(path)
+
+        self.open_block = None
+        recovered = []
+        for segment in self._segments():
+            for offset, payload in self._scan(
+                segment, self._indexed_end(entries, segment)
+            ):
+                record = json.loads(payload)
+                self._add_to_block(
+                    segment,
+                    _timestamp_us(record["created_at"]),
+                    offset,
+                    offset + FRAMING + len(payload),
+                    recovered,
+                )
+            if segment != self.active:
+                self._close_block(segment, self._segment_size(segment), recovered)
+        self._write_time_blocks(recovered)
+
+        legacy = os.path.join(self.directory, LEGACY_TIME_INDEX_FILE)
+        if os.path.exists(legacy):
+            os.remove(legacy)
+
+    @staticmethod
+    def _indexed_end(entries: np.ndarray, segment: int) -> int:
+        # Os blocos são gravados em ordem de (segmento, offset)
+        position = int(np.searchsorted(entries["segment"], segment, "right"))
+        if position == 0 or int(entries["segment"][position - 1]) != segment:
+            return 0
+        return int(entries["end"][position - 1])
+
+    def _segment_size(self, segment: int) -> int:
+        if segment == self.active:
+            return self.active_size
+        return os.path.getsize(self._path(segment, "log"))
+
+    def _seal(self, segment: int):
+        """
+        Grava o índice de entidades ordenado de um segmento completo
+        """
+        keys = []
+        for offset, payload in self._scan(segment):
+            record = json.loads(payload)
+            keys.append(
+                (entity_key(record["entity_type"], record["entity_id"]), offset)
+            )
+        index = np.array(sorted(keys), dtype=ENTITY_INDEX_DTYPE)
+        temporary = self._path(segment, "idx.tmp")
+        index.tofile(temporary)
+        os.replace(temporary, self._path(segment, "idx"))
+
+    def _entity_index(self, segment: int) -> np.ndarray:
+        index = self.entity_indexes.get(segment)
+        if index is None:
+            path = self._path(segment, "idx")
+            if not os.path.exists(path) or os.path.getsize(path) == 0:
+                index = np.zeros(0, dtype=ENTITY_INDEX_DTYPE)
+            else:
+                index = np.memmap(path, dtype=ENTITY_INDEX_DTYPE, mode="r")
+            self.entity_indexes[segment] = index
+        return index
+
+    def _time_block_entries(self) -> np.ndarray:
+        path = os.path.join(self.directory, TIME_BLOCKS_FILE)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if size != self.time_blocks_size:
+            count = size // TIME_BLOCK_DTYPE.itemsize
+            self.time_blocks = (
+                np.memmap(path, dtype=TIME_BLOCK_DTYPE, mode="r", shape=(count,))
+                if count
+                else np.zeros(0, dtype=TIME_BLOCK_DTYPE)
+            )
+            self.time_blocks_size = size
+        return self.time_blocks
+
+    def _read(self, segment: int, offset: int) -> Dict[str, Any]:
+        with open(self._path(segment, "log"), "rb") as stream:
+            stream.seek(offset)
+            length, _ = HEADER.unpack(stream.read(HEADER.size))
+            return json.loads(stream.read(length))
+
+    # ------------------------------------------------------------------
+    # Escrita
+    # ------------------------------------------------------------------
+
+    def append(self, rows: List[Dict[str, Any]]):
+        """
+        Acrescenta os registros em uma única escrita (e um fsync)
+        """
+        if self.readonly:
+            raise PermissionError("Log de auditoria aberto somente para leitura")
+        with self.lock:
+            buffer = bytearray()
+            time_blocks = []
+            for row in rows:
+                if self.active_size + len(buffer) >= self.segment_bytes:
+                    self._write(buffer, time_blocks)
+                    buffer, time_blocks = bytearray(), []
+                    self._rotate()
+                payload = json.dumps(row, default=str).encode()
+                offset = self.active_size + len(buffer)
+                self._add_to_block(
+                    self.active,
+                    _timestamp_us(row["created_at"]),
+                    offset,
+                    offset + FRAMING + len(payload),
+                    time_blocks,
+                )
+                key = entity_key(row["entity_type"], row["entity_id"])
+                self.active_index.setdefault(key, []).append(offset)
+                self.active_records += 1
+                buffer += HEADER.pack(len(payload), zlib.crc32(payload))
+                buffer += payload
+                buffer += TRAILER.pack(len(payload))
+            self._write(buffer, time_blocks)
+
+    def _add_to_block(
+        self, segment: int, timestamp: int, offset: int, end: int, closed: List[tuple]
+    ):
+        """
+        Acrescenta um registro ao bloco de tempo em aberto; o bloco completo
+        (time_index_interval registros) vai para closed
+        """
+        block = self.open_block
+        if block is None:
+            block = self.open_block = [offset, timestamp, timestamp, 0]
+        block[1] = min(block[1], timestamp)
+        block[2] = max(block[2], timestamp)
+        block[3] += 1
+        if block[3] >= self.time_index_interval:
+            closed.append((block[1], block[2], segment, block[0], end))
+            self.open_block = None
+
+    def _close_block(self, segment: int, end: int, closed: List[tuple]):
+        # Fim de segmento: o bloco em aberto é fechado mesmo incompleto
+        block = self.open_block
+        if block is not None:
+            closed.append((block[1], block[2], segment, block[0], end))
+            self.open_block = None
+
+    def _write_time_blocks(self, time_blocks: List[tuple]):
+        if time_blocks:
+            with open(os.path.join(self.directory, TIME_BLOCKS_FILE), "ab") as stream:
+                stream.write(np.array(time_blocks, dtype=TIME_BLOCK_DTYPE).tobytes())
+
+    def _write(self, buffer: bytearray, time_blocks: List[tuple]):
+        if not buffer:
+            return
+        self.stream.write(buffer)
+        self.stream.flush()
+        if self.fsync:
+            os.fsync(self.stream.fileno())
+        self.active_size += len(buffer)
+        # Depois do log: um bloco nunca aponta para registros não gravados
+        self._write_time_blocks(time_blocks)
+
+    def _rotate(self):
+        self.stream.close()
+        time_blocks = []
+        self._close_block(self.active, self.active_size, time_blocks)
+        self._write_time_blocks(time_blocks)
+        self._seal(self.active)
+        self.active += 1
+        self.active_index = {}
+        self.active_records = 0
+        self.active_size = 0
+        self.stream = open(self._path(self.active, "log"), "ab")
+
+    def close(self):
+        with self.lock:
+            if not self.readonly:
+                self.stream.close()
+                fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+                self.lock_file.close()
+
+    # ------------------------------------------------------------------
+    # Leitura
+    # ------------------------------------------------------------------
+
+    def entity_history(
+        self, entity_type: str, entity_id: Union[str, UUID]
+    ) -> List[Dict[str, Any]]:
+        """
+        Todos os registros de uma entidade, do mais recente ao mais antigo
+
+        Busca binária no índice mapeado de cada segmento selado e consulta
+        direta ao índice do segmento ativo.
+        """
+        entity_id = str(entity_id)
+        key = entity_key(entity_type, entity_id)
+        with self.lock:
+            if self.readonly:
+                self._refresh_readonly()
+            locations = [
+                (self.active, offset) for offset in self.active_index.get(key, [])
+            ]
+            for segment in self._segments():
+                if segment == self.active:
+                    continue
+                index = self._entity_index(segment)
+                start, stop = np.searchsorted(index["key"], [key, key + 1])
+                locations += [
+                    (segment, int(offset)) for offset in index["offset"][start:stop]
+                ]
+
+        records = [self._read(segment, offset) for segment, offset in locations]
+        records = [
+            record
+            for record in records
+            if record["entity_type"] == entity_type and record["entity_id"] == entity_id
+        ]
+        records.sort(key=lambda record: record["created_at"], reverse=True)
+        return records
+
+    def _reverse(self, segment: int, end: int) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Registros do segmento de trás para frente, a partir de end
+
+        Retorna: (offset do registro, registro)
+        """
+        path = self._path(segment, "log")
+        if not os.path.exists(path):
+            return
+        with open(path, "rb") as stream:
+            position = end
+            while position >= FRAMING:
+                stream.seek(position - TRAILER.size)
+                (length,) = TRAILER.unpack(stream.read(TRAILER.size))
+                start = position - FRAMING - length
+                stream.seek(start + HEADER.size)
+                yield start, json.loads(stream.read(length))
+                position = start
+
+    def _walk_back(
+        self,
+        before: Optional[Tuple[int, int]] = None,
+        entity_type: Optional[str] = None,
+        user_id: Optional[Union[str, UUID]] = None,
+    ) -> Iterator[Tuple[Tuple[int, int], Dict[str, Any]]]:
+        """
+        Registros do fim do log para trás, a partir da posição before
+        (exclusiva), filtrados por tipo de entidade e usuário
+
+        Retorna: ((segmento, offset), registro)
+        """
+        user_id = str(user_id) if user_id is not None else None
+        with self.lock:
+            if self.readonly:
+                self._refresh_readonly()
+            ends = [(self.active, self.active_size)]
+            ends += [
+                (segment, os.path.getsize(self._path(segment, "log")))
+                for segment in reversed(self._segments())
+                if segment != self.active
+            ]
+        if before is not None:
+            ends = [
+                (segment, before[1] if segment == before[0] else end)
+                for segment, end in ends
+                if segment <= before[0]
+            ]
+
+        for segment, end in ends:
+            for offset, record in self._reverse(segment, end):
+                if entity_type is not None and record["entity_type"] != entity_type:
+                    continue
+                if user_id is not None and record.get("user_id") != user_id:
+                    continue
+                yield (segment, offset), record
+
+    def recent(
+        self,
+        limit: int = 100,
+        offset: int = 0,
+        entity_type: Optional[str] = None,
+        user_id: Optional[Union[str, UUID]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Registros mais recentes, lidos do fim do log para trás
+        """
+        records = []
+        for index, (_, record) in enumerate(
+            self._walk_back(entity_type=entity_type, user_id=user_id)
+        ):
+            if index < offset:
+                continue
+            records.append(record)
+            if len(records) >= limit:
+                break
+        return records
+
+    def recent_page(
+        self,
+        limit: int = 100,
+        before: Optional[Tuple[int, int]] = None,
+        entity_type: Optional[str] = None,
+        user_id: Optional[Union[str, UUID]] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[Tuple[int, int]]]:
+        """
+        Página de registros anteriores à posição before
+
+        A posição (segmento, offset) do último registro da página é o ponto
+        de partida da seguinte, sem reler as páginas anteriores.
+
+        Retorna: (registros, posição para a próxima página ou None)
+        """
+        records = []
+        for position, record in self._walk_back(before, entity_type, user_id):
+            if len(records) == limit:
+                return records, last
+            records.append(record)
+            last = position
+        return records, None
+
+    def between(
+        self, start: datetime, end: datetime, entity_type: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Registros com created_at em [start, end), em ordem de gravação
+        """
+        return list(self.iter_between(start, end, entity_type))
+
+    def iter_between(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        entity_type: Optional[str] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Percorre os registros com created_at em [start, end), em ordem de
+        gravação, sem carregá-los todos
+
+        Lê os blocos de time-blocks.idx cujo intervalo [menor, maior
+        timestamp] intersecta [start, end) e o final ainda não indexado de
+        cada segmento (o bloco em aberto). Como created_at não cresce com a
+        posição no log, nenhuma leitura para no primeiro registro fora do
+        intervalo: cada registro lido é filtrado. Sem start ou sem end, o
+        intervalo fica aberto daquele lado.
+        """
+        start_us = _timestamp_us(start) if start is not None else None
+        end_us = _timestamp_us(end) if end is not None else None
+        with self.lock:
+            if self.readonly:
+                self._refresh_readonly()
+            entries = self._time_block_entries()
+            selected = np.ones(len(entries), dtype=bool)
+            if start_us is not None:
+                selected &= entries["max_timestamp"] >= start_us
+            if end_us is not None:
+                selected &= entries["min_timestamp"] < end_us
+            ranges = [
+                (int(segment), int(block_start), int(block_end))
+                for segment, block_start, block_end in zip(
+                    entries["segment"][selected],
+                    entries["start"][selected],
+                    entries["end"][selected],
+                )
+            ]
+            for segment in self._segments():
+                indexed_end = self._indexed_end(entries, segment)
+                size = self._segment_size(segment)
+                if indexed_end < size:
+                    ranges.append((segment, indexed_end, size))
+        ranges.sort()
+
+        for segment, range_start, range_end in ranges:
+            for _, payload in self._scan(segment, range_start, range_end):
+                record = json.loads(payload)
+                timestamp = _timestamp_us(record["created_at"])
+                if start_us is not None and timestamp < start_us:
+                    continue
+                if end_us is not None and timestamp >= end_us:
+                    continue
+                if entity_type is None or record["entity_type"] == entity_type:
+                    yield record
+
+    def _refresh_readonly(self):
+        # Um leitor acompanha o escritor: segmento ativo e índices novos
+        segments = self._segments()
+        active = segments[-1] if segments else 0
+        size = os.path.getsize(self._path(active, "log")) if segments else 0
+        if active != self.active or size != self.active_size:
+            self.active = active
+            self._open_active()
@@ -1,9 +1,299 @@
+from sqlalchemy import event, insert
 from sqlalchemy.orm import Session
+from app.core.database import SessionLocal
 from app.models.database import AuditLog, User
-from typing import Dict, Any, Optional, Union
-from uuid import UUID
+from typing import Callable, Dict, Any, List, Optional, Union
+from uuid import UUID, uuid4
 from datetime import datetime
+from app.services.audit_segments import SegmentedAuditLog
+from app.services.pagination import decode_cursor, encode_cursor, keyset_page
 import json
+import os
+import threading
+import time
+
+# Durabilidade dos logs de auditoria:
+# - transaction: entram na transação de quem chama e são gravados com um
+#   INSERT multi-linha logo antes do commit (atômicos com os dados)
+# - async: vão para uma fila do processo, gravada em lotes por uma thread;
+#   um commit a menos por requisição, mas o que estiver na fila se perde
+#   se o processo cair
+AUDIT_DURABILITY = os.getenv("AUDIT_DURABILITY", "transaction")
+# Lote máximo e intervalo (segundos) de gravação da fila assíncrona
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "0.5"))
+# Linhas por comando INSERT (abaixo do limite de parâmetros)
+AUDIT_INSERT_CHUNK = 1000
+# Onde os logs ficam:
+# - database: tabela audit_logs
+# - segments: arquivos de segmento append-only em AUDIT_SEGMENT_DIR, com
+#   índices mapeados em memória; as consultas de histórico e atividade não
+#   tocam o banco transacional
+AUDIT_BACKEND = os.getenv("AUDIT_BACKEND", "database")
+AUDIT_SEGMENT_DIR = os.getenv("AUDIT_SEGMENT_DIR", "./audit_segments")
+AUDIT_SEGMENT_BYTES = int(os.getenv("AUDIT_SEGMENT_BYTES", str(64 * 1024 * 1024)))
+
+# Chave usada em Session.info para os logs pendentes da transação
+AUDIT_BUFFER_KEY = "audit_buffer"
+
+
+def _insert_rows(db: Session, rows: List[Dict[str, Any]]):
+    """
+    Grava os logs com INSERTs multi-linha
+    """
+    for start in range(0, len(rows), AUDIT_INSERT_CHUNK):
+        db.execute(insert(AuditLog).values(rows[start : start + AUDIT_INSERT_CHUNK]))
+
+
+_audit_store: Optional[SegmentedAuditLog] = None
+_audit_store_lock = threading.Lock()
+
+
+def audit_store() -> SegmentedAuditLog:
+    """
+    Log em segmentos do processo, aberto no primeiro uso
+    """
+    global _audit_store
+    with _audit_store_lock:
+        if _audit_store is None:
+            _audit_store = SegmentedAuditLog(
+                AUDIT_SEGMENT_DIR,
+                segment_bytes=AUDIT_SEGMENT_BYTES,
+                fsync=AUDIT_DURABILITY == "transaction",
+            )
+        return _audit_store
+
+
+def close_audit_store():
+    global _audit_store
+    with _audit_store_lock:
+        if _audit_store is not None:
+            _audit_store.close()
+            _audit_store = None
+
+
+def _segment_record(row: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Linha de audit_logs em forma serializável para os segmentos
+    """
+    record = dict(row)
+    record["id"] = str(record["id"])
+    record["created_at"] = record["created_at"].isoformat()
+    return record
+
+
+def _as_audit_log(record: Dict[str, Any]) -> AuditLog:
+    """
+    Registro de segmento como AuditLog transiente (fora da sessão)
+    """
+    return AuditLog(
+        id=UUID(record["id"]),
+        user_id=UUID(record["user_id"]) if record.get("user_id") else None,
+        entity_type=record["entity_type"],
+        entity_id=UUID(record["entity_id"]),
+        action=record["action"],
+        old_values=record.get("old_values"),
+        new_values=record.get("new_values"),
+        created_at=datetime.fromisoformat(record["created_at"]),
+    )
+
+
+def _flush_buffer(db: Session):
+    """
+    Grava na transação atual os logs acumulados em Session.info
+
+    Com AUDIT_BACKEND = "segments" os logs só saem do buffer no commit.
+    """
+    if AUDIT_BACKEND == "segments":
+        return
+    rows = db.info.pop(AUDIT_BUFFER_KEY, None)
+    if rows:
+        _insert_rows(db, rows)
+
+
+@event.listens_for(Session, "before_commit")
+def _flush_buffer_before_commit(db: Session):
+    _flush_buffer(db)
+
+
+@event.listens_for(Session, "after_commit")
+def _append_buffer_after_commit(db: Session):
+    # Nos segmentos o log é acrescentado depois que os dados foram
+    # confirmados, de modo que um rollback nunca deixa log órfão
+    if AUDIT_BACKEND != "segments":
+        return
+    rows = db.info.pop(AUDIT_BUFFER_KEY, None)
+    if rows:
+        audit_store().append([_segment_record(row) for row in rows])
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_buffer_after_transaction(db: Session, transaction):
+    # Logs de uma transação desfeita (ou fechada sem commit) não devem
+    # sobreviver a ela; no commit o buffer já foi gravado
+    if transaction.parent is None:
+        db.info.pop(AUDIT_BUFFER_KEY, None)
+
+
+class AuditWriter:
+    """
+    Fila de logs de auditoria gravada em lotes por uma thread de fundo
+
+    Cada lote é um INSERT multi-linha (até AUDIT_INSERT_CHUNK linhas por
+    comando) em uma transação própria, disparado quando a fila atinge
+    batch_size ou a cada flush_interval segundos. Com AUDIT_BACKEND =
+    "segments", o lote é uma única escrita no log em segmentos.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        batch_size: int = AUDIT_BATCH_SIZE,
+        flush_interval: float = AUDIT_FLUSH_INTERVAL,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.rows: List[Dict[str, Any]] = []
+        self.writing = 0
+        self.force = False
+        self.stopping = False
+        self.thread: Optional[threading.Thread] = None
+        self.condition = threading.Condition()
+        self.stats: Dict[str, Any] = {
+            "written": 0,
+            "batches": 0,
+            "errors": 0,
+            "last_error": None,
+        }
+
+    def enqueue(self, row: Dict[str, Any]):
+        with self.condition:
+            self.rows.append(row)
+            if self.thread is None or not self.thread.is_alive():
+                self.stopping = False
+                self.thread = threading.Thread(
+                    target=self._run, name="audit-writer", daemon=True
+                )
+                self.thread.start()
+            if len(self.rows) == 1 or len(self.rows) >= self.batch_size:
+                self.condition.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Grava já o que estiver na fila e espera terminar
+
+        Retorna: True se a fila esvaziou dentro de timeout
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self.condition:
+            self.force = True
+            self.condition.notify_all()
+            while self.rows or self.writing:
+                if self.thread is None or not self.thread.is_alive():
+                    return False
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+            return True
+
+    def stop(self, timeout: Optional[float] = None):
+        """
+        Grava o que estiver pendente e encerra a thread
+        """
+        self.flush(timeout)
+        with self.condition:
+            self.stopping = True
+            self.condition.notify_all()
+            thread = self.thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.rows and not self.stopping:
+                    self.force = False
+                    self.condition.wait()
+                # Espera o lote encher, no máximo um intervalo
+                deadline = time.monotonic() + self.flush_interval
+                while len(self.rows) < self.batch_size and not (
+                    self.force or self.stopping
+                ):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+                if not self.rows:
+                    self.force = False
+                    if self.stopping:
+                        return
+                    continue
+                rows, self.rows = self.rows, []
+                self.force = False
+                self.writing = len(rows)
+
+            try:
+                if AUDIT_BACKEND == "segments":
+                    audit_store().append([_segment_record(row) for row in rows])
+                else:
+                    db = self.session_factory()
+                    try:
+                        _insert_rows(db, rows)
+                        db.commit()
+                    finally:
+                        db.close()
+            except Exception as error:
+                with self.condition:
+                    # Volta para o início da fila, preservando a ordem
+                    self.rows[:0] = rows
+                    self.stats["errors"] += 1
+                    self.stats["last_error"] = repr(error)
+            else:
+                with self.condition:
+                    self.stats["written"] += len(rows)
+                    self.stats["batches"] += 1
+            finally:
+                with self.condition:
+                    self.writing = 0
+                    self.condition.notify_all()
+
+
+# Fila do processo, usada quando AUDIT_DURABILITY = "async"
+audit_writer = AuditWriter()
+
+
+def _json_values(values: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Valores de um log como objeto JSON nativo (coluna JSONB)
+
+    Tipos fora do JSON (UUID, Decimal, datetime, ...) viram texto, como
+    antes, quando os valores eram gravados serializados.
+    """
+    return json.loads(json.dumps(values, default=str))
+
+
+def _record(db: Session, values: Dict[str, Any], commit: bool):
+    """
+    Encaminha um log conforme AUDIT_DURABILITY
+
+    No modo transaction, commit=True mantém o comportamento de gravar o
+    log imediatamente (com o restante da transação); com commit=False ele
+    vai junto com o próximo commit de quem chama. No modo async a sessão de
+    quem chama não é tocada.
+    """
+    row = dict(values, id=uuid4())
+    if AUDIT_DURABILITY == "async":
+        audit_writer.enqueue(row)
+        return
+    # O buffer pertence à transação: abri-la garante que um rollback (mesmo
+    # sem nenhum comando emitido) o descarte
+    if not db.in_transaction():
+        db.begin()
+    db.info.setdefault(AUDIT_BUFFER_KEY, []).append(row)
+    if commit:
+        db.commit()
 
 
 class AuditService:
@@ -14,21 +304,24 @@ class AuditService:
         entity_id: Union[str, UUID],
         new_values: Dict[str, Any],
         user_id: Optional[Union[str, UUID]] = None,
+        commit: bool = True,
     ):
         """
         Cria um log de auditoria para operações de criação
         """
-        audit_log = AuditLog(
-            user_id=str(user_id) if user_id else None,
-            entity_type=entity_type,
-            entity_id=str(entity_id),
-            action="create",
-            old_values=None,
-            new_values=json.dumps(new_values, default=str),
-            created_at=datetime.utcnow(),
+        _record(
+            db,
+            dict(
+                user_id=str(user_id) if user_id else None,
+                entity_type=entity_type,
+                entity_id=str(entity_id),
+                action="create",
+                old_values=None,
+                new_values=_json_values(new_values),
+                created_at=datetime.utcnow(),
+            ),
+            commit,
         )
-        db.add(audit_log)
-        db.commit()
 
     @staticmethod
     def log_update(
@@ -38,21 +331,24 @@ class AuditService:
         old_values: Dict[str, Any],
         new_values: Dict[str, Any],
         user_id: Optional[Union[str, UUID]] = None,
+        commit: bool = True,
     ):
         """
         Cria um log de auditoria para operações de atualização
         """
-        audit_log = AuditLog(
-            user_id=str(user_id) if user_id else None,
-            entity_type=entity_type,
-            entity_id=str(entity_id),
-            action="update",
-            old_values=json.dumps(old_values, default=str),
-            new_values=json.dumps(new_values, default=str),
-            created_at=datetime.utcnow(),
+        _record(
+            db,
+            dict(
+                user_id=str(user_id) if user_id else None,
+                entity_type=entity_type,
+                entity_id=str(entity_id),
+                action="update",
+                old_values=_json_values(old_values),
+                new_values=_json_values(new_values),
+                created_at=datetime.utcnow(),
+            ),
+            commit,
         )
-        db.add(audit_log)
-        db.commit()
 
     @staticmethod
     def log_delete(
@@ -61,21 +357,24 @@ class AuditService:
         entity_id: Union[str, UUID],
         deleted_values: Dict[str, Any],
         user_id: Optional[Union[str, UUID]] = None,
+        commit: bool = True,
     ):
         """
         Cria um log de auditoria para operações de exclusão
         """
-        audit_log = AuditLog(
-            user_id=str(user_id) if user_id else None,
-            entity_type=entity_type,
-            entity_id=str(entity_id),
-            action="delete",
-            old_values=json.dumps(deleted_values, default=str),
-            new_values=None,
-            created_at=datetime.utcnow(),
+        _record(
+            db,
+            dict(
+                user_id=str(user_id) if user_id else None,
+                entity_type=entity_type,
+                entity_id=str(entity_id),
+                action="delete",
+                old_values=_json_values(deleted_values),
+                new_values=None,
+                created_at=datetime.utcnow(),
+            ),
+            commit,
         )
-        db.add(audit_log)
-        db.commit()
 
     @staticmethod
     def log_vote(
@@ -83,27 +382,41 @@ class AuditService:
         entity_id: Union[str, UUID],
         vote_data: Dict[str, Any],
         user_id: Optional[Union[str, UUID]] = None,
+        commit: bool = True,
     ):
         """
         Cria um log de auditoria para operações de voto
         """
-        audit_log = AuditLog(
-            user_id=str(user_id) if user_id else None,
-            entity_type="vote",
-            entity_id=str(entity_id),
-            action="vote",
-            old_values=None,
-            new_values=json.dumps(vote_data, default=str),
-            created_at=datetime.utcnow(),
+        _record(
+            db,
+            dict(
+                user_id=str(user_id) if user_id else None,
+                entity_type="vote",
+                entity_id=str(entity_id),
+                action="vote",
+                old_values=None,
+                new_values=_json_values(vote_data),
+                created_at=datetime.utcnow(),
+            ),
+            commit,
         )
-        db.add(audit_log)
-        db.commit()
+
+    @staticmethod
+    def flush(db: Session):
+        """
+        Grava na transação atual os logs ainda pendentes desta sessão
+        """
+        _flush_buffer(db)
 
     @staticmethod
     def get_entity_history(db: Session, entity_type: str, entity_id: Union[str, UUID]):
         """
         Retorna o histórico completo de uma entidade
         """
+        if AUDIT_BACKEND == "segments":
+            records = audit_store().entity_history(entity_type, entity_id)
+            return [_as_audit_log(record) for record in records]
+        _flush_buffer(db)
         return (
             db.query(AuditLog)
             .filter(
@@ -119,6 +432,10 @@ class AuditService:
         """
         Retorna a atividade de um usuário específico
         """
+        if AUDIT_BACKEND == "segments":
+            records = audit_store().recent(limit=limit, user_id=user_id)
+            return [_as_audit_log(record) for record in records]
+        _flush_buffer(db)
         return (
             db.query(AuditLog)
             .filter(AuditLog.user_id == str(user_id))
@@ -129,14 +446,62 @@ class AuditService:
 
     @staticmethod
     def get_recent_activity(
-        db: Session, entity_type: Optional[str] = None, limit: int = 100
+        db: Session,
+        entity_type: Optional[str] = None,
+        limit: int = 100,
+        offset: int = 0,
     ):
         """
         Retorna a atividade recente do sistema
         """
+        if AUDIT_BACKEND == "segments":
+            records = audit_store().recent(
+                limit=limit, offset=offset, entity_type=entity_type
+            )
+            return [_as_audit_log(record) for record in records]
+        _flush_buffer(db)
         query = db.query(AuditLog)
 
         if entity_type:
             query = query.filter(AuditLog.entity_type == entity_type)
 
-        return query.order_by(AuditLog.created_at.desc()).limit(limit).all()
+        return (
+            query.order_by(AuditLog.created_at.desc()).offset(offset).limit(limit).all()
+        )
+
+    @staticmethod
+    def get_activity_page(
+        db: Session,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        entity_type: Optional[str] = None,
+    ):
+        """
+        Página da atividade recente, do mais novo ao mais antigo
+
+        No banco a página é uma busca por (created_at, id) no índice; nos
+        segmentos o cursor guarda a posição (segmento, offset) do último
+        registro lido.
+
+        Retorna: (logs, cursor da próxima página ou None)
+        """
+        if AUDIT_BACKEND == "segments":
+            before = None
+            if cursor:
+                position = decode_cursor(cursor)
+                try:
+                    before = (int(position["segment"]), int(position["offset"]))
+                except (KeyError, TypeError, ValueError):
+                    raise ValueError("Cursor inválido")
+            records, last = audit_store().recent_page(limit, before, entity_type)
+            next_cursor = (
+                encode_cursor({"segment": last[0], "offset": last[1]})
+                if last is not None
+                else None
+            )
+            return [_as_audit_log(record) for record in records], next_cursor
+        _flush_buffer(db)
+        query = db.query(AuditLog)
+        if entity_type:
+            query = query.filter(AuditLog.entity_type == entity_type)
+        return keyset_page(query, AuditLog, limit, cursor)
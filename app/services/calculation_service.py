@@ -7,6 +7,7 @@ from app.models.database import (
     Metric,
     Market,
 )
+from app.math.aggregates import rebuild_metric_aggregates, rebuild_vote_counters
 from app.math.engine import MathematicalEngine
 from app.schemas.schemas import (
     MetricValueResponse,
@@ -126,7 +127,12 @@ class CalculationService:
         """
         # Calcular valor global
         value = self.math_engine.calculate_global_currency_value()
+        return self._store_global_currency_value(value)
 
+    def _store_global_currency_value(self, value: float) -> GlobalCurrencyValueResponse:
+        """
+        Persiste o valor global da moeda (mantém apenas o registro mais recente)
+        """
         # Obter ou criar registro de valor global
         global_value = (
             self.db.query(GlobalCurrencyValue)
@@ -158,6 +164,7 @@ class CalculationService:
 
         # Obter todas as métricas do mercado
         metrics = self.db.query(Metric).filter(Metric.market_id == market_id_str).all()
+        self.math_engine.load_metric_snapshots([metric.id for metric in metrics])
 
         results = []
         for metric in metrics:
@@ -185,19 +192,75 @@ class CalculationService:
     def recalculate_all_values(self):
         """
         Recalcula todos os valores do sistema (reprocessamento determinístico)
-        """
-        # Calcular todas as métricas
-        metrics = self.db.query(Metric).all()
-        for metric in metrics:
-            self.calculate_metric_value(metric.id)
 
-        # Calcular todos os mercados
-        markets = self.db.query(Market).all()
-        for market in markets:
-            self.calculate_market_value(market.id)
+        Usa o modo em lote do motor matemático: uma única leitura dos dados
+        confiáveis para todas as métricas e uma única leitura das métricas para
+        todos os mercados, com um único commit no final. Os agregados
+        correntes das métricas (metric_aggregates) e os contadores de votos
+        dos dados são reconstruídos junto.
+        """
+        rebuild_vote_counters(self.db)
+        metric_ids = [metric_id for (metric_id,) in self.db.query(Metric.id).all()]
+        markets = self.db.query(Market.id, Market.is_active).all()
 
-        # Calcular valor global
-        self.calculate_global_currency_value()
+        metric_results = self.math_engine.calculate_metric_values_batch(metric_ids)
+        market_results = self.math_engine.calculate_market_values_batch(
+            [market_id for market_id, _ in markets], metric_results
+        )
+        now = datetime.utcnow()
+
+        # Atualizar ou criar os valores das métricas
+        metric_values = {
+            str(metric_value.metric_id): metric_value
+            for metric_value in self.db.query(MetricValue).all()
+        }
+        for metric_id, (mu, latency, value, error, _) in metric_results.items():
+            metric_value = metric_values.get(metric_id)
+            if metric_value:
+                metric_value.mu = mu
+                metric_value.latency = latency
+                metric_value.value = value
+                metric_value.error = error
+                metric_value.calculated_at = now
+            else:
+                self.db.add(
+                    MetricValue(
+                        metric_id=metric_id,
+                        mu=mu,
+                        latency=latency,
+                        value=value,
+                        error=error,
+                        calculated_at=now,
+                    )
+                )
+
+        rebuild_metric_aggregates(self.db, metric_ids)
+
+        # Atualizar ou criar os valores dos mercados
+        market_values = {
+            str(market_value.market_id): market_value
+            for market_value in self.db.query(MarketValue).all()
+        }
+        for market_id, value in market_results.items():
+            market_value = market_values.get(market_id)
+            if market_value:
+                market_value.value = value
+                market_value.calculated_at = now
+            else:
+                self.db.add(
+                    MarketValue(market_id=market_id, value=value, calculated_at=now)
+                )
+
+        self.db.commit()
+
+        # Calcular valor global a partir dos mercados ativos já calculados
+        active_values = [
+            market_results[str(market_id)]
+            for market_id, is_active in markets
+            if is_active
+        ]
+        global_value = sum(active_values) / len(active_values) if active_values else 0.0
+        self._store_global_currency_value(global_value)
 
     def apply_softmin_to_metric(
         self, metric_id: Union[str, UUID], beta: float = 1.0
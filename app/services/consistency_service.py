@@ -0,0 +1,286 @@
+from sqlalchemy.orm import Session
+from app.models.database import Market
+from app.math.consistency_cache import consistency_cache, instance_digest
+from app.math.ksat import KSatInstance, build_market_instances, solve_instance
+from multiprocessing import connection as mp_connection
+from typing import Any, Dict, List, Optional, Tuple, Union
+from uuid import UUID
+import multiprocessing
+import os
+import time
+
+# Modos que podem ser distribuídos entre processos (o incremental depende do
+# solver persistente, que vive no processo da API)
+PARALLEL_CONSISTENCY_MODES = ("full", "local", "approx")
+
+# Tempo padrão (segundos) de busca por mercado em uma varredura
+SWEEP_TIME_LIMIT = 10.0
+
+# Folga (segundos) sobre o orçamento de busca de cada mercado antes de
+# encerrar o processo que o resolve e declarar timeout
+SWEEP_GRACE = 5.0
+
+# Como os processos da varredura são criados: "forkserver" (padrão) ou
+# "spawn". Um fork direto copiaria o processo da API com as threads de fundo
+# (fila de recálculo, gravador de auditoria) e os locks que elas seguram.
+SWEEP_START_METHOD = os.getenv("SWEEP_START_METHOD", "forkserver")
+
+
+def _solve_market(
+    instance: KSatInstance,
+    mode: str,
+    time_limit: float,
+    max_flips: Optional[int],
+    seed: Optional[int],
+) -> Tuple[str, bool, Dict[str, Any]]:
+    """
+    Tarefa executada em um processo do pool (precisa ser de módulo para pickle)
+    """
+    is_consistent, details = solve_instance(
+        instance, mode, time_limit=time_limit, max_flips=max_flips, seed=seed
+    )
+    details["pid"] = os.getpid()
+    return instance.market_id, is_consistent, details
+
+
+def _worker_lost(market_id: str, mode: str) -> Tuple[str, bool, Dict[str, Any]]:
+    return (
+        market_id,
+        False,
+        {"mode": mode, "status": "error", "error": "processo da varredura terminou"},
+    )
+
+
+def _sweep_worker(channel):
+    """
+    Laço de um processo da varredura: resolve uma tarefa por vez, recebida
+    pelo pipe, até receber None
+    """
+    while True:
+        task = channel.recv()
+        if task is None:
+            break
+        instance, mode, time_limit, max_flips, seed = task
+        try:
+            result = _solve_market(instance, mode, time_limit, max_flips, seed)
+        except Exception as exc:
+            result = (
+                instance.market_id,
+                False,
+                {"mode": mode, "status": "error", "error": str(exc)},
+            )
+        channel.send(result)
+
+
+def _sweep_context():
+    """
+    Contexto de multiprocessing da varredura
+
+    No forkserver, o módulo é importado uma vez no servidor, e cada processo
+    novo já nasce com ele carregado.
+    """
+    method = SWEEP_START_METHOD
+    if method not in multiprocessing.get_all_start_methods():
+        method = "spawn"
+    context = multiprocessing.get_context(method)
+    if method == "forkserver":
+        context.set_forkserver_preload([__name__])
+    return context
+
+
+class _SweepWorker:
+    """
+    Processo da varredura com seu pipe e a tarefa em andamento
+    """
+
+    def __init__(self, context):
+        self.channel, child = context.Pipe()
+        self.process = context.Process(target=_sweep_worker, args=(child,))
+        self.process.daemon = True
+        self.process.start()
+        child.close()
+        self.market_id = None
+        self.started = 0.0
+        self.deadline = 0.0
+
+    def submit(self, market_id: str, task: tuple, timeout: float):
+        self.market_id = market_id
+        self.started = time.monotonic()
+        self.deadline = self.started + timeout
+        self.channel.send(task)
+
+    def stop(self):
+        try:
+            self.channel.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=1.0)
+        self.kill()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout=1.0)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.channel.close()
+
+
+class ConsistencyService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def check_markets(
+        self,
+        market_ids: Optional[List[Union[str, UUID]]] = None,
+        mode: str = "full",
+        time_limit: float = SWEEP_TIME_LIMIT,
+        max_flips: Optional[int] = None,
+        seed: Optional[int] = None,
+        max_workers: Optional[int] = None,
+        use_cache: bool = True,
+    ) -> List[Tuple[str, bool, Dict[str, Any]]]:
+        """
+        Verifica a consistência k-SAT de vários mercados em paralelo
+
+        As instâncias são construídas aqui (duas consultas para todos os
+        mercados) e resolvidas em até max_workers processos próprios (contexto
+        SWEEP_START_METHOD), uma tarefa por vez em cada um. time_limit limita
+        a busca de cada mercado; o processo de um mercado que não responde em
+        time_limit + SWEEP_GRACE segundos é encerrado e substituído, e o
+        mercado recebe status "timeout". Mercados com resultado em
+        consistency_cache não são reconstruídos nem enviados aos processos.
+
+        Retorna: [(market_id, is_consistent, details)] na ordem de conclusão
+        """
+        if mode not in PARALLEL_CONSISTENCY_MODES:
+            raise ValueError(f"Modo de consistência inválido: {mode}")
+
+        use_cache = use_cache and mode != "approx"
+        if market_ids is None:
+            market_ids = [
+                market_id
+                for (market_id,) in self.db.query(Market.id)
+                .filter(Market.is_active == True)
+                .all()
+            ]
+        results = []
+        generations = {}
+        if use_cache:
+            pending = []
+            for market_id in market_ids:
+                cached = consistency_cache.lookup(market_id, mode)
+                if cached is None:
+                    generations[str(market_id)] = consistency_cache.generation(
+                        market_id
+                    )
+                    pending.append(market_id)
+                else:
+                    results.append((str(market_id), *cached))
+            market_ids = pending
+
+        instances = build_market_instances(self.db, market_ids)
+        digests = {}
+        if use_cache:
+            for market_id, instance in list(instances.items()):
+                digests[market_id] = instance_digest(instance)
+                cached = consistency_cache.lookup_digest(
+                    market_id, digests[market_id], mode, generations[market_id]
+                )
+                if cached is not None:
+                    results.append((market_id, *cached))
+                    del instances[market_id]
+        if not instances:
+            return results
+
+        solved = self._solve_instances(
+            instances, mode, time_limit, max_flips, seed, max_workers
+        )
+        for market_id, is_consistent, details in solved:
+            if use_cache:
+                consistency_cache.store(
+                    market_id,
+                    digests[market_id],
+                    mode,
+                    is_consistent,
+                    details,
+                    generations[market_id],
+                )
+            results.append((market_id, is_consistent, details))
+        return results
+
+    def _solve_instances(
+        self,
+        instances: Dict[str, KSatInstance],
+        mode: str,
+        time_limit: float,
+        max_flips: Optional[int],
+        seed: Optional[int],
+        max_workers: Optional[int],
+    ) -> List[Tuple[str, bool, Dict[str, Any]]]:
+        # Mesmo com um só processo a busca não roda aqui: só um processo
+        # próprio pode ser encerrado ao estourar time_limit + SWEEP_GRACE
+        workers = min(max_workers or os.cpu_count() or 1, len(instances))
+        results = []
+        timeout = time_limit + SWEEP_GRACE
+        context = _sweep_context()
+        pending = list(instances.items())
+        idle = [_SweepWorker(context) for _ in range(workers)]
+        busy: Dict[Any, _SweepWorker] = {}
+        try:
+            while pending or busy:
+                while pending and idle:
+                    worker = idle.pop()
+                    market_id, instance = pending.pop()
+                    task = (instance, mode, time_limit, max_flips, seed)
+                    try:
+                        worker.submit(market_id, task, timeout)
+                    except (BrokenPipeError, OSError):
+                        worker.kill()
+                        results.append(_worker_lost(market_id, mode))
+                        idle.append(_SweepWorker(context))
+                        continue
+                    busy[worker.channel] = worker
+
+                wait = min(worker.deadline for worker in busy.values())
+                ready = mp_connection.wait(
+                    list(busy), timeout=max(0.0, wait - time.monotonic())
+                )
+                for channel in ready:
+                    worker = busy.pop(channel)
+                    try:
+                        results.append(channel.recv())
+                        idle.append(worker)
+                    except (EOFError, OSError):
+                        worker.kill()
+                        results.append(_worker_lost(worker.market_id, mode))
+                        if pending:
+                            idle.append(_SweepWorker(context))
+
+                now = time.monotonic()
+                for channel, worker in list(busy.items()):
+                    if worker.deadline > now:
+                        continue
+                    # Estourou o orçamento: o processo é encerrado, não esperado
+                    del busy[channel]
+                    worker.kill()
+                    results.append(
+                        (
+                            worker.market_id,
+                            False,
+                            {
+                                "mode": mode,
+                                "status": "timeout",
+                                "elapsed_ms": (now - worker.started) * 1000.0,
+                            },
+                        )
+                    )
+                    if pending:
+                        idle.append(_SweepWorker(context))
+        finally:
+            for worker in busy.values():
+                worker.kill()
+            for worker in idle:
+                worker.stop()
+        return results
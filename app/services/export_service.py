@@ -0,0 +1,249 @@
+import csv
+import io
+import json
+import os
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+from uuid import UUID
+from app.core.database import SessionLocal
+from app.models.database import AuditLog, DataPoint, Metric, Vote
+from app.services.audit_service import AUDIT_BACKEND, audit_store
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+# Linhas buscadas por vez do cursor do servidor (yield_per)
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+Rows = Iterator[Dict[str, Any]]
+
+DATA_POINT_COLUMNS = [
+    DataPoint.id,
+    DataPoint.metric_id,
+    Metric.market_id,
+    DataPoint.source_id,
+    DataPoint.value,
+    DataPoint.timestamp,
+    DataPoint.time_horizon_hours,
+    DataPoint.is_reliable,
+    DataPoint.reliability_expiration,
+    DataPoint.participation_rate,
+    DataPoint.latency,
+    DataPoint.positive_votes,
+    DataPoint.total_votes,
+    DataPoint.created_at,
+    DataPoint.updated_at,
+]
+VOTE_COLUMNS = [
+    Vote.id,
+    Vote.user_id,
+    Vote.data_point_id,
+    DataPoint.metric_id,
+    Metric.market_id,
+    Vote.is_reliable,
+    Vote.created_at,
+]
+AUDIT_LOG_COLUMNS = [
+    AuditLog.id,
+    AuditLog.user_id,
+    AuditLog.entity_type,
+    AuditLog.entity_id,
+    AuditLog.action,
+    AuditLog.old_values,
+    AuditLog.new_values,
+    AuditLog.created_at,
+]
+
+
+def _json_value(value: Any) -> Any:
+    # Mesmos tipos que a API devolve: números como float, datas em ISO
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    return value
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, separators=(",", ":"))
+    return _json_value(value)
+
+
+def _stream(db: Session, statement) -> Iterator[Tuple]:
+    """
+    Linhas de statement em lotes de EXPORT_BATCH_SIZE
+
+    yield_per liga stream_results: no PostgreSQL o resultado vem de um
+    cursor do servidor, e só um lote fica em memória por vez. Como só
+    colunas são selecionadas, nada entra no identity map da sessão.
+    """
+    result = db.execute(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    for partition in result.partitions():
+        yield from partition
+
+
+def _rows(names: List[str], statement, db: Session) -> Rows:
+    for row in _stream(db, statement):
+        yield dict(zip(names, row))
+
+
+class ExportService:
+    @staticmethod
+    def data_points(
+        db: Session,
+        metric_id: Optional[Union[str, UUID]] = None,
+        market_id: Optional[Union[str, UUID]] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> Tuple[List[str], Rows]:
+        """
+        Dados com métrica e mercado, filtrados por timestamp em [start, end)
+
+        Retorna: (nomes das colunas, iterador de linhas)
+        """
+        statement = select(*DATA_POINT_COLUMNS).join(
+            Metric, Metric.id == DataPoint.metric_id
+        )
+        if metric_id:
+            statement = statement.where(DataPoint.metric_id == str(metric_id))
+        if market_id:
+            statement = statement.where(Metric.market_id == str(market_id))
+        if start:
+            statement = statement.where(DataPoint.timestamp >= start)
+        if end:
+            statement = statement.where(DataPoint.timestamp < end)
+        statement = statement.order_by(DataPoint.created_at, DataPoint.id)
+        names = [column.key for column in DATA_POINT_COLUMNS]
+        return names, _rows(names, statement, db)
+
+    @staticmethod
+    def votes(
+        db: Session,
+        metric_id: Optional[Union[str, UUID]] = None,
+        market_id: Optional[Union[str, UUID]] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> Tuple[List[str], Rows]:
+        """
+        Votos com dado, métrica e mercado, filtrados por created_at em
+        [start, end)
+
+        Sem ORDER BY: votes não tem índice em created_at e ordenar a tabela
+        inteira atrasaria o primeiro byte.
+
+        Retorna: (nomes das colunas, iterador de linhas)
+        """
+        statement = (
+            select(*VOTE_COLUMNS)
+            .join(DataPoint, DataPoint.id == Vote.data_point_id)
+            .join(Metric, Metric.id == DataPoint.metric_id)
+        )
+        if metric_id:
+            statement = statement.where(DataPoint.metric_id == str(metric_id))
+        if market_id:
+            statement = statement.where(Metric.market_id == str(market_id))
+        if start:
+            statement = statement.where(Vote.created_at >= start)
+        if end:
+            statement = statement.where(Vote.created_at < end)
+        names = [column.key for column in VOTE_COLUMNS]
+        return names, _rows(names, statement, db)
+
+    @staticmethod
+    def audit_logs(
+        db: Session,
+        entity_type: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> Tuple[List[str], Rows]:
+        """
+        Logs de auditoria com created_at em [start, end), do mais antigo ao
+        mais novo
+
+        Com AUDIT_BACKEND = "segments" a leitura é sequencial nos segmentos,
+        a partir do índice de tempo.
+
+        Retorna: (nomes das colunas, iterador de linhas)
+        """
+        names = [column.key for column in AUDIT_LOG_COLUMNS]
+        if AUDIT_BACKEND == "segments":
+            records = audit_store().iter_between(start, end, entity_type)
+            return names, (
+                {name: record.get(name) for name in names} for record in records
+            )
+
+        statement = select(*AUDIT_LOG_COLUMNS)
+        if entity_type:
+            statement = statement.where(AuditLog.entity_type == entity_type)
+        if start:
+            statement = statement.where(AuditLog.created_at >= start)
+        if end:
+            statement = statement.where(AuditLog.created_at < end)
+        statement = statement.order_by(AuditLog.created_at, AuditLog.id)
+        return names, _rows(names, statement, db)
+
+
+def ndjson_lines(columns: List[str], rows: Rows) -> Iterator[str]:
+    """
+    Um objeto JSON por linha, em blocos de EXPORT_BATCH_SIZE linhas
+    """
+    lines = []
+    for row in rows:
+        lines.append(
+            json.dumps(
+                {name: _json_value(value) for name, value in row.items()},
+                separators=(",", ":"),
+                default=str,
+            )
+        )
+        if len(lines) >= EXPORT_BATCH_SIZE:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def csv_lines(columns: List[str], rows: Rows) -> Iterator[str]:
+    """
+    Cabeçalho e linhas CSV, em blocos de EXPORT_BATCH_SIZE linhas
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    count = 0
+    for row in rows:
+        writer.writerow([_csv_value(row[name]) for name in columns])
+        count += 1
+        if count >= EXPORT_BATCH_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            count = 0
+    yield buffer.getvalue()
+
+
+def stream_export(
+    export: Callable[..., Tuple[List[str], Rows]],
+    export_format: str,
+    session_factory: Callable[[], Session] = SessionLocal,
+    **filters,
+) -> Iterator[str]:
+    """
+    Gera o arquivo de exportação aos poucos, em uma sessão própria
+
+    A sessão da requisição fecha antes de a resposta ser enviada; o cursor
+    do servidor precisa da sua transação aberta até a última linha.
+    """
+    db = session_factory()
+    try:
+        columns, rows = export(db, **filters)
+        lines = csv_lines if export_format == "csv" else ndjson_lines
+        yield from lines(columns, rows)
+    finally:
+        db.close()
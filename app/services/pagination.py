@@ -0,0 +1,71 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+
+# Tamanho máximo de página das rotas paginadas por cursor
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(position: Dict[str, Any]) -> str:
+    """
+    Cursor opaco (base64 url-safe de um JSON) a partir de uma posição
+    """
+    payload = json.dumps(position, separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """
+    Posição codificada em um cursor
+
+    Retorna: dict da posição; ValueError se o cursor for inválido
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Cursor inválido")
+    if not isinstance(position, dict):
+        raise ValueError("Cursor inválido")
+    return position
+
+
+def _keyset_position(cursor: str) -> Tuple[datetime, UUID]:
+    position = decode_cursor(cursor)
+    try:
+        return datetime.fromisoformat(position["created_at"]), UUID(position["id"])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("Cursor inválido")
+
+
+def keyset_page(
+    query: Query, model, limit: int, cursor: Optional[str] = None
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Página de query em ordem (created_at, id) decrescente, após o cursor
+
+    A condição (created_at, id) < (c, i) é uma comparação de tuplas que o
+    índice (created_at DESC, id DESC) resolve com uma busca, de modo que
+    qualquer página custa o mesmo que a primeira (ao contrário de OFFSET,
+    que lê e descarta todas as linhas anteriores). Uma linha a mais é lida
+    para saber se há próxima página. created_at precisa ser NOT NULL: uma
+    linha com data nula não é menor que nenhum cursor.
+
+    Retorna: (linhas, cursor da próxima página ou None)
+    """
+    if cursor:
+        created_at, row_id = _keyset_position(cursor)
+        query = query.filter(tuple_(model.created_at, model.id) < (created_at, row_id))
+    rows = (
+        query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1).all()
+    )
+    if len(rows) <= limit:
+        return rows, None
+    last = rows[limit - 1]
+    return rows[:limit], encode_cursor(
+        {"created_at": last.created_at.isoformat(), "id": str(last.id)}
+    )
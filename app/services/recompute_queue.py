@@ -0,0 +1,284 @@
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+from uuid import UUID
+from app.core.database import SessionLocal
+from sqlalchemy.orm import Session
+
+# Recalcular dados, métricas, mercados e a consistência fora da requisição
+# do voto. Desligado por padrão: com a fila, os valores lidos logo após um
+# voto podem estar até RECOMPUTE_STALENESS_BUDGET segundos atrasados
+ASYNC_RECOMPUTE = os.getenv("ASYNC_RECOMPUTE", "0") == "1"
+# Janela de silêncio (segundos) antes de recalcular o que ficou sujo
+RECOMPUTE_WINDOW = float(os.getenv("RECOMPUTE_WINDOW", "0.2"))
+# Atraso máximo (segundos) de um valor derivado, mesmo sob votos contínuos
+RECOMPUTE_STALENESS_BUDGET = float(os.getenv("RECOMPUTE_STALENESS_BUDGET", "2.0"))
+
+
+class RecomputeQueue:
+    """
+    Fila de recálculo assíncrono de dados, métricas e mercados
+
+    Votos marcam seus pontos de dado como sujos; uma thread de fundo junta
+    as marcas de cada entidade e recalcula cada uma uma única vez por lote,
+    em uma sessão própria: participação e latência dos dados, depois as
+    métricas e mercados deles, e por fim uma reverificação incremental de
+    consistência por mercado com todos os votos do lote. Um lote parte
+    quando não chega marca nova por window segundos ou quando a marca mais
+    antiga atinge staleness_budget, de modo que rajadas de votos no mesmo
+    mercado custam um recálculo e nenhum valor derivado fica mais de
+    ~staleness_budget (mais a duração do recálculo) atrasado.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        window: float = RECOMPUTE_WINDOW,
+        staleness_budget: float = RECOMPUTE_STALENESS_BUDGET,
+    ):
+        self.session_factory = session_factory
+        self.window = window
+        self.staleness_budget = max(staleness_budget, window)
+        # entidade -> instante da primeira marca ainda não recalculada
+        self.pending_data_points: Dict[str, float] = {}
+        self.pending_metrics: Dict[str, float] = {}
+        self.pending_markets: Dict[str, float] = {}
+        # Votos (vote_id, user_id, data_point_id, is_reliable) ainda não
+        # levados ao solver incremental do mercado
+        self.pending_votes: List[Tuple[Any, str, str, bool]] = []
+        self.last_mark = 0.0
+        self.running = False
+        self.force = False
+        self.stopping = False
+        self.thread: Optional[threading.Thread] = None
+        self.condition = threading.Condition()
+        self.stats: Dict[str, Any] = {
+            "marks": 0,
+            "batches": 0,
+            "recomputed_data_points": 0,
+            "recomputed_metrics": 0,
+            "recomputed_markets": 0,
+            "consistency_checks": 0,
+            "max_staleness_ms": 0.0,
+            "errors": 0,
+            "last_error": None,
+        }
+
+    def mark(
+        self,
+        metric_ids: Iterable[Union[str, UUID]] = (),
+        market_ids: Iterable[Union[str, UUID]] = (),
+        votes: Iterable[Tuple[Any, str, str, bool]] = (),
+    ):
+        """
+        Marca métricas, mercados e votos para recálculo (O(1) por entidade)
+
+        Um voto (vote_id, user_id, data_point_id, is_reliable) marca seu
+        ponto de dado; métrica e mercado são descobertos no lote.
+        """
+        now = time.monotonic()
+        with self.condition:
+            for vote in votes:
+                self.pending_votes.append(vote)
+                self.pending_data_points.setdefault(str(vote[2]), now)
+                self.stats["marks"] += 1
+            for metric_id in metric_ids:
+                self.pending_metrics.setdefault(str(metric_id), now)
+                self.stats["marks"] += 1
+            for market_id in market_ids:
+                self.pending_markets.setdefault(str(market_id), now)
+                self.stats["marks"] += 1
+            self.last_mark = now
+            self._ensure_worker()
+            self.condition.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Recalcula já o que estiver pendente e espera a fila esvaziar
+
+        Retorna: True se a fila esvaziou dentro de timeout
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self.condition:
+            self.force = True
+            self.condition.notify_all()
+            while self._first_marks() or self.running:
+                if self.thread is None or not self.thread.is_alive():
+                    return False
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+            return True
+
+    def stop(self, drain: bool = True, timeout: Optional[float] = None):
+        """
+        Encerra a thread de fundo, recalculando antes o que estiver pendente
+        """
+        if drain:
+            self.flush(timeout)
+        with self.condition:
+            self.stopping = True
+            self.condition.notify_all()
+            thread = self.thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def status(self) -> Dict[str, Any]:
+        """
+        Tamanho da fila, idade da marca mais antiga e contadores
+        """
+        now = time.monotonic()
+        with self.condition:
+            first_marks = self._first_marks()
+            status = dict(self.stats)
+            status.update(
+                pending_data_points=len(self.pending_data_points),
+                pending_metrics=len(self.pending_metrics),
+                pending_markets=len(self.pending_markets),
+                oldest_pending_ms=(
+                    (now - min(first_marks)) * 1000.0 if first_marks else None
+                ),
+                window=self.window,
+                staleness_budget=self.staleness_budget,
+            )
+        return status
+
+    def _ensure_worker(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.stopping = False
+            self.thread = threading.Thread(
+                target=self._run, name="recompute-queue", daemon=True
+            )
+            self.thread.start()
+
+    def _first_marks(self) -> List[float]:
+        first_marks = list(self.pending_data_points.values())
+        first_marks += list(self.pending_metrics.values())
+        first_marks += list(self.pending_markets.values())
+        return first_marks
+
+    def _wait_time(self, now: float) -> Optional[float]:
+        """
+        Segundos até o próximo lote (≤ 0: já), ou None se nada está pendente
+        """
+        first_marks = self._first_marks()
+        if not first_marks:
+            return None
+        if self.force:
+            return 0.0
+        quiet = self.last_mark + self.window
+        budget = min(first_marks) + self.staleness_budget
+        return min(quiet, budget) - now
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while True:
+                    wait = self._wait_time(time.monotonic())
+                    if wait is not None and wait <= 0:
+                        break
+                    if self.stopping:
+                        return
+                    self.condition.wait(wait)
+                data_points, self.pending_data_points = self.pending_data_points, {}
+                metrics, self.pending_metrics = self.pending_metrics, {}
+                markets, self.pending_markets = self.pending_markets, {}
+                votes, self.pending_votes = self.pending_votes, []
+                self.force = False
+                self.running = True
+
+            try:
+                counts = self._recompute(
+                    sorted(data_points), sorted(metrics), sorted(markets), votes
+                )
+            except Exception as error:
+                with self.condition:
+                    # Volta para a fila mantendo a idade original das marcas;
+                    # refazer o lote é seguro (votos conhecidos são ignorados)
+                    for data_point_id, first_mark in data_points.items():
+                        self.pending_data_points.setdefault(data_point_id, first_mark)
+                    self.pending_votes[:0] = votes
+                    for metric_id, first_mark in metrics.items():
+                        self.pending_metrics.setdefault(metric_id, first_mark)
+                    for market_id, first_mark in markets.items():
+                        self.pending_markets.setdefault(market_id, first_mark)
+                    self.last_mark = time.monotonic()
+                    self.stats["errors"] += 1
+                    self.stats["last_error"] = repr(error)
+            else:
+                finished = time.monotonic()
+                oldest = min(
+                    list(data_points.values())
+                    + list(metrics.values())
+                    + list(markets.values())
+                )
+                with self.condition:
+                    self.stats["batches"] += 1
+                    self.stats["recomputed_data_points"] += len(data_points)
+                    self.stats["recomputed_metrics"] += counts["metrics"]
+                    self.stats["recomputed_markets"] += counts["markets"]
+                    self.stats["consistency_checks"] += counts["consistency_checks"]
+                    self.stats["max_staleness_ms"] = max(
+                        self.stats["max_staleness_ms"], (finished - oldest) * 1000.0
+                    )
+            finally:
+                with self.condition:
+                    self.running = False
+                    self.condition.notify_all()
+
+    def _recompute(self, data_point_ids, metric_ids, market_ids, votes):
+        """
+        Recalcula um lote e reverifica a consistência dos mercados votados
+
+        Retorna: {"metrics", "markets", "consistency_checks"} recalculados
+        """
+        from app.math.consistency_cache import consistency_cache
+        from app.services.vote_service import VoteService
+
+        db = self.session_factory()
+        try:
+            vote_service = VoteService(db)
+            data_point_metrics, metric_markets = {}, {}
+            if data_point_ids:
+                vote_service._update_data_points_after_votes(data_point_ids)
+                data_point_metrics, metric_markets = vote_service._data_point_owners(
+                    data_point_ids
+                )
+                metric_ids = sorted(set(metric_ids) | set(data_point_metrics.values()))
+                market_ids = sorted(set(market_ids) | set(metric_markets.values()))
+            if metric_ids:
+                vote_service._update_metrics_after_data_point_changes(metric_ids)
+            if market_ids:
+                vote_service._update_markets_after_metric_changes(market_ids)
+            db.commit()
+
+            # Uma busca incremental por mercado, com todos os votos do lote
+            market_votes: Dict[str, List[tuple]] = {}
+            for vote_id, user_id, data_point_id, is_reliable in votes:
+                metric_id = data_point_metrics.get(str(data_point_id))
+                if metric_id is None:
+                    continue
+                market_votes.setdefault(metric_markets[metric_id], []).append(
+                    (vote_id, user_id, data_point_id, is_reliable, metric_id)
+                )
+            for market_id, market_vote_list in market_votes.items():
+                consistency_cache.invalidate(market_id)
+                vote_service.math_engine.verify_votes_consistency(
+                    market_id, market_vote_list
+                )
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        return {
+            "metrics": len(metric_ids),
+            "markets": len(market_ids),
+            "consistency_checks": len(market_votes),
+        }
+
+
+# Fila do processo, usada pela rota de votos
+recompute_queue = RecomputeQueue()
@@ -1,15 +1,33 @@
+from sqlalchemy import func, insert, select, update
 from sqlalchemy.orm import Session
-from app.models.database import Vote, DataPoint, User, AuditLog
+from app.models.database import Vote, DataPoint, Metric, User, AuditLog
+from app.math.aggregates import (
+    NO_TERMS,
+    add_terms,
+    apply_data_point_change,
+    data_point_terms,
+    quantize_latency,
+)
+from app.math.beta_optimizer import fit_beta
 from app.math.engine import MathematicalEngine
+from app.math.consistency_cache import consistency_cache
 from datetime import datetime, timedelta
-from typing import Union
-from uuid import UUID
+from typing import Any, Dict, Iterable, List, Sequence, Tuple, Union
+from uuid import UUID, uuid4
+
+# Votos por comando INSERT multi-linha (abaixo do limite de parâmetros)
+VOTE_INSERT_CHUNK = 1000
 
 
 class VoteService:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, recompute_queue=None):
         self.db = db
         self.math_engine = MathematicalEngine(db)
+        # Com uma RecomputeQueue, métricas e mercados são recalculados fora
+        # da requisição do voto (ver app/services/recompute_queue.py)
+        self.recompute_queue = recompute_queue
+        # Resultado da última reverificação de consistência k-SAT
+        self.last_consistency = None
 
     def create_vote(
         self,
@@ -27,14 +45,26 @@ class VoteService:
         - Recalcular metric_j
         - Recalcular V_i
         - Recalcular C
+
+        Com recompute_queue, a requisição só grava o voto e os contadores do
+        dado; latency_k, metric_j, V_i e a reverificação de consistência do
+        mercado ficam com a fila e convergem dentro do seu orçamento de
+        atraso.
         """
-        # Criar o voto
-        db_vote = Vote(
-            user_id=str(user_id),
-            data_point_id=str(data_point_id),
-            is_reliable=is_reliable,
+        # Criar o voto (e atualizar os contadores do dado no mesmo comando)
+        vote_id = uuid4()
+        self._insert_votes(
+            [
+                {
+                    "id": vote_id,
+                    "user_id": str(user_id),
+                    "data_point_id": str(data_point_id),
+                    "is_reliable": is_reliable,
+                    "created_at": datetime.utcnow(),
+                }
+            ]
         )
-        self.db.add(db_vote)
+        db_vote = self.db.get(Vote, vote_id)
 
         # Log de auditoria para o voto
         AuditService.log_create(
@@ -46,8 +76,17 @@ class VoteService:
                 "data_point_id": str(data_point_id),
                 "is_reliable": is_reliable,
             },
+            commit=False,
         )
 
+        if self.recompute_queue is not None:
+            self.db.commit()
+            # Só depois do commit, para que a fila leia o voto já gravado
+            self.recompute_queue.mark(
+                votes=[(vote_id, str(user_id), str(data_point_id), is_reliable)]
+            )
+            return db_vote
+
         # Atualizar participação e latência do ponto de dado
         self._update_data_point_after_vote(str(data_point_id))
 
@@ -55,179 +94,474 @@ class VoteService:
         data_point = (
             self.db.query(DataPoint).filter(DataPoint.id == str(data_point_id)).first()
         )
+        metric = None
         if data_point:
+            metric = (
+                self.db.query(Metric).filter(Metric.id == data_point.metric_id).first()
+            )
             self._update_metric_after_data_point_change(str(data_point.metric_id))
 
             # Atualizar valor do mercado
-            metric = (
-                self.db.query(DataPoint)
-                .join(Metric)
-                .filter(DataPoint.id == str(data_point_id))
-                .first()
-            )
             if metric:
                 self._update_market_after_metric_change(str(metric.market_id))
 
         self.db.commit()
         self.db.refresh(db_vote)
 
+        # Reverificar a consistência do mercado de forma incremental
+        if data_point and metric:
+            consistency_cache.invalidate(metric.market_id)
+            self.last_consistency = self.math_engine.verify_vote_consistency(
+                metric.market_id,
+                db_vote.id,
+                db_vote.user_id,
+                db_vote.data_point_id,
+                db_vote.is_reliable,
+                metric.id,
+            )
+
         return db_vote
 
-    def _update_data_point_after_vote(self, data_point_id: str):
+    def create_votes_batch(
+        self, votes: Sequence[Tuple[Union[str, UUID], Union[str, UUID], bool]]
+    ) -> Dict[str, Any]:
         """
-        Atualiza participação e latência do ponto de dado após um voto
+        Cria um lote de votos (user_id, data_point_id, is_reliable) de uma vez
+
+        Usuários, dados e votos já existentes são validados com uma consulta
+        por conjunto; os votos entram com INSERTs multi-linha e cada dado,
+        métrica e mercado afetado é recalculado uma única vez, tudo em uma
+        transação. A consistência de cada mercado é reverificada depois, com
+        uma busca por mercado.
+
+        LookupError se algum usuário ou dado não existir; ValueError se o
+        lote repetir um par (usuário, dado) ou se o usuário já tiver votado.
+
+        Retorna: {"votes", "data_points", "metrics", "markets", "consistency"}
         """
-        data_point = (
-            self.db.query(DataPoint).filter(DataPoint.id == data_point_id).first()
-        )
-        if not data_point:
-            return
+        rows = [
+            {
+                "id": uuid4(),
+                "user_id": str(user_id),
+                "data_point_id": str(data_point_id),
+                "is_reliable": bool(is_reliable),
+                "created_at": datetime.utcnow(),
+            }
+            for user_id, data_point_id, is_reliable in votes
+        ]
+        if not rows:
+            return {
+                "votes": 0,
+                "data_points": 0,
+                "metrics": 0,
+                "markets": 0,
+                "consistency": {},
+            }
+        data_point_metrics, metric_markets = self._validate_batch(rows)
 
-        # Calcular nova participação
-        participation_rate = self.math_engine.calculate_data_point_participation(
-            data_point_id
-        )
+        self._insert_votes(rows)
+        for row in rows:
+            AuditService.log_create(
+                self.db,
+                "vote",
+                row["id"],
+                {
+                    "user_id": row["user_id"],
+                    "data_point_id": row["data_point_id"],
+                    "is_reliable": row["is_reliable"],
+                },
+                commit=False,
+            )
 
-        # Calcular nova latência
-        latency = self.math_engine.calculate_data_point_latency(
-            participation_rate, data_point.time_horizon_hours
-        )
+        data_point_ids = sorted({row["data_point_id"] for row in rows})
+        metric_ids = sorted({data_point_metrics[dp] for dp in data_point_ids})
+        market_ids = sorted({metric_markets[metric] for metric in metric_ids})
+        self._update_data_points_after_votes(data_point_ids)
+        self._update_metrics_after_data_point_changes(metric_ids)
+        self._update_markets_after_metric_changes(market_ids)
+        self.db.commit()
 
-        # Atualizar dados
-        data_point.participation_rate = participation_rate
-        data_point.latency = latency
-
-        # Determinar se o dado é confiável baseado na participação
-        # Se participação > 50%, consideramos confiável
-        if participation_rate > 0.5:
-            data_point.is_reliable = True
-            # Define expiração da confiabilidade baseada no horizonte temporal
-            data_point.reliability_expiration = datetime.utcnow() + timedelta(
-                hours=data_point.time_horizon_hours
+        # Reverificar a consistência: uma busca por mercado afetado
+        market_votes: Dict[str, List[tuple]] = {
+            market_id: [] for market_id in market_ids
+        }
+        for row in rows:
+            metric_id = data_point_metrics[row["data_point_id"]]
+            market_votes[metric_markets[metric_id]].append(
+                (
+                    row["id"],
+                    row["user_id"],
+                    row["data_point_id"],
+                    row["is_reliable"],
+                    metric_id,
+                )
+            )
+        consistency = {}
+        for market_id, market_vote_list in market_votes.items():
+            consistency_cache.invalidate(market_id)
+            consistency[market_id] = self.math_engine.verify_votes_consistency(
+                market_id, market_vote_list
             )
-        else:
-            data_point.is_reliable = False
-            data_point.reliability_expiration = None
 
-        # Log de auditoria
-        AuditService.log_update(
-            self.db,
-            "data_point",
-            data_point_id,
-            {
-                "participation_rate": float(data_point.participation_rate),
-                "latency": float(data_point.latency),
-                "is_reliable": data_point.is_reliable,
-            },
-            {
-                "participation_rate": participation_rate,
-                "latency": latency,
-                "is_reliable": data_point.is_reliable,
-            },
-        )
+        return {
+            "votes": len(rows),
+            "data_points": len(data_point_ids),
+            "metrics": len(metric_ids),
+            "markets": len(market_ids),
+            "consistency": consistency,
+        }
+
+    def _validate_batch(
+        self, rows: List[Dict[str, Any]]
+    ) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """
+        Valida o lote com uma consulta por conjunto
 
-    def _update_metric_after_data_point_change(self, metric_id: str):
+        Retorna: ({data_point_id: metric_id}, {metric_id: market_id})
         """
-        Atualiza o valor da métrica após mudança em um ponto de dado
+        pairs = [(row["user_id"], row["data_point_id"]) for row in rows]
+        if len(set(pairs)) != len(pairs):
+            raise ValueError("O lote repete votos de um usuário no mesmo ponto de dado")
+
+        user_ids = {user_id for user_id, _ in pairs}
+        data_point_ids = {data_point_id for _, data_point_id in pairs}
+
+        found_users = {
+            str(user_id)
+            for (user_id,) in self.db.query(User.id).filter(User.id.in_(user_ids))
+        }
+        missing_users = user_ids - found_users
+        if missing_users:
+            raise LookupError(
+                f"Usuários não encontrados: {', '.join(sorted(missing_users))}"
+            )
+
+        data_point_metrics, metric_markets = self._data_point_owners(data_point_ids)
+        missing_data_points = data_point_ids - set(data_point_metrics)
+        if missing_data_points:
+            raise LookupError(
+                "Pontos de dado não encontrados: "
+                f"{', '.join(sorted(missing_data_points))}"
+            )
+
+        existing = {
+            (str(user_id), str(data_point_id))
+            for user_id, data_point_id in self.db.query(
+                Vote.user_id, Vote.data_point_id
+            ).filter(Vote.user_id.in_(user_ids), Vote.data_point_id.in_(data_point_ids))
+        }.intersection(pairs)
+        if existing:
+            raise ValueError(
+                f"{len(existing)} voto(s) do lote já existem (usuário já votou)"
+            )
+
+        return data_point_metrics, metric_markets
+
+    def _data_point_owners(
+        self, data_point_ids: Iterable[str]
+    ) -> Tuple[Dict[str, str], Dict[str, str]]:
         """
-        from app.models.database import MetricValue
+        Métrica e mercado de cada ponto de dado, em uma consulta
 
-        # Calcular novos valores da métrica
-        mu, latency, value, error = self.math_engine.calculate_metric_value(metric_id)
+        Retorna: ({data_point_id: metric_id}, {metric_id: market_id})
+        """
+        data_point_metrics = {}
+        metric_markets = {}
+        for data_point_id, metric_id, market_id in (
+            self.db.query(DataPoint.id, DataPoint.metric_id, Metric.market_id)
+            .join(Metric, Metric.id == DataPoint.metric_id)
+            .filter(DataPoint.id.in_(list(data_point_ids)))
+        ):
+            data_point_metrics[str(data_point_id)] = str(metric_id)
+            metric_markets[str(metric_id)] = str(market_id)
+        return data_point_metrics, metric_markets
+
+    def _insert_votes(self, rows: List[Dict[str, Any]]):
+        """
+        Insere os votos e incrementa positive_votes/total_votes dos dados
 
-        # Obter ou criar registro de valor da métrica
-        metric_value = (
-            self.db.query(MetricValue)
-            .filter(MetricValue.metric_id == metric_id)
-            .first()
+        No PostgreSQL cada bloco de até VOTE_INSERT_CHUNK votos é um único
+        comando: o INSERT multi-linha fica em uma CTE e o UPDATE ... FROM
+        soma sua contagem por dado, de modo que o contador nunca diverge dos
+        votos gravados, nem com votos concorrentes no mesmo dado. Nos demais
+        bancos, INSERT e UPDATEs rodam na mesma transação.
+        """
+        postgresql = self.db.get_bind().dialect.name == "postgresql"
+        for start in range(0, len(rows), VOTE_INSERT_CHUNK):
+            chunk = rows[start : start + VOTE_INSERT_CHUNK]
+            inserted = insert(Vote).values(chunk)
+            if postgresql:
+                inserted = inserted.returning(Vote.data_point_id, Vote.is_reliable).cte(
+                    "inserted_votes"
+                )
+                tally = (
+                    select(
+                        inserted.c.data_point_id,
+                        func.count().label("total"),
+                        func.count().filter(inserted.c.is_reliable).label("positive"),
+                    )
+                    .group_by(inserted.c.data_point_id)
+                    .subquery("tally")
+                )
+                self.db.execute(
+                    update(DataPoint)
+                    .values(
+                        positive_votes=DataPoint.positive_votes + tally.c.positive,
+                        total_votes=DataPoint.total_votes + tally.c.total,
+                    )
+                    .where(DataPoint.id == tally.c.data_point_id)
+                    .add_cte(inserted)
+                )
+                continue
+
+            self.db.execute(inserted)
+            tally: Dict[str, List[int]] = {}
+            for row in chunk:
+                counts = tally.setdefault(row["data_point_id"], [0, 0])
+                counts[0] += int(row["is_reliable"])
+                counts[1] += 1
+            for data_point_id, (positive, total) in tally.items():
+                self.db.execute(
+                    update(DataPoint)
+                    .where(DataPoint.id == data_point_id)
+                    .values(
+                        positive_votes=DataPoint.positive_votes + positive,
+                        total_votes=DataPoint.total_votes + total,
+                    )
+                )
+
+    def _update_data_point_after_vote(self, data_point_id: str):
+        """
+        Atualiza participação e latência do ponto de dado após um voto
+        """
+        self._update_data_points_after_votes([data_point_id])
+
+    def _update_data_points_after_votes(self, data_point_ids: Iterable[str]):
+        """
+        Atualiza participação e latência dos pontos de dado após votos
+
+        Os dados são lidos em uma consulta (com os contadores de votos já
+        incrementados) e a mudança nos agregados é aplicada uma vez por
+        métrica.
+        """
+        data_points = (
+            self.db.query(DataPoint)
+            .filter(DataPoint.id.in_(list(data_point_ids)))
+            .populate_existing()
+            .all()
         )
+        changes: Dict[str, List[tuple]] = {}
 
-        if metric_value:
-            # Atualizar valores existentes
+        for data_point in data_points:
+            # Valores e contribuição aos agregados antes do voto
             old_values = {
-                "mu": float(metric_value.mu),
-                "latency": float(metric_value.latency),
-                "value": float(metric_value.value),
-                "error": float(metric_value.error),
+                "participation_rate": float(data_point.participation_rate or 0),
+                "latency": float(data_point.latency or 0),
+                "is_reliable": data_point.is_reliable,
             }
+            old_terms = data_point_terms(
+                data_point.is_reliable, data_point.value, data_point.latency
+            )
 
-            metric_value.mu = mu
-            metric_value.latency = latency
-            metric_value.value = value
-            metric_value.error = error
-            metric_value.calculated_at = datetime.utcnow()
+            # Calcular nova participação
+            participation_rate = self.math_engine.calculate_participation_rate(
+                data_point.positive_votes, data_point.total_votes
+            )
 
-            # Log de auditoria
-            AuditService.log_update(
-                self.db,
-                "metric_value",
-                metric_value.id,
-                old_values,
-                {"mu": mu, "latency": latency, "value": value, "error": error},
+            # Calcular nova latência (com a escala da coluna, ver quantize_latency)
+            latency = quantize_latency(
+                self.math_engine.calculate_data_point_latency(
+                    participation_rate, data_point.time_horizon_hours
+                )
             )
-        else:
-            # Criar novo registro
-            metric_value = MetricValue(
-                metric_id=metric_id, mu=mu, latency=latency, value=value, error=error
+
+            # Atualizar dados
+            data_point.participation_rate = participation_rate
+            data_point.latency = latency
+
+            # Determinar se o dado é confiável baseado na participação
+            # Se participação > 50%, consideramos confiável
+            if participation_rate > 0.5:
+                data_point.is_reliable = True
+                # Define expiração da confiabilidade baseada no horizonte temporal
+                data_point.reliability_expiration = datetime.utcnow() + timedelta(
+                    hours=data_point.time_horizon_hours
+                )
+            else:
+                data_point.is_reliable = False
+                data_point.reliability_expiration = None
+
+            metric_changes = changes.setdefault(
+                str(data_point.metric_id), [NO_TERMS, NO_TERMS]
+            )
+            metric_changes[0] = add_terms(metric_changes[0], old_terms)
+            metric_changes[1] = add_terms(
+                metric_changes[1],
+                data_point_terms(data_point.is_reliable, data_point.value, latency),
             )
-            self.db.add(metric_value)
 
             # Log de auditoria
-            AuditService.log_create(
+            AuditService.log_update(
                 self.db,
-                "metric_value",
-                metric_value.id,
+                "data_point",
+                data_point.id,
+                old_values,
                 {
-                    "metric_id": metric_id,
-                    "mu": mu,
-                    "latency": latency,
-                    "value": value,
-                    "error": error,
+                    "participation_rate": participation_rate,
+                    "latency": float(latency),
+                    "is_reliable": data_point.is_reliable,
                 },
+                commit=False,
             )
 
-    def _update_market_after_metric_change(self, market_id: str):
+        # As fotografias das métricas deixaram de refletir estes dados
+        self.db.flush()
+        for metric_id, (old_terms, new_terms) in changes.items():
+            self.math_engine.invalidate_metric_snapshot(metric_id)
+            apply_data_point_change(self.db, metric_id, old_terms, new_terms)
+
+    def _update_metric_after_data_point_change(self, metric_id: str):
         """
-        Atualiza o valor do mercado após mudança em uma métrica
+        Atualiza o valor da métrica após mudança em um ponto de dado
         """
-        from app.models.database import MarketValue
+        self._update_metrics_after_data_point_changes([metric_id])
 
-        # Calcular novo valor do mercado
-        market_value = self.math_engine.calculate_market_value(market_id)
+    def _update_metrics_after_data_point_changes(self, metric_ids: List[str]):
+        """
+        Atualiza os valores das métricas após mudanças em pontos de dado
+        """
+        from app.models.database import MetricValue
 
-        # Obter ou criar registro de valor do mercado
-        db_market_value = (
-            self.db.query(MarketValue)
-            .filter(MarketValue.market_id == market_id)
-            .first()
-        )
+        # Calcular novos valores das métricas pelos agregados
+        results = self.math_engine.calculate_metric_values_from_aggregates(metric_ids)
+        metric_values = {
+            str(metric_value.metric_id): metric_value
+            for metric_value in self.db.query(MetricValue).filter(
+                MetricValue.metric_id.in_(metric_ids)
+            )
+        }
+
+        for metric_id in metric_ids:
+            mu, latency, value, error = results[metric_id]
+            beta, _ = fit_beta(value, error, mu)
+            metric_value = metric_values.get(metric_id)
+
+            if metric_value:
+                # Atualizar valores existentes
+                old_values = {
+                    "mu": float(metric_value.mu),
+                    "latency": float(metric_value.latency),
+                    "value": float(metric_value.value),
+                    "error": float(metric_value.error),
+                    "beta": float(metric_value.beta),
+                }
+
+                metric_value.mu = mu
+                metric_value.latency = latency
+                metric_value.value = value
+                metric_value.error = error
+                metric_value.beta = beta
+                metric_value.calculated_at = datetime.utcnow()
+
+                # Log de auditoria
+                AuditService.log_update(
+                    self.db,
+                    "metric_value",
+                    metric_value.id,
+                    old_values,
+                    {
+                        "mu": mu,
+                        "latency": latency,
+                        "value": value,
+                        "error": error,
+                        "beta": beta,
+                    },
+                    commit=False,
+                )
+            else:
+                # Criar novo registro
+                metric_value = MetricValue(
+                    id=uuid4(),
+                    metric_id=metric_id,
+                    mu=mu,
+                    latency=latency,
+                    value=value,
+                    error=error,
+                    beta=beta,
+                )
+                self.db.add(metric_value)
+
+                # Log de auditoria
+                AuditService.log_create(
+                    self.db,
+                    "metric_value",
+                    metric_value.id,
+                    {
+                        "metric_id": metric_id,
+                        "mu": mu,
+                        "latency": latency,
+                        "value": value,
+                        "error": error,
+                        "beta": beta,
+                    },
+                    commit=False,
+                )
 
-        if db_market_value:
-            # Atualizar valor existente
-            old_value = float(db_market_value.value)
-            db_market_value.value = market_value
-            db_market_value.calculated_at = datetime.utcnow()
+    def _update_market_after_metric_change(self, market_id: str):
+        """
+        Atualiza o valor do mercado após mudança em uma métrica
+        """
+        self._update_markets_after_metric_changes([market_id])
 
-            # Log de auditoria
-            AuditService.log_update(
-                self.db,
-                "market_value",
-                db_market_value.id,
-                {"value": old_value},
-                {"value": market_value},
-            )
-        else:
-            # Criar novo registro
-            db_market_value = MarketValue(market_id=market_id, value=market_value)
-            self.db.add(db_market_value)
+    def _update_markets_after_metric_changes(self, market_ids: List[str]):
+        """
+        Atualiza os valores dos mercados após mudanças em suas métricas
+        """
+        from app.models.database import MarketValue
 
-            # Log de auditoria
-            AuditService.log_create(
-                self.db,
-                "market_value",
-                db_market_value.id,
-                {"market_id": market_id, "value": market_value},
+        # Calcular novos valores dos mercados
+        results = self.math_engine.calculate_market_values_from_aggregates(market_ids)
+        market_values = {
+            str(market_value.market_id): market_value
+            for market_value in self.db.query(MarketValue).filter(
+                MarketValue.market_id.in_(market_ids)
             )
+        }
+
+        for market_id in market_ids:
+            market_value = results[market_id]
+            db_market_value = market_values.get(market_id)
+
+            if db_market_value:
+                # Atualizar valor existente
+                old_value = float(db_market_value.value)
+                db_market_value.value = market_value
+                db_market_value.calculated_at = datetime.utcnow()
+
+                # Log de auditoria
+                AuditService.log_update(
+                    self.db,
+                    "market_value",
+                    db_market_value.id,
+                    {"value": old_value},
+                    {"value": market_value},
+                    commit=False,
+                )
+            else:
+                # Criar novo registro
+                db_market_value = MarketValue(
+                    id=uuid4(), market_id=market_id, value=market_value
+                )
+                self.db.add(db_market_value)
+
+                # Log de auditoria
+                AuditService.log_create(
+                    self.db,
+                    "market_value",
+                    db_market_value.id,
+                    {"market_id": market_id, "value": market_value},
+                    commit=False,
+                )
 
     def _update_global_currency_after_market_change(self):
         """
@@ -263,6 +597,7 @@ class VoteService:
             # Criar novo registro
             existing_value = GlobalCurrencyValue(value=global_value)
             self.db.add(existing_value)
+            self.db.flush()
 
             # Log de auditoria
             AuditService.log_create(
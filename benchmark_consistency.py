@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Benchmark do verificador de consistência k-SAT em instâncias sintéticas
+- random: k-SAT uniforme, varrendo k, número de variáveis e razão m/n
+- market: mercados sintéticos, varrendo usuários, métricas e votos
+Cada instância gera uma linha de CSV com tempo, memória e resultado
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.math.generator import random_ksat_instance, random_market_instance
+from app.math.ksat import solve_instance
+import argparse
+import csv
+from functools import partial
+import itertools
+import time
+import tracemalloc
+
+CSV_FIELDS = [
+    "family",
+    "k",
+    "variables",
+    "clauses",
+    "ratio",
+    "users",
+    "metrics",
+    "data_points",
+    "votes_per_user",
+    "seed",
+    "mode",
+    "status",
+    "build_ms",
+    "solve_ms",
+    "peak_kib",
+    "conflicts",
+    "decisions",
+    "flips",
+]
+
+
+def parse_list(value, cast=int):
+    """
+    "a,b,c" ou "início:fim:passo" (inclusivo) em uma lista
+    """
+    if ":" in value:
+        start, stop, step = (float(part) for part in value.split(":"))
+        count = int(round((stop - start) / step)) + 1
+        return [cast(round(start + i * step, 6)) for i in range(count)]
+    return [cast(part) for part in value.split(",")]
+
+
+def measure(build, mode, time_limit):
+    """
+    Constrói e resolve uma instância medindo tempo e pico de memória
+
+    O tracemalloc encarece as alocações, então os tempos servem para comparar
+    linhas entre si, não como latência absoluta.
+
+    Retorna: (instância, detalhes, build_ms, solve_ms, peak_kib)
+    """
+    tracemalloc.start()
+    started = time.perf_counter()
+    instance = build()
+    built = time.perf_counter()
+    _, details = solve_instance(instance, mode, time_limit=time_limit)
+    solved = time.perf_counter()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (
+        instance,
+        details,
+        (built - started) * 1000.0,
+        (solved - built) * 1000.0,
+        peak / 1024.0,
+    )
+
+
+def random_cases(args):
+    for k, num_vars, ratio, repeat in itertools.product(
+        parse_list(args.k),
+        parse_list(args.variables),
+        parse_list(args.ratios, float),
+        range(args.repeats),
+    ):
+        seed = args.seed + repeat
+        num_clauses = int(round(ratio * num_vars))
+        row = {
+            "family": "random",
+            "k": k,
+            "ratio": ratio,
+            "seed": seed,
+        }
+        yield row, partial(random_ksat_instance, num_vars, num_clauses, k, seed)
+
+
+def market_cases(args):
+    for users, metrics, data_points, votes_per_user, repeat in itertools.product(
+        parse_list(args.users),
+        parse_list(args.metrics),
+        parse_list(args.data_points),
+        parse_list(args.votes_per_user),
+        range(args.repeats),
+    ):
+        seed = args.seed + repeat
+        row = {
+            "family": "market",
+            "users": users,
+            "metrics": metrics,
+            "data_points": data_points,
+            "votes_per_user": votes_per_user,
+            "seed": seed,
+        }
+        yield row, partial(
+            random_market_instance,
+            users,
+            metrics,
+            data_points,
+            votes_per_user,
+            args.reliable_ratio,
+            seed,
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("family", choices=("random", "market"))
+    parser.add_argument("--output", default="consistency_benchmark.csv")
+    parser.add_argument("--mode", choices=("full", "local", "approx"), default="full")
+    parser.add_argument("--time-limit", type=float, default=10.0)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    random_group = parser.add_argument_group("random")
+    random_group.add_argument("--k", default="3")
+    random_group.add_argument("--variables", default="50,100,200")
+    random_group.add_argument("--ratios", default="3.0:5.5:0.25")
+    market_group = parser.add_argument_group("market")
+    market_group.add_argument("--users", default="10,100,1000")
+    market_group.add_argument("--metrics", default="3")
+    market_group.add_argument("--data-points", default="5")
+    market_group.add_argument("--votes-per-user", default="3")
+    market_group.add_argument("--reliable-ratio", type=float, default=0.5)
+    args = parser.parse_args()
+
+    cases = random_cases(args) if args.family == "random" else market_cases(args)
+    with open(args.output, "w", newline="") as stream:
+        writer = csv.DictWriter(stream, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        for row, build in cases:
+            instance, details, build_ms, solve_ms, peak_kib = measure(
+                build, args.mode, args.time_limit
+            )
+            row.update(
+                {
+                    "variables": instance.num_vars,
+                    "clauses": len(instance.clauses),
+                    "mode": args.mode,
+                    "status": details["status"],
+                    "build_ms": f"{build_ms:.3f}",
+                    "solve_ms": f"{solve_ms:.3f}",
+                    "peak_kib": f"{peak_kib:.1f}",
+                    "conflicts": details.get("conflicts", ""),
+                    "decisions": details.get("decisions", ""),
+                    "flips": details.get("flips", ""),
+                }
+            )
+            writer.writerow(row)
+            stream.flush()
+            print(
+                f"  {row['family']} {instance.num_vars} variáveis,"
+                f" {len(instance.clauses)} cláusulas: {details['status']}"
+                f" ({solve_ms:.1f} ms, {peak_kib:.0f} KiB)"
+            )
+    print(f"Resultados em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
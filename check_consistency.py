@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Verifica a consistência k-SAT de todos os mercados ativos em paralelo
+Cada mercado é resolvido em um processo do pool, com limite de tempo próprio
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.db.session import SessionLocal
+from app.services.consistency_service import (
+    PARALLEL_CONSISTENCY_MODES,
+    SWEEP_TIME_LIMIT,
+    ConsistencyService,
+)
+import argparse
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("markets", nargs="*", help="IDs de mercados (padrão: ativos)")
+    parser.add_argument("--mode", choices=PARALLEL_CONSISTENCY_MODES, default="full")
+    parser.add_argument(
+        "--time-limit",
+        type=float,
+        default=SWEEP_TIME_LIMIT,
+        help="Segundos por mercado",
+    )
+    parser.add_argument("--max-flips", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None, help="Padrão: núcleos")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        results = ConsistencyService(db).check_markets(
+            market_ids=args.markets or None,
+            mode=args.mode,
+            time_limit=args.time_limit,
+            max_flips=args.max_flips,
+            seed=args.seed,
+            max_workers=args.workers,
+        )
+        elapsed = time.perf_counter() - started
+
+        for market_id, is_consistent, details in results:
+            print(
+                f"  Market {market_id}: {details['status']}"
+                f" (votes: {details.get('votes', 0)},"
+                f" {details.get('elapsed_ms', 0.0):.1f} ms)"
+            )
+
+        consistent = sum(1 for _, is_consistent, _ in results if is_consistent)
+        print(f"{consistent}/{len(results)} mercados consistentes em {elapsed:.2f}s")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
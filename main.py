@@ -1,8 +1,11 @@
 from fastapi import FastAPI, Depends, HTTPException, status, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from uuid import UUID
+from datetime import datetime
+import time
 
 from app.models.database import (
     get_db,
@@ -16,20 +19,24 @@ from app.models.database import (
 )
 from app.schemas.schemas import (
     DataPoint as DataPointSchema,
+    DataPointCreate,
+    DataPointWithVotes,
     UserCreate,
     UserUpdate,
-    UserSchema,
+    User as UserSchema,
     MarketCreate,
     MarketUpdate,
-    MarketSchema,
+    Market as MarketSchema,
     MarketWithMetrics,
     MetricCreate,
-    MetricSchema,
+    Metric as MetricSchema,
     MetricWithDataPoints,
     ExternalSourceCreate,
-    ExternalSourceSchema,
+    ExternalSource as ExternalSourceSchema,
     VoteCreate,
-    VoteSchema,
+    Vote as VoteSchema,
+    VoteBatchCreate,
+    VoteBatchResponse,
     MetricValueResponse,
     MarketValueResponse,
     GlobalCurrencyValueResponse,
@@ -39,11 +46,26 @@ from app.schemas.schemas import (
     BinarySearchResponse,
     KSatConsistencyResponse,
     AuditLogResponse,
+    AuditLogPage,
+    DataPointPage,
+    ExternalSourcePage,
+    MarketPage,
 )
 from app.services.calculation_service import CalculationService
 from app.services.vote_service import VoteService
-from app.math.engine import MathematicalEngine
-from app.services.audit_service import AuditService
+from app.services.recompute_queue import ASYNC_RECOMPUTE, recompute_queue
+from app.services.consistency_service import (
+    PARALLEL_CONSISTENCY_MODES,
+    SWEEP_TIME_LIMIT,
+    ConsistencyService,
+)
+from app.math.engine import CONSISTENCY_MODES, MathematicalEngine
+from app.math.incremental import discard_market_solver
+from app.math.consistency_cache import consistency_cache
+from app.services.audit_partitions import partition_maintainer
+from app.services.audit_service import AuditService, audit_writer, close_audit_store
+from app.services.pagination import MAX_PAGE_SIZE, keyset_page
+from app.services.export_service import EXPORT_FORMATS, ExportService, stream_export
 from config import N
 
 # Simple API for data points with filtering
@@ -64,6 +86,22 @@ app.add_middleware(
 )
 
 
+@app.on_event("startup")
+def start_background_maintenance():
+    # Cria as partições mensais de audit_logs e arquiva as antigas
+    partition_maintainer.start()
+
+
+@app.on_event("shutdown")
+def drain_background_queues():
+    # Recalcula o que ainda estiver pendente antes de encerrar
+    recompute_queue.stop(drain=True, timeout=30.0)
+    # e grava os logs de auditoria ainda na fila
+    audit_writer.stop(timeout=30.0)
+    close_audit_store()
+    partition_maintainer.stop(timeout=30.0)
+
+
 # Rotas para Usuários
 @app.post("/users/", response_model=UserSchema, status_code=status.HTTP_201_CREATED)
 def create_user(user: UserCreate, db: Session = Depends(get_db)):
@@ -122,10 +160,17 @@ def create_market(market: MarketCreate, db: Session = Depends(get_db)):
     return db_market
 
 
-@app.get("/markets/", response_model=List[MarketSchema])
-def read_markets(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    markets = db.query(Market).offset(skip).limit(limit).all()
-    return markets
+@app.get("/markets/", response_model=MarketPage)
+def read_markets(
+    cursor: Optional[str] = Query(None, description="next_cursor da página anterior"),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+):
+    try:
+        markets, next_cursor = keyset_page(db.query(Market), Market, limit, cursor)
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    return {"items": markets, "next_cursor": next_cursor}
 
 
 @app.get("/markets/{market_id}", response_model=MarketWithMetrics)
@@ -178,6 +223,10 @@ def create_metric(metric: MetricCreate, db: Session = Depends(get_db)):
     db.commit()
     db.refresh(db_metric)
 
+    # A instância k-SAT persistente do mercado ganhou uma cláusula
+    discard_market_solver(db_metric.market_id)
+    consistency_cache.invalidate(db_metric.market_id)
+
     # Criar log de auditoria
     AuditService.log_create(db, "metric", db_metric.id, db_metric.dict())
 
@@ -216,12 +265,19 @@ def create_external_source(source: ExternalSourceCreate, db: Session = Depends(g
     return db_source
 
 
-@app.get("/external-sources/", response_model=List[ExternalSourceSchema])
+@app.get("/external-sources/", response_model=ExternalSourcePage)
 def read_external_sources(
-    skip: int = 0, limit: int = 100, db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="next_cursor da página anterior"),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
 ):
-    sources = db.query(ExternalSource).offset(skip).limit(limit).all()
-    return sources
+    try:
+        sources, next_cursor = keyset_page(
+            db.query(ExternalSource), ExternalSource, limit, cursor
+        )
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    return {"items": sources, "next_cursor": next_cursor}
 
 
 # Rotas para Pontos de Dados
@@ -255,11 +311,11 @@ def create_data_point(data_point: DataPointCreate, db: Session = Depends(get_db)
     return db_data_point
 
 
-@app.get("/data-points/", response_model=List[DataPointSchema])
+@app.get("/data-points/", response_model=DataPointPage)
 def read_data_points(
     metric_id: Optional[str] = Query(None, description="Filter by metric ID"),
-    skip: int = 0,
-    limit: int = 100,
+    cursor: Optional[str] = Query(None, description="next_cursor da página anterior"),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
     db: Session = Depends(get_db),
 ):
     query = db.query(DataPoint)
@@ -267,8 +323,11 @@ def read_data_points(
     if metric_id:
         query = query.filter(DataPoint.metric_id == metric_id)
 
-    data_points = query.offset(skip).limit(limit).all()
-    return data_points
+    try:
+        data_points, next_cursor = keyset_page(query, DataPoint, limit, cursor)
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    return {"items": data_points, "next_cursor": next_cursor}
 
 
 @app.get("/data-points/{data_point_id}", response_model=DataPointWithVotes)
@@ -314,14 +373,61 @@ def create_vote(vote: VoteCreate, user_id: UUID, db: Session = Depends(get_db)):
             status_code=400, detail="Usuário já votou neste ponto de dado"
         )
 
-    # Criar voto usando serviço de votos
-    vote_service = VoteService(db)
+    # Criar voto usando serviço de votos (com ASYNC_RECOMPUTE=1, o recálculo
+    # e a reverificação de consistência ficam com a fila)
+    vote_service = VoteService(db, recompute_queue if ASYNC_RECOMPUTE else None)
     db_vote = vote_service.create_vote(user_id, vote.data_point_id, vote.is_reliable)
 
     return db_vote
 
 
+@app.post(
+    "/votes/batch",
+    response_model=VoteBatchResponse,
+    status_code=status.HTTP_201_CREATED,
+)
+def create_votes_batch(batch: VoteBatchCreate, db: Session = Depends(get_db)):
+    """
+    Importa um lote de votos em uma única transação
+
+    Cada dado, métrica e mercado afetado é recalculado uma única vez.
+    """
+    started = time.perf_counter()
+    vote_service = VoteService(db)
+    try:
+        result = vote_service.create_votes_batch(
+            [
+                (vote.user_id, vote.data_point_id, vote.is_reliable)
+                for vote in batch.votes
+            ]
+        )
+    except LookupError as error:
+        raise HTTPException(status_code=404, detail=str(error))
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+
+    return VoteBatchResponse(
+        votes=result["votes"],
+        data_points=result["data_points"],
+        metrics=result["metrics"],
+        markets=result["markets"],
+        consistency={
+            market_id: is_consistent
+            for market_id, (is_consistent, _) in result["consistency"].items()
+        },
+        elapsed_ms=(time.perf_counter() - started) * 1000.0,
+    )
+
+
 # Rotas para Cálculos
+@app.get("/calculations/recompute-queue")
+def recompute_queue_status():
+    """
+    Estado da fila de recálculo assíncrono (pendências e atraso máximo)
+    """
+    return {"enabled": ASYNC_RECOMPUTE, **recompute_queue.status()}
+
+
 @app.get("/calculations/metric/{metric_id}", response_model=MetricValueResponse)
 def calculate_metric_value(metric_id: UUID, db: Session = Depends(get_db)):
     calculation_service = CalculationService(db)
@@ -371,45 +477,103 @@ def apply_softmin_penalty(request: SoftminRequest, db: Session = Depends(get_db)
 @app.post("/calculations/binary-search-beta", response_model=BinarySearchResponse)
 def binary_search_beta(request: BinarySearchRequest, db: Session = Depends(get_db)):
     math_engine = MathematicalEngine(db)
-    optimal_beta = math_engine.binary_search_beta(
+    optimal_beta, min_error = math_engine.optimize_beta(
         request.metric_id, request.epsilon, request.delta
     )
 
-    # Calcular o erro mínimo com o beta ótimo
-    mu, _, _, error = math_engine.calculate_metric_value(request.metric_id)
-    penalized_value = math_engine.apply_softmin_penalty(request.metric_id, optimal_beta)
-    min_error = abs(penalized_value - mu)
-
     return BinarySearchResponse(
         metric_id=request.metric_id, optimal_beta=optimal_beta, min_error=min_error
     )
 
 
+@app.get("/calculations/ksat-consistency", response_model=List[KSatConsistencyResponse])
+def check_all_ksat_consistency(
+    mode: str = Query("full", description="full, local ou approx"),
+    time_limit: float = Query(
+        SWEEP_TIME_LIMIT, gt=0, description="Segundos por mercado"
+    ),
+    max_flips: Optional[int] = Query(None, gt=0, description="Apenas mode=local"),
+    seed: Optional[int] = Query(None, description="Apenas mode=local"),
+    max_workers: Optional[int] = Query(None, gt=0, description="Processos"),
+    db: Session = Depends(get_db),
+):
+    if mode not in PARALLEL_CONSISTENCY_MODES:
+        raise HTTPException(status_code=400, detail="Modo de verificação inválido")
+
+    consistency_service = ConsistencyService(db)
+    results = consistency_service.check_markets(
+        mode=mode,
+        time_limit=time_limit,
+        max_flips=max_flips,
+        seed=seed,
+        max_workers=max_workers,
+    )
+
+    return [
+        KSatConsistencyResponse(
+            market_id=market_id, is_consistent=is_consistent, details=details
+        )
+        for market_id, is_consistent, details in results
+    ]
+
+
 @app.get(
     "/calculations/ksat-consistency/{market_id}", response_model=KSatConsistencyResponse
 )
-def check_ksat_consistency(market_id: UUID, db: Session = Depends(get_db)):
+def check_ksat_consistency(
+    market_id: UUID,
+    mode: str = Query("full", description="full, incremental, local ou approx"),
+    time_limit: Optional[float] = Query(None, gt=0, description="Segundos"),
+    max_flips: Optional[int] = Query(None, gt=0, description="Apenas mode=local"),
+    seed: Optional[int] = Query(None, description="Apenas mode=local"),
+    score: bool = Query(False, description="Inclui consistency_score"),
+    epsilon: float = Query(0.8, gt=0, description="Tolerância do score"),
+    delta: float = Query(0.2, gt=0, lt=1, description="1 − confiança do score"),
+    score_time_limit: float = Query(5.0, gt=0, description="Segundos"),
+    db: Session = Depends(get_db),
+):
+    if mode not in CONSISTENCY_MODES:
+        raise HTTPException(status_code=400, detail="Modo de verificação inválido")
+    if score and mode == "incremental":
+        raise HTTPException(
+            status_code=400, detail="score requer os modos full, local ou approx"
+        )
+
     math_engine = MathematicalEngine(db)
-    is_consistent = math_engine.check_ksat_consistency(market_id)
+    is_consistent, details = math_engine.solve_ksat_consistency(
+        market_id,
+        mode,
+        time_limit=time_limit,
+        max_flips=max_flips,
+        seed=seed,
+        score=score,
+        epsilon=epsilon,
+        delta=delta,
+        score_time_limit=score_time_limit,
+    )
 
     return KSatConsistencyResponse(
         market_id=market_id,
         is_consistent=is_consistent,
-        details={"message": "Verificação de consistência K-SAT concluída"},
+        details={"message": "Verificação de consistência K-SAT concluída", **details},
     )
 
 
 # Rotas para Logs de Auditoria
-@app.get("/audit-logs/", response_model=List[AuditLogResponse])
-def read_audit_logs(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    logs = (
-        db.query(AuditLog)
-        .order_by(AuditLog.created_at.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
-    return logs
+@app.get("/audit-logs/", response_model=AuditLogPage)
+def read_audit_logs(
+    cursor: Optional[str] = Query(None, description="next_cursor da página anterior"),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    entity_type: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    try:
+        logs, next_cursor = AuditService.get_activity_page(
+            db, limit=limit, cursor=cursor, entity_type=entity_type
+        )
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    return {"items": logs, "next_cursor": next_cursor}
 
 
 @app.get(
@@ -419,15 +583,76 @@ def read_audit_logs(skip: int = 0, limit: int = 100, db: Session = Depends(get_d
 def read_entity_audit_logs(
     entity_type: str, entity_id: UUID, db: Session = Depends(get_db)
 ):
-    logs = (
-        db.query(AuditLog)
-        .filter(AuditLog.entity_type == entity_type, AuditLog.entity_id == entity_id)
-        .order_by(AuditLog.created_at.desc())
-        .all()
-    )
+    logs = AuditService.get_entity_history(db, entity_type, entity_id)
     return logs
 
 
+# Rotas de Exportação (streaming, memória constante)
+def export_response(name: str, export_format: str, export, **filters):
+    return StreamingResponse(
+        stream_export(export, export_format, **filters),
+        media_type=EXPORT_FORMATS[export_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{name}.{export_format}"'
+        },
+    )
+
+
+@app.get("/export/data-points")
+def export_data_points(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    metric_id: Optional[UUID] = None,
+    market_id: Optional[UUID] = None,
+    start: Optional[datetime] = Query(None, description="timestamp >= start"),
+    end: Optional[datetime] = Query(None, description="timestamp < end"),
+):
+    return export_response(
+        "data_points",
+        format,
+        ExportService.data_points,
+        metric_id=metric_id,
+        market_id=market_id,
+        start=start,
+        end=end,
+    )
+
+
+@app.get("/export/votes")
+def export_votes(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    metric_id: Optional[UUID] = None,
+    market_id: Optional[UUID] = None,
+    start: Optional[datetime] = Query(None, description="created_at >= start"),
+    end: Optional[datetime] = Query(None, description="created_at < end"),
+):
+    return export_response(
+        "votes",
+        format,
+        ExportService.votes,
+        metric_id=metric_id,
+        market_id=market_id,
+        start=start,
+        end=end,
+    )
+
+
+@app.get("/export/audit-logs")
+def export_audit_logs(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    entity_type: Optional[str] = None,
+    start: Optional[datetime] = Query(None, description="created_at >= start"),
+    end: Optional[datetime] = Query(None, description="created_at < end"),
+):
+    return export_response(
+        "audit_logs",
+        format,
+        ExportService.audit_logs,
+        entity_type=entity_type,
+        start=start,
+        end=end,
+    )
+
+
 if __name__ == "__main__":
     import uvicorn
 
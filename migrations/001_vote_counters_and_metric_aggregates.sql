@@ -0,0 +1,66 @@
+-- Atualiza um banco criado antes dos contadores de votos em data_points e
+-- da tabela metric_aggregates. Idempotente: pode ser reaplicado.
+--
+--   psql -U seu_usuario -d dindin -f migrations/001_vote_counters_and_metric_aggregates.sql
+--
+-- O bloqueio em votes e data_points impede que um voto entre durante a
+-- recontagem (os votos esperam o COMMIT).
+
+BEGIN;
+
+LOCK TABLE votes, data_points IN SHARE ROW EXCLUSIVE MODE;
+
+ALTER TABLE data_points
+    ADD COLUMN IF NOT EXISTS positive_votes INTEGER NOT NULL DEFAULT 0, -- # votos 1
+    ADD COLUMN IF NOT EXISTS total_votes INTEGER NOT NULL DEFAULT 0; -- total de votos
+
+-- Mesma recontagem de rebuild_vote_counters (app/math/aggregates.py)
+UPDATE data_points d
+SET positive_votes = c.positive_votes,
+    total_votes = c.total_votes
+FROM (
+    SELECT data_point_id,
+           COUNT(*) FILTER (WHERE is_reliable) AS positive_votes,
+           COUNT(*) AS total_votes
+    FROM votes
+    GROUP BY data_point_id
+) c
+WHERE c.data_point_id = d.id
+  AND (d.positive_votes, d.total_votes) IS DISTINCT FROM (c.positive_votes, c.total_votes);
+
+UPDATE data_points d
+SET positive_votes = 0,
+    total_votes = 0
+WHERE (d.positive_votes <> 0 OR d.total_votes <> 0)
+  AND NOT EXISTS (SELECT 1 FROM votes v WHERE v.data_point_id = d.id);
+
+-- Agregados correntes dos dados confiáveis de cada métrica
+CREATE TABLE IF NOT EXISTS metric_aggregates (
+    metric_id UUID PRIMARY KEY REFERENCES metrics(id) ON DELETE CASCADE,
+    reliable_count INTEGER NOT NULL DEFAULT 0, -- n_j
+    value_sum DECIMAL(30, 8) NOT NULL DEFAULT 0, -- Σ D_k
+    abs_value_sum DECIMAL(30, 8) NOT NULL DEFAULT 0, -- Σ |D_k|
+    weighted_latency_sum DECIMAL(40, 14) NOT NULL DEFAULT 0, -- Σ |D_k| * latency_k
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Mesmas somas de rebuild_metric_aggregates, para todas as métricas
+INSERT INTO metric_aggregates (
+    metric_id, reliable_count, value_sum, abs_value_sum, weighted_latency_sum
+)
+SELECT m.id,
+       COUNT(d.id),
+       COALESCE(SUM(d.value), 0),
+       COALESCE(SUM(ABS(d.value)), 0),
+       COALESCE(SUM(ABS(d.value) * COALESCE(d.latency, 0)), 0)
+FROM metrics m
+LEFT JOIN data_points d ON d.metric_id = m.id AND d.is_reliable = TRUE
+GROUP BY m.id
+ON CONFLICT (metric_id) DO UPDATE
+SET reliable_count = EXCLUDED.reliable_count,
+    value_sum = EXCLUDED.value_sum,
+    abs_value_sum = EXCLUDED.abs_value_sum,
+    weighted_latency_sum = EXCLUDED.weighted_latency_sum,
+    updated_at = NOW();
+
+COMMIT;
@@ -0,0 +1,121 @@
+-- Converte audit_logs de um banco criado antes do particionamento: valores
+-- em JSONB, chave (id, created_at) e partições mensais em created_at.
+-- Idempotente: não faz nada se audit_logs já for particionada.
+--
+--   psql -U seu_usuario -d dindin -f migrations/002_partitioned_jsonb_audit_logs.sql
+--
+-- Uma tabela não vira particionada no lugar: a antiga é renomeada, a nova é
+-- criada como em schema.sql, as linhas são copiadas e a antiga é removida,
+-- tudo na mesma transação. O bloqueio exclusivo impede gravações de
+-- auditoria durante a cópia (elas esperam o COMMIT).
+
+BEGIN;
+
+-- old_values/new_values antigos: texto de json.dumps numa coluna TEXT, ou o
+-- mesmo texto guardado como string JSON numa coluna JSONB. AuditLogResponse
+-- exige um objeto; qualquer outro valor fica em {"value": ...}.
+CREATE FUNCTION pg_temp.audit_values_jsonb(raw TEXT) RETURNS JSONB AS $$
+DECLARE
+    parsed JSONB;
+BEGIN
+    IF raw IS NULL THEN
+        RETURN NULL;
+    END IF;
+    BEGIN
+        parsed := raw::jsonb;
+    EXCEPTION WHEN invalid_text_representation THEN
+        RETURN jsonb_build_object('value', raw);
+    END;
+    IF jsonb_typeof(parsed) = 'string' THEN
+        RETURN pg_temp.audit_values_jsonb(parsed #>> '{}');
+    END IF;
+    IF jsonb_typeof(parsed) = 'null' THEN
+        RETURN NULL;
+    END IF;
+    IF jsonb_typeof(parsed) <> 'object' THEN
+        RETURN jsonb_build_object('value', parsed);
+    END IF;
+    RETURN parsed;
+END;
+$$ LANGUAGE plpgsql;
+
+LOCK TABLE audit_logs IN ACCESS EXCLUSIVE MODE;
+
+CREATE SCHEMA IF NOT EXISTS audit_archive;
+
+DO $$
+DECLARE
+    month DATE;
+    last_month DATE;
+    index_name TEXT;
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM pg_partitioned_table
+        WHERE partrelid = to_regclass('audit_logs')
+    ) THEN
+        RAISE NOTICE 'audit_logs já é particionada';
+        RETURN;
+    END IF;
+
+    -- Libera os nomes da chave e dos índices para a tabela nova
+    ALTER TABLE audit_logs RENAME TO audit_logs_old;
+    FOR index_name IN
+        SELECT c.relname FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE i.indrelid = to_regclass('audit_logs_old')
+    LOOP
+        EXECUTE format('ALTER INDEX %I RENAME TO %I', index_name, index_name || '_old');
+    END LOOP;
+
+    CREATE TABLE audit_logs (
+        id UUID NOT NULL DEFAULT gen_random_uuid(),
+        user_id UUID REFERENCES users(id),
+        entity_type VARCHAR(50) NOT NULL,
+        entity_id UUID NOT NULL,
+        action VARCHAR(50) NOT NULL,
+        old_values JSONB,
+        new_values JSONB,
+        created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+        PRIMARY KEY (id, created_at)
+    ) PARTITION BY RANGE (created_at);
+
+    CREATE TABLE audit_logs_default PARTITION OF audit_logs DEFAULT;
+
+    CREATE INDEX idx_audit_logs_entity ON audit_logs(entity_type, entity_id, created_at DESC);
+    CREATE INDEX idx_audit_logs_created_at ON audit_logs(created_at DESC, id DESC);
+    CREATE INDEX idx_audit_logs_user_id ON audit_logs(user_id, created_at DESC);
+
+    -- Mesmos nomes e limites de create_partition (app/services/audit_partitions.py),
+    -- do mês mais antigo até AUDIT_PARTITION_MONTHS_AHEAD (3) meses à frente.
+    -- Meses e limites em UTC, independentes do TimeZone da sessão
+    month := date_trunc('month', COALESCE((SELECT MIN(created_at) FROM audit_logs_old), NOW()) AT TIME ZONE 'UTC')::date;
+    last_month := (date_trunc('month', NOW() AT TIME ZONE 'UTC') + INTERVAL '3 months')::date;
+    WHILE month <= last_month LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF audit_logs FOR VALUES FROM (%L) TO (%L)',
+            'audit_logs_' || to_char(month, 'YYYY_MM'),
+            to_char(month, 'YYYY-MM-DD') || ' 00:00:00+00',
+            to_char(month + INTERVAL '1 month', 'YYYY-MM-DD') || ' 00:00:00+00'
+        );
+        month := (month + INTERVAL '1 month')::date;
+    END LOOP;
+
+    -- created_at era opcional: linhas sem data ficam com a hora da migração
+    INSERT INTO audit_logs (
+        id, user_id, entity_type, entity_id, action, old_values, new_values, created_at
+    )
+    SELECT id,
+           user_id,
+           entity_type,
+           entity_id,
+           action,
+           pg_temp.audit_values_jsonb(old_values::text),
+           pg_temp.audit_values_jsonb(new_values::text),
+           COALESCE(created_at, NOW())
+    FROM audit_logs_old;
+
+    DROP TABLE audit_logs_old;
+END;
+$$;
+
+COMMIT;
@@ -0,0 +1,41 @@
+-- Índices (created_at DESC, id DESC) da paginação por cursor em um banco
+-- criado antes dela. Idempotente: pode ser reaplicado.
+--
+--   psql -U seu_usuario -d dindin -f migrations/003_pagination_indexes.sql
+--
+-- idx_data_points_metric_id passa a cobrir a ordem da página de uma métrica;
+-- o índice antigo, só em metric_id, é trocado pelo novo.
+--
+-- created_at passa a ser NOT NULL nas tabelas paginadas: a comparação
+-- (created_at, id) < cursor nunca é verdadeira para created_at nulo, e essas
+-- linhas sumiriam de todas as páginas depois da primeira. Linhas antigas sem
+-- data recebem a última data conhecida delas (ou a hora da migração).
+
+BEGIN;
+
+UPDATE markets SET created_at = COALESCE(updated_at, NOW()) WHERE created_at IS NULL;
+UPDATE external_sources SET created_at = COALESCE(updated_at, NOW()) WHERE created_at IS NULL;
+UPDATE data_points SET created_at = COALESCE("timestamp", updated_at, NOW()) WHERE created_at IS NULL;
+
+ALTER TABLE markets ALTER COLUMN created_at SET DEFAULT NOW(), ALTER COLUMN created_at SET NOT NULL;
+ALTER TABLE external_sources ALTER COLUMN created_at SET DEFAULT NOW(), ALTER COLUMN created_at SET NOT NULL;
+ALTER TABLE data_points ALTER COLUMN created_at SET DEFAULT NOW(), ALTER COLUMN created_at SET NOT NULL;
+
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM pg_indexes
+        WHERE indexname = 'idx_data_points_metric_id'
+          AND indexdef NOT LIKE '%created_at%'
+    ) THEN
+        DROP INDEX idx_data_points_metric_id;
+    END IF;
+END;
+$$;
+
+CREATE INDEX IF NOT EXISTS idx_data_points_metric_id ON data_points(metric_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_data_points_created_at ON data_points(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_markets_created_at ON markets(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_external_sources_created_at ON external_sources(created_at DESC, id DESC);
+
+COMMIT;
@@ -15,7 +15,7 @@ CREATE TABLE markets (
     name VARCHAR(255) NOT NULL,
     description TEXT,
     is_active BOOLEAN DEFAULT true,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
@@ -37,7 +37,7 @@ CREATE TABLE external_sources (
     url VARCHAR(500),
     verification_method VARCHAR(100),
     is_active BOOLEAN DEFAULT true,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
@@ -53,7 +53,9 @@ CREATE TABLE data_points (
     reliability_expiration TIMESTAMP WITH TIME ZONE, -- Quando a confiabilidade expira
     participation_rate DECIMAL(5, 4) DEFAULT 0.0, -- participação_k
     latency DECIMAL(10, 6) DEFAULT 0.0, -- latency_k
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    positive_votes INTEGER NOT NULL DEFAULT 0, -- # votos 1
+    total_votes INTEGER NOT NULL DEFAULT 0, -- total de votos
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
@@ -80,6 +82,16 @@ CREATE TABLE metric_values (
     UNIQUE(metric_id)
 );
 
+-- Agregados correntes dos dados confiáveis de cada métrica
+CREATE TABLE metric_aggregates (
+    metric_id UUID PRIMARY KEY REFERENCES metrics(id) ON DELETE CASCADE,
+    reliable_count INTEGER NOT NULL DEFAULT 0, -- n_j
+    value_sum DECIMAL(30, 8) NOT NULL DEFAULT 0, -- Σ D_k
+    abs_value_sum DECIMAL(30, 8) NOT NULL DEFAULT 0, -- Σ |D_k|
+    weighted_latency_sum DECIMAL(40, 14) NOT NULL DEFAULT 0, -- Σ |D_k| * latency_k
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
 -- Tabela de Valores Calculados de Mercados (cache)
 CREATE TABLE market_values (
     id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
@@ -97,24 +109,38 @@ CREATE TABLE global_currency_value (
 );
 
 -- Tabela de Logs de Auditoria
+-- Particionada por mês em created_at (audit_logs_AAAA_MM); as partições são
+-- criadas e arquivadas por app/services/audit_partitions.py
 CREATE TABLE audit_logs (
-    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    id UUID NOT NULL DEFAULT gen_random_uuid(),
     user_id UUID REFERENCES users(id),
     entity_type VARCHAR(50) NOT NULL, -- 'market', 'metric', 'data_point', 'vote'
     entity_id UUID NOT NULL,
     action VARCHAR(50) NOT NULL, -- 'create', 'update', 'delete', 'vote'
     old_values JSONB,
     new_values JSONB,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
-);
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+-- Recebe o que chegar antes de a partição do mês existir
+CREATE TABLE audit_logs_default PARTITION OF audit_logs DEFAULT;
+
+-- Partições arquivadas (desanexadas de audit_logs)
+CREATE SCHEMA audit_archive;
 
 -- Índices para performance
 CREATE INDEX idx_metrics_market_id ON metrics(market_id);
-CREATE INDEX idx_data_points_metric_id ON data_points(metric_id);
+CREATE INDEX idx_data_points_metric_id ON data_points(metric_id, created_at DESC, id DESC);
+CREATE INDEX idx_data_points_created_at ON data_points(created_at DESC, id DESC);
+CREATE INDEX idx_markets_created_at ON markets(created_at DESC, id DESC);
+CREATE INDEX idx_external_sources_created_at ON external_sources(created_at DESC, id DESC);
 CREATE INDEX idx_data_points_source_id ON data_points(source_id);
 CREATE INDEX idx_votes_user_id ON votes(user_id);
 CREATE INDEX idx_votes_data_point_id ON votes(data_point_id);
-CREATE INDEX idx_audit_logs_entity ON audit_logs(entity_type, entity_id);
+CREATE INDEX idx_audit_logs_entity ON audit_logs(entity_type, entity_id, created_at DESC);
+CREATE INDEX idx_audit_logs_created_at ON audit_logs(created_at DESC, id DESC);
+CREATE INDEX idx_audit_logs_user_id ON audit_logs(user_id, created_at DESC);
 CREATE INDEX idx_data_points_timestamp ON data_points(timestamp);
 
 -- Função para atualizar timestamp
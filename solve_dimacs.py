@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Exporta instâncias k-SAT de consistência para DIMACS e as resolve offline
+- export: grava <market_id>.cnf para os mercados informados (ou ativos)
+- solve: resolve todos os .cnf de um diretório, sem acesso ao banco
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.math.dimacs import (
+    load_assignment,
+    read_dimacs,
+    read_solution,
+    write_dimacs,
+    write_solution,
+)
+from app.math.ksat import solve_instance_model
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import glob
+import time
+
+STATUS_NAMES = {True: "sat", False: "unsat", None: "unknown"}
+
+
+def export_instances(directory, market_ids):
+    """
+    Grava a instância de cada mercado em directory/<market_id>.cnf
+    """
+    from app.db.session import SessionLocal
+    from app.math.ksat import build_market_instances
+    from app.models.database import Market
+
+    os.makedirs(directory, exist_ok=True)
+    db = SessionLocal()
+    try:
+        if not market_ids:
+            market_ids = [
+                market_id
+                for (market_id,) in db.query(Market.id)
+                .filter(Market.is_active == True)
+                .all()
+            ]
+        instances = build_market_instances(db, market_ids)
+        for market_id, instance in instances.items():
+            path = os.path.join(directory, f"{market_id}.cnf")
+            with open(path, "w") as stream:
+                write_dimacs(instance, stream)
+            print(
+                f"  {path}: {instance.num_vars} variáveis, "
+                f"{len(instance.clauses)} cláusulas"
+            )
+    finally:
+        db.close()
+
+
+def _invalid_model(instance, model, source):
+    """
+    Motivo da divergência se o modelo não satisfaz a instância
+
+    Retorna: [] ou [motivo]
+    """
+    try:
+        load_assignment(instance, model)
+    except ValueError as error:
+        return [f"modelo {source} inválido: {error}"]
+    return []
+
+
+def solve_file(path, mode, time_limit, seed, check):
+    """
+    Resolve um arquivo .cnf e grava o resultado em .sol ao lado dele
+
+    Com check, compara com o .sol existente em vez de sobrescrevê-lo.
+    """
+    with open(path) as stream:
+        instance = read_dimacs(stream)
+    is_consistent, details, model = solve_instance_model(
+        instance, mode, time_limit=time_limit, seed=seed
+    )
+    satisfiable = {"sat": True, "unsat": False}.get(details["status"])
+
+    solution_path = os.path.splitext(path)[0] + ".sol"
+    if check and os.path.exists(solution_path):
+        with open(solution_path) as stream:
+            expected, expected_model = read_solution(stream)
+        details["expected"] = STATUS_NAMES[expected]
+        # Um modelo que não satisfaz a instância é uma divergência desta
+        # instância, não um erro que interrompa a verificação das demais
+        reasons = []
+        if expected:
+            reasons += _invalid_model(instance, expected_model, "gravado")
+        if satisfiable:
+            reasons += _invalid_model(instance, model, "encontrado")
+        if expected is not None and satisfiable is not None and expected != satisfiable:
+            reasons.append(
+                f"esperado {STATUS_NAMES[expected]}, obtido {STATUS_NAMES[satisfiable]}"
+            )
+        details["regression"] = bool(reasons)
+        if reasons:
+            details["regression_reason"] = "; ".join(reasons)
+    else:
+        with open(solution_path, "w") as stream:
+            write_solution(stream, satisfiable, model)
+    return path, is_consistent, details
+
+
+def solve_directory(directory, mode, time_limit, seed, check, workers):
+    """
+    Resolve todos os .cnf do diretório em um pool de processos
+    """
+    paths = sorted(glob.glob(os.path.join(directory, "*.cnf")))
+    if not paths:
+        print(f"Nenhum arquivo .cnf em {directory}")
+        return 0
+
+    started = time.perf_counter()
+    regressions = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(solve_file, path, mode, time_limit, seed, check)
+            for path in paths
+        ]
+        for future in futures:
+            path, is_consistent, details = future.result()
+            regressions += bool(details.get("regression"))
+            line = (
+                f"  {os.path.basename(path)}: {details['status']}"
+                f" ({details['variables']} variáveis, {details['clauses']} cláusulas,"
+                f" {details['elapsed_ms']:.1f} ms)"
+            )
+            if "expected" in details:
+                line += f" esperado: {details['expected']}"
+            if details.get("regression_reason"):
+                line += f" DIVERGÊNCIA: {details['regression_reason']}"
+            print(line)
+
+    elapsed = time.perf_counter() - started
+    print(f"{len(paths)} instâncias em {elapsed:.2f}s, {regressions} divergências")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="Exporta mercados do banco")
+    export.add_argument("directory")
+    export.add_argument("markets", nargs="*", help="IDs de mercados (padrão: ativos)")
+
+    solve = commands.add_parser("solve", help="Resolve os .cnf de um diretório")
+    solve.add_argument("directory")
+    solve.add_argument("--mode", choices=("full", "local"), default="full")
+    solve.add_argument("--time-limit", type=float, default=None)
+    solve.add_argument("--seed", type=int, default=None)
+    solve.add_argument("--workers", type=int, default=None, help="Padrão: núcleos")
+    solve.add_argument(
+        "--check",
+        action="store_true",
+        help="Compara com os .sol existentes em vez de sobrescrevê-los",
+    )
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export_instances(args.directory, args.markets)
+    else:
+        regressions = solve_directory(
+            args.directory,
+            args.mode,
+            args.time_limit,
+            args.seed,
+            args.check,
+            args.workers,
+        )
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+import itertools
+import os
+import random
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import Integer, create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Os testes não dependem do banco do ambiente: app.models.database cria o
+# engine na importação a partir de DATABASE_URL
+os.environ["DATABASE_URL"] = "sqlite://"
+
+
+def satisfies(clauses, model) -> bool:
+    """
+    O modelo DIMACS (±v) satisfaz todas as cláusulas?
+    """
+    true_literals = set(model)
+    return all(
+        any(literal in true_literals for literal in clause) for clause in clauses
+    )
+
+
+def brute_force_models(num_vars, clauses):
+    """
+    Todos os modelos DIMACS das cláusulas, por enumeração
+    """
+    models = []
+    for values in itertools.product((False, True), repeat=num_vars):
+        model = [var if value else -var for var, value in enumerate(values, 1)]
+        if satisfies(clauses, model):
+            models.append(model)
+    return models
+
+
+def make_random_cnf(seed, num_vars, num_clauses, max_width=3):
+    """
+    CNF aleatória com cláusulas de 1 a max_width literais distintos
+    """
+    rng = random.Random(seed)
+    clauses = []
+    for _ in range(num_clauses):
+        width = rng.randint(1, min(max_width, num_vars))
+        variables = rng.sample(range(1, num_vars + 1), width)
+        clauses.append([var if rng.random() < 0.5 else -var for var in variables])
+    return clauses
+
+
+@pytest.fixture
+def random_cnf():
+    return make_random_cnf
+
+
+@pytest.fixture
+def brute_force():
+    return brute_force_models
+
+
+@pytest.fixture
+def check_model():
+    return satisfies
+
+
+@pytest.fixture
+def session_factory():
+    """
+    Sessões de um SQLite em memória com o schema dos modelos
+
+    Todas as sessões (e threads) compartilham a mesma conexão.
+    """
+    from app.models.database import Base
+
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine, autocommit=False, autoflush=False)
+    engine.dispose()
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    yield session
+    session.close()
+
+
+def make_market(db, seed=0, metrics=3, data_points=4, users=6, votes=True):
+    """
+    Mercado com métricas, pontos de dado e (opcionalmente) votos aleatórios
+
+    Os votos entram por VoteService, como na API. Retorna: dict com ids
+    """
+    from app.models.database import DataPoint, ExternalSource, Market, Metric, User
+    from app.services.vote_service import VoteService
+
+    rng = random.Random(seed)
+    user_ids = [uuid.uuid4() for _ in range(users)]
+    market_id, source_id = uuid.uuid4(), uuid.uuid4()
+    db.add_all(
+        User(id=user_id, username=user_id.hex, email=f"{user_id.hex}@dindin")
+        for user_id in user_ids
+    )
+    db.add(Market(id=market_id, name=market_id.hex))
+    db.add(ExternalSource(id=source_id, name=source_id.hex))
+    metric_ids, data_point_ids = [], []
+    for j in range(metrics):
+        metric_id = uuid.uuid4()
+        metric_ids.append(metric_id)
+        db.add(
+            Metric(
+                id=metric_id,
+                market_id=market_id,
+                name=f"x{j}",
+                weight=round(rng.uniform(0.1, 1.0), 4),
+            )
+        )
+        for k in range(data_points):
+            data_point_id = uuid.uuid4()
+            data_point_ids.append(data_point_id)
+            db.add(
+                DataPoint(
+                    id=data_point_id,
+                    metric_id=metric_id,
+                    source_id=source_id,
+                    value=round(rng.uniform(-1.0, 1.0), 6),
+                    time_horizon_hours=rng.randint(1, 48),
+                    created_at=datetime(2026, 1, 1) + timedelta(minutes=k),
+                )
+            )
+    db.commit()
+
+    if votes:
+        service = VoteService(db)
+        for data_point_id in data_point_ids:
+            for user_id in user_ids:
+                if rng.random() < 0.5:
+                    service.create_vote(user_id, data_point_id, rng.random() < 0.6)
+    return {
+        "market_id": market_id,
+        "metric_ids": metric_ids,
+        "data_point_ids": data_point_ids,
+        "user_ids": user_ids,
+    }
+
+
+@pytest.fixture
+def market_factory():
+    return make_market
+
+
+def assert_vote_state(db, metric_ids):
+    """
+    Contadores dos dados iguais a COUNT(*) dos votos e agregados das
+    métricas iguais às somas sobre os dados confiáveis
+    """
+    from sqlalchemy import func
+
+    from app.models.database import DataPoint, MetricAggregate, Vote
+
+    db.expire_all()
+    counts = {
+        data_point_id: (int(positive or 0), total)
+        for data_point_id, positive, total in db.query(
+            Vote.data_point_id,
+            func.sum(func.cast(Vote.is_reliable, Integer)),
+            func.count(),
+        ).group_by(Vote.data_point_id)
+    }
+    for metric_id in metric_ids:
+        expected = [0, 0.0, 0.0, 0.0]
+        for data_point in db.query(DataPoint).filter(DataPoint.metric_id == metric_id):
+            stored = (data_point.positive_votes, data_point.total_votes)
+            assert stored == counts.get(data_point.id, (0, 0))
+            if data_point.is_reliable:
+                value, latency = float(data_point.value), float(data_point.latency)
+                expected[0] += 1
+                expected[1] += value
+                expected[2] += abs(value)
+                expected[3] += abs(value) * latency
+        aggregate = db.get(MetricAggregate, metric_id)
+        stored = [
+            aggregate.reliable_count if aggregate else 0,
+            float(aggregate.value_sum) if aggregate else 0.0,
+            float(aggregate.abs_value_sum) if aggregate else 0.0,
+            float(aggregate.weighted_latency_sum) if aggregate else 0.0,
+        ]
+        assert stored == pytest.approx(expected, abs=1e-6)
+
+
+@pytest.fixture
+def check_vote_state():
+    return assert_vote_state
@@ -0,0 +1,95 @@
+import uuid
+from datetime import datetime
+
+import pytest
+
+from app.models.database import AuditLog
+from app.services import audit_service
+from app.services.audit_service import AUDIT_BUFFER_KEY, AuditService, AuditWriter
+
+
+@pytest.fixture
+def writer(session_factory):
+    # Intervalo longo: só batch_size ou flush disparam a gravação
+    writer = AuditWriter(session_factory, batch_size=2, flush_interval=60.0)
+    yield writer
+    writer.stop(timeout=5.0)
+
+
+def _log(db, index, commit=False):
+    AuditService.log_create(
+        db, "market", uuid.uuid4(), {"name": f"m{index}"}, commit=commit
+    )
+
+
+def _stored(session_factory):
+    check = session_factory()
+    try:
+        return sorted(log.new_values["name"] for log in check.query(AuditLog))
+    finally:
+        check.close()
+
+
+def test_buffered_rows_are_written_on_commit(db, session_factory):
+    for index in range(3):
+        _log(db, index)
+    assert len(db.info[AUDIT_BUFFER_KEY]) == 3
+    assert _stored(session_factory) == []
+
+    db.commit()
+
+    assert AUDIT_BUFFER_KEY not in db.info
+    assert _stored(session_factory) == ["m0", "m1", "m2"]
+
+
+def test_buffered_rows_are_dropped_on_rollback(db, session_factory):
+    _log(db, 0)
+    _log(db, 1)
+    db.rollback()
+    # O próximo commit não pode levar logs da transação desfeita
+    _log(db, 2)
+    db.commit()
+
+    assert _stored(session_factory) == ["m2"]
+
+
+def test_commit_true_writes_immediately(db, session_factory):
+    _log(db, 0, commit=True)
+
+    assert _stored(session_factory) == ["m0"]
+
+
+def test_writer_drains_queue(session_factory, writer):
+    for index in range(5):
+        writer.enqueue(
+            dict(
+                id=uuid.uuid4(),
+                user_id=None,
+                entity_type="market",
+                entity_id=str(uuid.uuid4()),
+                action="create",
+                old_values=None,
+                new_values={"name": f"m{index}"},
+                created_at=datetime.utcnow(),
+            )
+        )
+
+    assert writer.flush(timeout=10.0)
+
+    assert writer.stats["written"] == 5
+    assert writer.stats["errors"] == 0
+    assert _stored(session_factory) == [f"m{index}" for index in range(5)]
+
+
+def test_async_durability_leaves_caller_session_alone(
+    db, session_factory, writer, monkeypatch
+):
+    monkeypatch.setattr(audit_service, "AUDIT_DURABILITY", "async")
+    monkeypatch.setattr(audit_service, "audit_writer", writer)
+
+    _log(db, 0)
+    db.rollback()
+
+    assert AUDIT_BUFFER_KEY not in db.info
+    assert writer.flush(timeout=10.0)
+    assert _stored(session_factory) == ["m0"]
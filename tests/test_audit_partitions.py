@@ -0,0 +1,36 @@
+from datetime import date, datetime, timezone
+
+from app.services.audit_partitions import create_partition
+
+
+class _Recorder:
+    """
+    Sessão que só registra os comandos (o particionamento exige PostgreSQL)
+    """
+
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, statement, params=None):
+        self.statements.append((str(statement), params))
+        return self
+
+    def scalar(self):
+        # Partição ainda não existe; a padrão sim
+        return "audit_logs_default" if len(self.statements) > 1 else None
+
+
+def test_partition_bounds_are_utc_timestamps():
+    db = _Recorder()
+
+    assert create_partition(db, date(2026, 12, 1))
+
+    attach, _ = db.statements[-1]
+    assert attach.endswith(
+        "FOR VALUES FROM ('2026-12-01 00:00:00+00') TO ('2027-01-01 00:00:00+00')"
+    )
+    [params] = [params for sql, params in db.statements if "DELETE" in sql]
+    assert params == {
+        "start": datetime(2026, 12, 1, tzinfo=timezone.utc),
+        "end": datetime(2027, 1, 1, tzinfo=timezone.utc),
+    }
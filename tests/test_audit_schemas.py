@@ -0,0 +1,35 @@
+import json
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+
+from app.schemas.schemas import AuditLogResponse
+
+
+def _response(values):
+    return AuditLogResponse(
+        id=uuid.uuid4(),
+        entity_type="vote",
+        entity_id=uuid.uuid4(),
+        action="create",
+        new_values=values,
+        created_at=datetime.now(timezone.utc),
+    )
+
+
+@pytest.mark.parametrize(
+    "stored, expected",
+    [
+        ({"is_reliable": True}, {"is_reliable": True}),
+        (None, None),
+        # Texto de json.dumps das versões anteriores, direto ou como string JSON
+        ('{"is_reliable": true}', {"is_reliable": True}),
+        (json.dumps('{"is_reliable": true}'), {"is_reliable": True}),
+        ("null", None),
+        ("[1, 2]", {"value": [1, 2]}),
+        ("não é JSON", {"value": "não é JSON"}),
+    ],
+)
+def test_legacy_text_values_become_objects(stored, expected):
+    assert _response(stored).new_values == expected
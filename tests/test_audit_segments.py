@@ -0,0 +1,146 @@
+import os
+import random
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from app.services.audit_segments import (
+    TIME_BLOCK_DTYPE,
+    TIME_BLOCKS_FILE,
+    SegmentedAuditLog,
+)
+
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def _row(index, seconds, entity_type="vote"):
+    return {
+        "id": str(index),
+        "entity_type": entity_type,
+        "entity_id": f"00000000-0000-0000-0000-{index % 7:012d}",
+        "action": "create",
+        "user_id": None,
+        "old_values": None,
+        "new_values": {"index": index},
+        "created_at": (T0 + timedelta(seconds=seconds)).isoformat(),
+    }
+
+
+def _ids(records):
+    return [record["id"] for record in records]
+
+
+def _expected(rows, start, end, entity_type=None):
+    return [
+        row["id"]
+        for row in rows
+        if start <= datetime.fromisoformat(row["created_at"]) < end
+        and (entity_type is None or row["entity_type"] == entity_type)
+    ]
+
+
+@pytest.fixture
+def open_log(tmp_path):
+    logs = []
+
+    def open_log(**kwargs):
+        kwargs.setdefault("fsync", False)
+        log = SegmentedAuditLog(str(tmp_path), **kwargs)
+        logs.append(log)
+        return log
+
+    yield open_log
+    for log in logs:
+        if log.readonly or not log.lock_file.closed:
+            log.close()
+
+
+def test_out_of_order_appends_are_found(open_log):
+    log = open_log(time_index_interval=1)
+    log.append([_row(0, 3), _row(1, 1), _row(2, 5)])
+
+    assert _ids(log.between(T0, T0 + timedelta(seconds=2))) == ["1"]
+    assert _ids(log.between(T0 + timedelta(seconds=2), T0 + timedelta(seconds=6))) == [
+        "0",
+        "2",
+    ]
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_range_scans_match_brute_force(seed, open_log):
+    rng = random.Random(seed)
+    # Gravação após o commit: created_at só aproximadamente crescente
+    rows = [
+        _row(index, index + rng.uniform(-20, 20), rng.choice(["vote", "market"]))
+        for index in range(300)
+    ]
+    log = open_log(segment_bytes=4096, time_index_interval=8)
+    for start in range(0, len(rows), 25):
+        log.append(rows[start : start + 25])
+    assert len(log._segments()) > 3
+
+    reader = open_log(readonly=True)
+    for _ in range(20):
+        start = T0 + timedelta(seconds=rng.uniform(-30, 330))
+        end = start + timedelta(seconds=rng.uniform(0, 80))
+        entity_type = rng.choice([None, "vote"])
+        expected = _expected(rows, start, end, entity_type)
+        assert _ids(log.between(start, end, entity_type)) == expected
+        assert _ids(reader.between(start, end, entity_type)) == expected
+
+    log.close()
+    reopened = open_log(segment_bytes=4096, time_index_interval=8)
+    assert _ids(reopened.iter_between(None, None)) == _ids(rows)
+    start, end = T0 + timedelta(seconds=100), T0 + timedelta(seconds=140)
+    assert _ids(reopened.between(start, end)) == _expected(rows, start, end)
+
+
+def test_truncated_record_is_dropped_on_open(tmp_path, open_log):
+    rows = [_row(index, index) for index in range(20)]
+    log = open_log(time_index_interval=4)
+    log.append(rows)
+    log.close()
+
+    # Queda no meio da escrita: só parte do próximo registro chegou ao disco
+    path = os.path.join(tmp_path, "audit-00000000.log")
+    size = os.path.getsize(path)
+    with open(path, "ab") as stream:
+        stream.write(b'\x40\x00\x00\x00\x12\x34\x56\x78{"id": ')
+
+    log = open_log(time_index_interval=4)
+    assert os.path.getsize(path) == size
+    assert _ids(log.iter_between(None, None)) == _ids(rows)
+
+    log.append([_row(20, 2), _row(21, 30)])
+    start, end = T0, T0 + timedelta(seconds=3)
+    assert _ids(log.between(start, end)) == ["0", "1", "2", "20"]
+    assert _ids(log.between(T0 + timedelta(seconds=25), end + timedelta(days=1))) == [
+        "21"
+    ]
+
+
+def test_time_blocks_are_rebuilt_when_missing_or_stale(tmp_path, open_log):
+    rows = [_row(index, (index * 7) % 50) for index in range(50)]
+    log = open_log(segment_bytes=1024, time_index_interval=4)
+    log.append(rows)
+    log.close()
+
+    path = os.path.join(tmp_path, TIME_BLOCKS_FILE)
+    blocks = np.fromfile(path, dtype=TIME_BLOCK_DTYPE)
+    assert len(blocks) > 0
+    # Blocos apontando para além do log (log truncado depois do índice)
+    stale = blocks[-1:].copy()
+    stale["segment"] = log.active
+    stale["start"] = stale["end"] = 10**9
+    np.concatenate([blocks[:3], stale]).tofile(path)
+
+    log = open_log(segment_bytes=1024, time_index_interval=4)
+    assert not (np.fromfile(path, dtype=TIME_BLOCK_DTYPE)["end"] == 10**9).any()
+    start, end = T0 + timedelta(seconds=10), T0 + timedelta(seconds=20)
+    assert _ids(log.between(start, end)) == _expected(rows, start, end)
+    log.close()
+
+    os.remove(path)
+    log = open_log(segment_bytes=1024, time_index_interval=4)
+    assert _ids(log.between(start, end)) == _expected(rows, start, end)
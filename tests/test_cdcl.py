@@ -0,0 +1,73 @@
+import random
+
+import pytest
+
+from app.math.cdcl import CDCLSolver
+
+
+@pytest.mark.parametrize("seed", range(150))
+def test_solve_matches_brute_force(seed, random_cnf, brute_force, check_model):
+    rng = random.Random(seed)
+    num_vars = rng.randint(3, 10)
+    # Em torno do limiar de satisfatibilidade, para misturar sat e unsat
+    clauses = random_cnf(seed, num_vars, rng.randint(num_vars, 5 * num_vars), 4)
+
+    solver = CDCLSolver(num_vars, clauses)
+    result = solver.solve()
+
+    assert result == bool(brute_force(num_vars, clauses))
+    if result:
+        assert check_model(clauses, solver.model)
+
+
+@pytest.mark.parametrize("seed", range(60))
+def test_assumptions_and_failed_assumptions(seed, random_cnf, brute_force):
+    rng = random.Random(1000 + seed)
+    num_vars = rng.randint(4, 9)
+    clauses = random_cnf(1000 + seed, num_vars, 2 * num_vars, 3)
+    assumptions = [
+        var if rng.random() < 0.5 else -var
+        for var in rng.sample(range(1, num_vars + 1), 3)
+    ]
+
+    solver = CDCLSolver(num_vars, clauses)
+    result = solver.solve(assumptions)
+
+    units = [[literal] for literal in assumptions]
+    assert result == bool(brute_force(num_vars, clauses + units))
+    if result is False and brute_force(num_vars, clauses):
+        # As suposições que falharam já bastam para a contradição
+        failed = solver.failed_assumptions
+        assert set(failed) <= set(assumptions)
+        assert not brute_force(num_vars, clauses + [[literal] for literal in failed])
+
+
+def test_incremental_solving_keeps_learned_state(random_cnf, brute_force):
+    num_vars = 8
+    clauses = random_cnf(7, num_vars, 10, 3)
+    solver = CDCLSolver(num_vars, clauses)
+    added = list(clauses)
+    for extra in random_cnf(8, num_vars, 30, 3):
+        solver.add_clause(extra)
+        added.append(extra)
+        assert solver.solve() == bool(brute_force(num_vars, added))
+
+
+def test_budget_exhausted_returns_none(random_cnf):
+    # Pigeonhole 7 → 6: insatisfatível e difícil para resolução
+    holes, pigeons = 6, 7
+    var = lambda p, h: p * holes + h + 1
+    clauses = [[var(p, h) for h in range(holes)] for p in range(pigeons)]
+    for h in range(holes):
+        for p in range(pigeons):
+            for q in range(p + 1, pigeons):
+                clauses.append([-var(p, h), -var(q, h)])
+
+    solver = CDCLSolver(pigeons * holes, clauses)
+    assert solver.solve(max_conflicts=10) is None
+    # O solver continua utilizável depois de um orçamento esgotado
+    assert CDCLSolver(2, [[1], [-1, 2]]).solve() is True
+
+
+def test_empty_clause_is_unsat():
+    assert CDCLSolver(2, [[1, 2], []]).solve() is False
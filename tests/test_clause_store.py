@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from app.math.clause_store import ClauseStore, pack_assignment
+from app.math.local_search import LocalSearchSolver
+
+
+def test_occurrences_list_clause_ids_per_literal_slot(random_cnf):
+    clauses = random_cnf(3, 6, 20, 4)
+    store = ClauseStore(clauses)
+    starts, clause_ids = store.occurrences(8)
+
+    assert len(starts) == 2 * 8 + 3
+    for var in range(1, 9):
+        for slot, literal in ((2 * var, var), (2 * var + 1, -var)):
+            expected = [i for i, clause in enumerate(clauses) if literal in clause]
+            assert clause_ids[starts[slot] : starts[slot + 1]].tolist() == expected
+
+
+def test_true_literal_counts_match_clauses(random_cnf):
+    clauses = random_cnf(4, 10, 30, 5)
+    store = ClauseStore(clauses)
+    model = [var if var % 3 else -var for var in range(1, 11)]
+    counts = store.true_literal_counts(pack_assignment(model, 10))
+    assert counts.tolist() == [
+        sum(literal in model for literal in clause) for clause in clauses
+    ]
+
+
+@pytest.mark.parametrize("algorithm", ["probsat", "walksat"])
+@pytest.mark.parametrize("seed", range(20))
+def test_local_search_witness_satisfies_store(seed, algorithm, random_cnf, check_model):
+    # Só as cláusulas satisfeitas por um modelo plantado: sempre satisfatível
+    planted = [var if (seed >> (var % 5)) & 1 else -var for var in range(1, 11)]
+    clauses = [
+        clause
+        for clause in random_cnf(seed, 10, 60, 3)
+        if check_model([clause], planted)
+    ]
+    # Uma cláusula larga força a amostragem de candidatos
+    clauses.append([-literal for literal in planted[:5]] + planted[5:])
+    store = ClauseStore(clauses)
+
+    solver = LocalSearchSolver(10, store, algorithm, seed=seed, max_candidates=4)
+    assert solver.solve(max_flips=20000) is True
+    assert check_model(clauses, solver.model)
+    assert store.is_satisfied_by(solver.witness)
+    assert np.array_equal(solver.witness, pack_assignment(solver.model, 10))
@@ -0,0 +1,62 @@
+from app.math.consistency_cache import ConsistencyCache
+
+
+def _details(mode, status="sat"):
+    return {"mode": mode, "status": status, "conflicts": 3}
+
+
+def test_result_of_one_mode_does_not_answer_another():
+    cache = ConsistencyCache()
+    cache.store("m1", "digest", "full", True, _details("full"))
+
+    assert cache.lookup("m1", "local") is None
+    assert cache.lookup_digest("m1", "digest", "local") is None
+
+    is_consistent, details = cache.lookup("m1", "full")
+    assert is_consistent is True
+    assert details["mode"] == "full"
+    assert details["cached"] is True
+
+
+def test_each_mode_keeps_its_own_entry():
+    cache = ConsistencyCache()
+    cache.store("m1", "digest", "full", True, _details("full"))
+    cache.store("m1", "digest", "local", True, _details("local"))
+
+    assert cache.lookup("m1", "full")[1]["mode"] == "full"
+    assert cache.lookup("m1", "local")[1]["mode"] == "local"
+    assert len(cache.entries) == 2
+
+
+def test_invalidate_forgets_market_in_every_mode_but_keeps_digests():
+    cache = ConsistencyCache()
+    generation = cache.generation("m1")
+    cache.store("m1", "digest", "full", False, _details("full", "unsat"), generation)
+    cache.store("m1", "digest", "local", True, _details("local"), generation)
+
+    cache.invalidate("m1")
+    assert cache.lookup("m1", "full") is None
+    assert cache.lookup("m1", "local") is None
+
+    # A instância reconstruída com o mesmo digest ainda é reaproveitada
+    generation = cache.generation("m1")
+    assert cache.lookup_digest("m1", "digest", "full", generation)[0] is False
+    assert cache.lookup("m1", "full") is not None
+    assert cache.lookup("m1", "local") is None
+
+
+def test_stale_generation_does_not_bind_market():
+    cache = ConsistencyCache()
+    generation = cache.generation("m1")
+    cache.invalidate("m1")  # voto gravado durante a verificação
+    cache.store("m1", "digest", "full", True, _details("full"), generation)
+
+    assert cache.lookup("m1", "full") is None
+    assert cache.lookup_digest("m1", "digest", "full") is not None
+
+
+def test_budget_dependent_status_is_not_stored():
+    cache = ConsistencyCache()
+    cache.store("m1", "digest", "local", False, _details("local", "unknown"))
+    assert cache.lookup("m1", "local") is None
+    assert not cache.entries
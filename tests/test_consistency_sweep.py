@@ -0,0 +1,39 @@
+import os
+
+from app.math.ksat import KSatInstance
+from app.services import consistency_service
+from app.services.consistency_service import ConsistencyService
+
+
+def _instance(market_id):
+    instance = KSatInstance(market_id)
+    x, y = instance.variable("x"), instance.variable("y")
+    instance.add_clause([x, y], ("metric", "m"))
+    instance.add_clause([-x], ("vote", "v"))
+    instance.metric_count, instance.vote_count = 1, 1
+    return instance
+
+
+def test_single_worker_runs_in_sweep_process(db):
+    results = ConsistencyService(db)._solve_instances(
+        {"a": _instance("a")}, "full", 5.0, None, None, 1
+    )
+
+    [(market_id, is_consistent, details)] = results
+    assert market_id == "a" and is_consistent is True
+    assert details["pid"] != os.getpid()
+
+
+def test_single_worker_is_killed_past_deadline(db, monkeypatch):
+    # Prazo zero: o processo é encerrado antes de conseguir responder
+    monkeypatch.setattr(consistency_service, "SWEEP_GRACE", -5.0)
+
+    results = ConsistencyService(db)._solve_instances(
+        {"a": _instance("a"), "b": _instance("b")}, "full", 5.0, None, None, 1
+    )
+
+    assert sorted(market_id for market_id, _, _ in results) == ["a", "b"]
+    assert all(
+        is_consistent is False and details["status"] == "timeout"
+        for _, is_consistent, details in results
+    )
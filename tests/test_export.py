@@ -0,0 +1,92 @@
+import csv
+import io
+import json
+from functools import partial
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from app.models.database import AuditLog, DataPoint, Vote
+from app.services import export_service
+from app.services.export_service import (
+    AUDIT_LOG_COLUMNS,
+    DATA_POINT_COLUMNS,
+    VOTE_COLUMNS,
+    stream_export,
+)
+
+EXPORTS = [
+    ("/export/data-points", DataPoint, DATA_POINT_COLUMNS),
+    ("/export/votes", Vote, VOTE_COLUMNS),
+    ("/export/audit-logs", AuditLog, AUDIT_LOG_COLUMNS),
+]
+
+
+@pytest.fixture
+def client(session_factory, monkeypatch):
+    # A exportação abre a própria sessão; lotes pequenos cobrem vários blocos
+    monkeypatch.setattr(
+        main, "stream_export", partial(stream_export, session_factory=session_factory)
+    )
+    monkeypatch.setattr(export_service, "EXPORT_BATCH_SIZE", 3)
+    return TestClient(main.app)
+
+
+@pytest.mark.parametrize("path, model, columns", EXPORTS)
+def test_ndjson_has_one_object_per_row(
+    client, db, market_factory, path, model, columns
+):
+    market_factory(db, seed=1)
+    expected = db.query(model).count()
+    assert expected > 3
+
+    response = client.get(path)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert "attachment" in response.headers["content-disposition"]
+    lines = response.text.splitlines()
+    assert len(lines) == expected
+    names = [column.key for column in columns]
+    assert all(list(json.loads(line)) == names for line in lines)
+
+
+@pytest.mark.parametrize("path, model, columns", EXPORTS)
+def test_csv_has_header_and_one_line_per_row(
+    client, db, market_factory, path, model, columns
+):
+    market_factory(db, seed=2)
+    expected = db.query(model).count()
+
+    response = client.get(path, params={"format": "csv"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    header, *rows = list(csv.reader(io.StringIO(response.text)))
+    assert header == [column.key for column in columns]
+    assert len(rows) == expected
+    assert all(len(row) == len(header) for row in rows)
+
+
+def test_export_filters_by_metric(client, db, market_factory):
+    ids = market_factory(db, seed=3)
+    market_factory(db, seed=4)
+    metric_id = ids["metric_ids"][0]
+    expected = (
+        db.query(Vote)
+        .join(DataPoint, DataPoint.id == Vote.data_point_id)
+        .filter(DataPoint.metric_id == metric_id)
+        .count()
+    )
+
+    response = client.get("/export/votes", params={"metric_id": str(metric_id)})
+
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == expected
+    assert {row["metric_id"] for row in rows} <= {str(metric_id)}
+    assert {row["market_id"] for row in rows} <= {str(ids["market_id"])}
+
+
+def test_unknown_format_is_rejected(client):
+    assert client.get("/export/votes", params={"format": "xml"}).status_code == 422
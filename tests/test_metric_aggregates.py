@@ -0,0 +1,106 @@
+import random
+
+import pytest
+
+from app.math.aggregates import rebuild_metric_aggregates, rebuild_vote_counters
+from app.math.engine import MathematicalEngine
+from app.models.database import DataPoint, MetricAggregate
+from app.services.vote_service import VoteService
+
+
+def _aggregate_rows(db):
+    db.expire_all()
+    return {
+        str(aggregate.metric_id): (
+            aggregate.reliable_count,
+            float(aggregate.value_sum),
+            float(aggregate.abs_value_sum),
+            float(aggregate.weighted_latency_sum),
+        )
+        for aggregate in db.query(MetricAggregate)
+    }
+
+
+def _counters(db):
+    db.expire_all()
+    return {
+        str(data_point.id): (data_point.positive_votes, data_point.total_votes)
+        for data_point in db.query(DataPoint)
+    }
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_values_from_aggregates_match_full_recompute(db, market_factory, seed):
+    ids = market_factory(db, seed=seed, metrics=4, data_points=5, users=8)
+    engine = MathematicalEngine(db)
+
+    from_aggregates = engine.calculate_metric_values_from_aggregates(ids["metric_ids"])
+
+    for metric_id in ids["metric_ids"]:
+        engine.invalidate_metric_snapshot(metric_id)
+        assert from_aggregates[str(metric_id)] == pytest.approx(
+            engine.calculate_metric_value(metric_id), abs=1e-6
+        )
+
+
+def test_vote_deltas_match_rebuild_after_every_vote(
+    db, market_factory, check_vote_state
+):
+    # Votos alternados fazem os dados entrarem e saírem dos confiáveis
+    ids = market_factory(db, seed=7, metrics=2, data_points=3, votes=False)
+    rng = random.Random(7)
+    service = VoteService(db)
+    pairs = [
+        (user_id, data_point_id)
+        for user_id in ids["user_ids"]
+        for data_point_id in ids["data_point_ids"]
+    ]
+    rng.shuffle(pairs)
+
+    for user_id, data_point_id in pairs:
+        service.create_vote(user_id, data_point_id, rng.random() < 0.5)
+        check_vote_state(db, ids["metric_ids"])
+
+    incremental = _aggregate_rows(db)
+    rebuild_metric_aggregates(db, ids["metric_ids"])
+    db.commit()
+    rebuilt = _aggregate_rows(db)
+    assert rebuilt.keys() == incremental.keys()
+    for metric_id, sums in rebuilt.items():
+        assert sums == pytest.approx(incremental[metric_id], abs=1e-6)
+
+
+def test_counters_match_recount(db, market_factory, check_vote_state):
+    # Votos um a um e em lote, e um mercado sem votos
+    ids = market_factory(db, seed=8)
+    batch = market_factory(db, seed=9, votes=False)
+    VoteService(db).create_votes_batch(
+        [
+            (user_id, data_point_id, index % 3 != 0)
+            for index, (user_id, data_point_id) in enumerate(
+                zip(batch["user_ids"], batch["data_point_ids"])
+            )
+        ]
+    )
+    market_factory(db, seed=10, votes=False)
+    check_vote_state(db, ids["metric_ids"] + batch["metric_ids"])
+    counted = _counters(db)
+
+    rebuild_vote_counters(db)
+    db.commit()
+
+    assert _counters(db) == counted
+
+
+def test_missing_aggregate_is_rebuilt_on_read(db, market_factory):
+    ids = market_factory(db, seed=10)
+    engine = MathematicalEngine(db)
+    expected = engine.calculate_metric_values_from_aggregates(ids["metric_ids"])
+    db.query(MetricAggregate).delete()
+    db.commit()
+
+    rebuilt = engine.calculate_metric_values_from_aggregates(ids["metric_ids"])
+
+    for metric_id, values in rebuilt.items():
+        assert values == pytest.approx(expected[metric_id], abs=1e-6)
+    assert db.query(MetricAggregate).count() == len(ids["metric_ids"])
@@ -0,0 +1,50 @@
+import pytest
+
+from app.math.model_count import ApproximateModelCounter
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_small_counts_are_exact(seed, random_cnf, brute_force):
+    clauses = random_cnf(seed, 8, 14, 3)
+    models = brute_force(8, clauses)
+
+    result = ApproximateModelCounter(8, clauses, seed=seed).count(time_limit=None)
+
+    if len(models) < 72:  # abaixo do limiar com epsilon = 0.8
+        assert result["status"] == "exact"
+        assert result["estimate"] == len(models)
+        assert result["fraction"] == pytest.approx(len(models) / 2**8)
+
+
+def test_projected_count_on_sampling_set(random_cnf, brute_force):
+    clauses = random_cnf(11, 8, 12, 3)
+    sampling_set = [1, 2, 3, 4]
+    projections = {
+        tuple(model[var - 1] for var in sampling_set)
+        for model in brute_force(8, clauses)
+    }
+
+    counter = ApproximateModelCounter(8, clauses, sampling_set, seed=1)
+    result = counter.count(time_limit=None)
+
+    assert result["status"] == "exact"
+    assert result["estimate"] == len(projections)
+
+
+def test_large_count_is_within_tolerance(random_cnf, brute_force):
+    epsilon = 3.0
+    clauses = [clause for clause in random_cnf(5, 10, 8, 3) if len(clause) == 3]
+    exact = len(brute_force(10, clauses))
+
+    counter = ApproximateModelCounter(10, clauses, epsilon=epsilon, delta=0.9, seed=3)
+    assert exact > counter.threshold  # força as células XOR
+    result = counter.count(time_limit=None)
+
+    assert result["status"] == "approx"
+    assert exact / (1 + epsilon) <= result["estimate"] <= exact * (1 + epsilon)
+
+
+def test_unsatisfiable_counts_zero():
+    result = ApproximateModelCounter(2, [[1], [-1]], seed=0).count(time_limit=None)
+    assert result["estimate"] == 0
+    assert result["fraction"] == 0.0
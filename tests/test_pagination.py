@@ -0,0 +1,129 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from app.models.database import DataPoint, ExternalSource, Market
+from app.services.audit_segments import SegmentedAuditLog
+from app.services.pagination import decode_cursor, encode_cursor, keyset_page
+from main import app
+
+T0 = datetime(2026, 1, 1)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Market.__table__.create(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _add_markets(db, count):
+    # Metade dos mercados repete created_at: o id desempata
+    markets = [
+        Market(
+            id=uuid.uuid4(),
+            name=f"m{index}",
+            created_at=T0 + timedelta(seconds=index // 2),
+        )
+        for index in range(count)
+    ]
+    db.add_all(markets)
+    db.commit()
+    return sorted(
+        markets, key=lambda market: (market.created_at, market.id), reverse=True
+    )
+
+
+def test_cursor_round_trip():
+    position = {"created_at": "2026-01-01T00:00:00+00:00", "id": str(uuid.uuid4())}
+    cursor = encode_cursor(position)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == position
+
+
+@pytest.mark.parametrize("cursor", ["???", "bm90IGpzb24", encode_cursor([1, 2])])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+@pytest.mark.parametrize("limit", [1, 3, 7, 25])
+def test_keyset_pages_cover_rows_once_in_order(db, limit):
+    expected = [market.id for market in _add_markets(db, 23)]
+
+    seen, cursor = [], None
+    while True:
+        rows, cursor = keyset_page(db.query(Market), Market, limit, cursor)
+        assert len(rows) <= limit
+        seen += [row.id for row in rows]
+        if cursor is None:
+            break
+        assert len(rows) == limit
+
+    assert seen == expected
+
+
+@pytest.mark.parametrize("model", [Market, ExternalSource, DataPoint])
+def test_paginated_tables_require_created_at(model):
+    assert model.__table__.c.created_at.nullable is False
+
+
+def test_market_without_created_at_is_rejected(db):
+    insert = Market.__table__.insert().values(
+        id=uuid.uuid4(), name="sem data", created_at=None
+    )
+    with pytest.raises(IntegrityError):
+        db.execute(insert)
+
+
+def test_keyset_cursor_without_position_is_rejected(db):
+    with pytest.raises(ValueError):
+        keyset_page(db.query(Market), Market, 10, encode_cursor({"id": "x"}))
+
+
+@pytest.mark.parametrize(
+    "path", ["/markets/", "/external-sources/", "/data-points/", "/audit-logs/"]
+)
+@pytest.mark.parametrize(
+    "cursor", ["???", encode_cursor({"created_at": "ontem", "id": "x"})]
+)
+def test_invalid_cursor_returns_400(path, cursor):
+    response = TestClient(app).get(path, params={"cursor": cursor})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Cursor inválido"
+
+
+def test_segment_pages_walk_back_without_repeats(tmp_path):
+    log = SegmentedAuditLog(str(tmp_path), segment_bytes=2048, fsync=False)
+    try:
+        log.append(
+            [
+                {
+                    "id": str(index),
+                    "entity_type": "vote" if index % 3 else "market",
+                    "entity_id": str(uuid.uuid4()),
+                    "action": "create",
+                    "created_at": (T0 + timedelta(seconds=index)).isoformat(),
+                }
+                for index in range(60)
+            ]
+        )
+        seen, before = [], None
+        while True:
+            records, before = log.recent_page(7, before, "vote")
+            seen += [int(record["id"]) for record in records]
+            if before is None:
+                break
+    finally:
+        log.close()
+
+    assert seen == [index for index in reversed(range(60)) if index % 3]
@@ -0,0 +1,66 @@
+import random
+
+import pytest
+
+from app.math.cdcl import CDCLSolver
+from app.math.clause_store import ClauseStore
+from app.math.preprocess import Preprocessor
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_simplification_preserves_satisfiability(
+    seed, random_cnf, brute_force, check_model
+):
+    rng = random.Random(seed)
+    num_vars = rng.randint(3, 10)
+    clauses = random_cnf(seed, num_vars, rng.randint(num_vars, 5 * num_vars), 4)
+    satisfiable = bool(brute_force(num_vars, clauses))
+
+    preprocessor = Preprocessor(num_vars, clauses)
+    simplified = preprocessor.run()
+
+    assert isinstance(simplified, ClauseStore)
+    if not preprocessor.ok:
+        assert not satisfiable
+        return
+    solver = CDCLSolver(num_vars, simplified)
+    assert solver.solve() == satisfiable
+    if satisfiable:
+        # O modelo das cláusulas simplificadas se estende às originais
+        assert check_model(clauses, preprocessor.extend(solver.model))
+
+
+def test_every_model_of_simplified_clauses_extends(random_cnf, check_model):
+    num_vars = 8
+    for seed in range(30):
+        clauses = [
+            clause
+            for clause in random_cnf(500 + seed, num_vars, 20, 3)
+            if len(clause) > 1
+        ]
+        preprocessor = Preprocessor(num_vars, clauses)
+        simplified = list(preprocessor.run())
+        if not preprocessor.ok:
+            continue
+        # Qualquer modelo (não só o do solver) precisa ser estendido
+        for model in _models(num_vars, simplified):
+            assert check_model(clauses, preprocessor.extend(model))
+
+
+def test_subsumed_and_pure_clauses_are_removed():
+    clauses = [[1, 2], [1, 2, 3], [-1, 4], [-2, 4], [1, -3, 5]]
+    preprocessor = Preprocessor(5, clauses)
+    preprocessor.run()
+    report = preprocessor.report()
+
+    assert report["subsumed"] >= 1
+    assert report["clauses_before"] == 5
+    assert report["clauses_after"] < 5
+    assert report["literals_after"] < report["literals_before"]
+
+
+def _models(num_vars, clauses):
+    solver = CDCLSolver(num_vars, clauses)
+    while solver.solve():
+        yield solver.model
+        solver.add_clause([-literal for literal in solver.model])
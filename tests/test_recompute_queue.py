@@ -0,0 +1,91 @@
+import pytest
+
+from app.math.engine import MathematicalEngine
+from app.models.database import DataPoint, MetricValue, Vote
+from app.services.recompute_queue import RecomputeQueue
+from app.services.vote_service import VoteService
+
+
+@pytest.fixture
+def queue(session_factory):
+    # Janela longa: só flush dispara o lote
+    queue = RecomputeQueue(session_factory, window=60.0, staleness_budget=60.0)
+    yield queue
+    queue.stop(drain=False, timeout=5.0)
+
+
+def test_vote_request_only_writes_vote_and_counters(
+    db, session_factory, queue, market_factory
+):
+    ids = market_factory(db, seed=1, votes=False)
+    service = VoteService(db, queue)
+    data_point_id = ids["data_point_ids"][0]
+
+    for user_id in ids["user_ids"][:3]:
+        service.create_vote(user_id, data_point_id, True)
+
+    data_point = db.get(DataPoint, data_point_id)
+    assert data_point.total_votes == 3 and data_point.positive_votes == 3
+    # Participação, valores e consistência ficam para a fila
+    assert float(data_point.participation_rate or 0) == 0.0
+    assert db.query(MetricValue).count() == 0
+    assert service.last_consistency is None
+    assert queue.status()["pending_data_points"] == 1
+
+    assert queue.flush(timeout=10.0)
+    status = queue.status()
+    assert status["batches"] == 1
+    assert status["recomputed_data_points"] == 1
+    assert status["recomputed_metrics"] == 1
+    assert status["consistency_checks"] == 1
+    assert status["errors"] == 0
+
+    check = session_factory()
+    data_point = check.get(DataPoint, data_point_id)
+    assert float(data_point.participation_rate) == 1.0
+    assert data_point.is_reliable is True
+    metric_value = (
+        check.query(MetricValue)
+        .filter(MetricValue.metric_id == ids["metric_ids"][0])
+        .one()
+    )
+    mu, latency, value, error = MathematicalEngine(check).calculate_metric_value(
+        ids["metric_ids"][0]
+    )
+    assert float(metric_value.value) == pytest.approx(value, abs=1e-6)
+    check.close()
+
+
+def test_queue_matches_synchronous_votes(session_factory, queue, market_factory):
+    # Os mesmos votos, em um mercado pela requisição e em outro pela fila
+    synchronous, queued = session_factory(), session_factory()
+    expected = market_factory(synchronous, seed=2)
+    ids = market_factory(queued, seed=2, votes=False)
+    users = dict(zip(expected["user_ids"], ids["user_ids"]))
+    data_points = dict(zip(expected["data_point_ids"], ids["data_point_ids"]))
+
+    service = VoteService(queued, queue)
+    for vote in synchronous.query(Vote).order_by(Vote.created_at):
+        service.create_vote(
+            users[vote.user_id], data_points[vote.data_point_id], vote.is_reliable
+        )
+    assert queue.flush(timeout=10.0)
+
+    check = session_factory()
+    for expected_metric, metric in zip(expected["metric_ids"], ids["metric_ids"]):
+        assert _metric_value(check, metric) == pytest.approx(
+            _metric_value(synchronous, expected_metric), abs=1e-6
+        )
+    for expected_point, data_point in data_points.items():
+        assert check.get(DataPoint, data_point).latency == (
+            synchronous.get(DataPoint, expected_point).latency
+        )
+    check.close()
+    synchronous.close()
+    queued.close()
+
+
+def _metric_value(db, metric_id):
+    return float(
+        db.query(MetricValue.value).filter(MetricValue.metric_id == metric_id).scalar()
+    )
@@ -0,0 +1,39 @@
+from solve_dimacs import solve_directory, solve_file
+
+# x1 ∨ x2, ¬x1: único modelo x1=F, x2=T
+CNF = "p cnf 2 2\n1 2 0\n-1 0\n"
+
+
+def _write(directory, name, cnf, solution=None):
+    path = directory / f"{name}.cnf"
+    path.write_text(cnf)
+    if solution is not None:
+        (directory / f"{name}.sol").write_text(solution)
+    return str(path)
+
+
+def test_invalid_recorded_model_is_a_regression(tmp_path):
+    path = _write(tmp_path, "bad", CNF, "s SATISFIABLE\nv 1 2 0\n")
+
+    _, is_consistent, details = solve_file(path, "auto", 5.0, 0, True)
+
+    assert is_consistent is True
+    assert details["expected"] == "sat"
+    assert details["regression"] is True
+    assert "modelo gravado inválido" in details["regression_reason"]
+
+
+def test_check_keeps_going_after_invalid_model(tmp_path, capsys):
+    _write(tmp_path, "a_bad", CNF, "s SATISFIABLE\nv 1 2 0\n")
+    _write(tmp_path, "b_good", CNF, "s SATISFIABLE\nv -1 2 0\n")
+    _write(tmp_path, "c_unsat", "p cnf 1 2\n1 0\n-1 0\n", "s UNSATISFIABLE\n")
+    _write(tmp_path, "d_flipped", CNF, "s UNSATISFIABLE\n")
+
+    regressions = solve_directory(str(tmp_path), "auto", 5.0, 0, True, 1)
+
+    assert regressions == 2
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[-1].startswith("4 instâncias")
+    assert any("a_bad" in line and "DIVERGÊNCIA" in line for line in lines)
+    assert any("d_flipped" in line and "esperado unsat" in line for line in lines)
+    assert not any("b_good" in line and "DIVERGÊNCIA" in line for line in lines)
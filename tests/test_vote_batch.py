@@ -0,0 +1,134 @@
+import random
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.models.database import AuditLog, DataPoint, MetricAggregate, Vote, get_db
+from app.services.vote_service import VoteService
+from main import app
+
+
+@pytest.fixture
+def client(session_factory):
+    def session():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = session
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_db, None)
+
+
+def _snapshot(db):
+    db.expire_all()
+    return (
+        db.query(Vote).count(),
+        db.query(AuditLog).count(),
+        sorted(
+            (str(data_point.id), data_point.positive_votes, data_point.total_votes)
+            for data_point in db.query(DataPoint)
+        ),
+        sorted(
+            (str(aggregate.metric_id), aggregate.reliable_count)
+            for aggregate in db.query(MetricAggregate)
+        ),
+    )
+
+
+def _item(user_id, data_point_id, is_reliable=True):
+    return {
+        "user_id": str(user_id),
+        "data_point_id": str(data_point_id),
+        "is_reliable": is_reliable,
+    }
+
+
+@pytest.mark.parametrize(
+    "broken, error",
+    [
+        ("unknown_user", LookupError),
+        ("unknown_data_point", LookupError),
+        ("repeated_pair", ValueError),
+        ("existing_vote", ValueError),
+    ],
+)
+def test_invalid_item_rolls_back_whole_batch(db, market_factory, broken, error):
+    ids = market_factory(db, seed=3, votes=False)
+    users, data_points = ids["user_ids"], ids["data_point_ids"]
+    VoteService(db).create_vote(users[0], data_points[0], True)
+    before = _snapshot(db)
+
+    votes = [(user_id, data_points[1], True) for user_id in users]
+    if broken == "unknown_user":
+        votes.append((uuid.uuid4(), data_points[2], True))
+    elif broken == "unknown_data_point":
+        votes.append((users[1], uuid.uuid4(), True))
+    elif broken == "repeated_pair":
+        votes.append((users[0], data_points[1], False))
+    else:
+        votes.append((users[0], data_points[0], False))
+
+    with pytest.raises(error):
+        VoteService(db).create_votes_batch(votes)
+    db.rollback()
+
+    assert _snapshot(db) == before
+
+
+def test_batch_errors_map_to_http_status(client, db, market_factory):
+    ids = market_factory(db, seed=4, votes=False)
+    users, data_points = ids["user_ids"], ids["data_point_ids"]
+
+    response = client.post(
+        "/votes/batch", json={"votes": [_item(uuid.uuid4(), data_points[0])]}
+    )
+    assert response.status_code == 404
+
+    response = client.post(
+        "/votes/batch", json={"votes": [_item(users[0], uuid.uuid4())]}
+    )
+    assert response.status_code == 404
+
+    repeated = [_item(users[0], data_points[0]), _item(users[0], data_points[0])]
+    response = client.post("/votes/batch", json={"votes": repeated})
+    assert response.status_code == 400
+
+    response = client.post("/votes/batch", json={"votes": repeated[:1]})
+    assert response.status_code == 201
+    assert response.json()["votes"] == 1
+
+    # O mesmo voto de novo: usuário já votou
+    response = client.post("/votes/batch", json={"votes": repeated[:1]})
+    assert response.status_code == 400
+
+    db.expire_all()
+    assert db.query(Vote).count() == 1
+
+
+def test_mixed_batch_matches_counts_and_aggregates(
+    db, market_factory, check_vote_state
+):
+    ids = market_factory(db, seed=5)
+    rng = random.Random(5)
+    existing = {(vote.user_id, vote.data_point_id) for vote in db.query(Vote)}
+    votes = [
+        (user_id, data_point_id, rng.random() < 0.6)
+        for user_id in ids["user_ids"]
+        for data_point_id in ids["data_point_ids"]
+        if (user_id, data_point_id) not in existing and rng.random() < 0.7
+    ]
+
+    result = VoteService(db).create_votes_batch(votes)
+
+    assert result["votes"] == len(votes)
+    assert result["data_points"] == len({vote[1] for vote in votes})
+    assert set(result["consistency"]) == {str(ids["market_id"])}
+    check_vote_state(db, ids["metric_ids"])
+    for data_point in db.query(DataPoint).filter(DataPoint.total_votes > 0):
+        assert float(data_point.participation_rate) == pytest.approx(
+            data_point.positive_votes / data_point.total_votes, abs=1e-4
+        )